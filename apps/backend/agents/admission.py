@@ -0,0 +1,194 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from config import settings
+from tracing import traced
+
+# Lower runs first: doctors (and admins) before patients/carers before guests
+PRIORITY = {"doctor": 0, "admin": 0, "patient": 1, "carer": 1, "guest": 2}
+CLASS_NAMES = {0: "staff", 1: "member", 2: "guest"}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"LLM capacity exhausted ({reason}); retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def too_busy(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+class Ticket:
+    """An admitted turn; release() frees its slot (idempotent)."""
+
+    __slots__ = ("controller", "user_id", "admitted_at", "released")
+
+    def __init__(self, controller: "AdmissionController", user_id: str):
+        self.controller = controller
+        self.user_id = user_id
+        self.admitted_at = time.monotonic()
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+
+class AdmissionController:
+    """Bounds concurrent agent runs (LLM turns) per process.
+
+    At most `max_concurrent` turns run at once and a user may have at most `per_user` turns
+    running or waiting. Others wait in a bounded priority queue (PRIORITY by role, then
+    arrival). When the queue is full a newcomer displaces the newest lower-priority waiter,
+    or is rejected; waiters also give up after `max_wait` seconds. Rejections carry a
+    Retry-After estimate based on the recent turn duration.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        per_user: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        max_wait: Optional[float] = None,
+    ):
+        self.max_concurrent = max_concurrent or settings.LLM_MAX_CONCURRENT_TURNS
+        self.per_user = per_user or settings.LLM_MAX_TURNS_PER_USER
+        self.queue_size = settings.LLM_ADMISSION_QUEUE_SIZE if queue_size is None else queue_size
+        self.max_wait = max_wait or settings.LLM_ADMISSION_MAX_WAIT_SECONDS
+        self._active = 0
+        self._user_turns: Dict[str, int] = {}  # running + waiting turns per user
+        self._waiters: List[list] = []  # heap of [priority, seq, future, user_id]
+        self._seq = itertools.count()
+        self._avg_turn_s = 5.0  # moving average, drives Retry-After
+        self.recent_waits: deque = deque(maxlen=1000)
+        self.counters = {"admitted": 0, "queued": 0, "max_wait_ms": 0.0}
+        self.rejected = {"user_limit": 0, "queue_full": 0, "displaced": 0, "timeout": 0}
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._avg_turn_s * (len(self._waiters) + 1) / self.max_concurrent))
+
+    def _reject(self, user_id: str, reason: str) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        self._drop_user_turn(user_id)
+        return AdmissionRejected(reason, self._retry_after())
+
+    def _drop_user_turn(self, user_id: str) -> None:
+        left = self._user_turns.get(user_id, 0) - 1
+        if left > 0:
+            self._user_turns[user_id] = left
+        else:
+            self._user_turns.pop(user_id, None)
+
+    @traced("admission.wait")
+    async def acquire(self, user_id: str, role: Optional[str]) -> Ticket:
+        """Wait for a slot; raises AdmissionRejected instead of queueing without bound."""
+        if self._user_turns.get(user_id, 0) >= self.per_user:
+            self.rejected["user_limit"] += 1
+            raise AdmissionRejected("user_limit", self._retry_after())
+        self._user_turns[user_id] = self._user_turns.get(user_id, 0) + 1
+
+        if self._active < self.max_concurrent and not self._waiters:
+            return self._admit(user_id, 0.0)
+
+        priority = PRIORITY.get((role or "guest").lower(), PRIORITY["guest"])
+        if len(self._waiters) >= self.queue_size:
+            worst = max(self._waiters, default=None)
+            if worst is None or worst[0] <= priority:
+                raise self._reject(user_id, "queue_full")
+            self._waiters.remove(worst)
+            heapq.heapify(self._waiters)
+            worst[2].set_exception(self._reject(worst[3], "displaced"))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), future, user_id]
+        heapq.heappush(self._waiters, entry)
+        self.counters["queued"] += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait)
+        except asyncio.TimeoutError:
+            if not future.done():
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                future.cancel()
+                raise self._reject(user_id, "timeout")
+            future.result()  # admitted just as the wait ran out (or displaced: re-raise)
+        except asyncio.CancelledError:
+            displaced = future.done() and future.exception() is not None
+            if future.done() and not displaced:
+                self._active -= 1  # slot was handed over; pass it on
+                self._wake()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            if not displaced:
+                self._drop_user_turn(user_id)
+            raise
+        return self._admit(user_id, time.monotonic() - started, counted=True)
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, role: Optional[str]):
+        ticket = await self.acquire(user_id, role)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def _admit(self, user_id: str, waited_s: float, counted: bool = False) -> Ticket:
+        if not counted:
+            self._active += 1  # queued turns get their slot in _wake()
+        self.counters["admitted"] += 1
+        self.recent_waits.append(waited_s)
+        self.counters["max_wait_ms"] = max(self.counters["max_wait_ms"], waited_s * 1000)
+        return Ticket(self, user_id)
+
+    def _wake(self) -> None:
+        while self._active < self.max_concurrent and self._waiters:
+            entry = heapq.heappop(self._waiters)
+            if not entry[2].done():
+                self._active += 1
+                entry[2].set_result(None)
+
+    def _release(self, ticket: Ticket) -> None:
+        self._active -= 1
+        self._drop_user_turn(ticket.user_id)
+        self._avg_turn_s = 0.9 * self._avg_turn_s + 0.1 * (time.monotonic() - ticket.admitted_at)
+        self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self.recent_waits)
+        queued_by_class = {name: 0 for name in CLASS_NAMES.values()}
+        for entry in self._waiters:
+            queued_by_class[CLASS_NAMES[entry[0]]] += 1
+        return {
+            "active": self._active,
+            "max_concurrent": self.max_concurrent,
+            "per_user": self.per_user,
+            "queue_depth": len(self._waiters),
+            "queue_size": self.queue_size,
+            "queued_by_class": queued_by_class,
+            "admitted": self.counters["admitted"],
+            "queued_total": self.counters["queued"],
+            "rejected": self.rejected,
+            "wait_ms": {
+                "avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                "p95": round(waits[int(len(waits) * 0.95)] * 1000, 2) if waits else 0.0,
+                "max": round(self.counters["max_wait_ms"], 2),
+            },
+            "avg_turn_ms": round(self._avg_turn_s * 1000, 1),
+            "retry_after_s": self._retry_after(),
+        }
+
+
+admission = AdmissionController()
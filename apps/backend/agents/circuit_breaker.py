@@ -0,0 +1,137 @@
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from config import settings
+
+FALLBACK_MESSAGE = (
+    "I'm sorry, the assistant is temporarily unavailable. Please try again in a few minutes. "
+    "If you experience severe chest pain, difficulty breathing, sudden weakness, or severe bleeding, "
+    "please seek emergency care or call your local emergency number (dummy 911)."
+)
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling Gemini while the breaker is open."""
+
+
+class CircuitBreaker:
+    """Stops calling Gemini while its recent calls mostly fail or are too slow.
+
+    Outcomes of the calls in the last `window` seconds are kept. With at least `min_calls`
+    of them, the breaker opens when the failure rate or the slow-call rate reaches its
+    threshold. While open every call fails fast with CircuitOpen; after `cooldown` seconds
+    one probe call is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    def __init__(
+        self,
+        window: Optional[float] = None,
+        min_calls: Optional[int] = None,
+        error_rate: Optional[float] = None,
+        slow_call_seconds: Optional[float] = None,
+        slow_rate: Optional[float] = None,
+        cooldown: Optional[float] = None,
+    ):
+        self.window = window or settings.LLM_BREAKER_WINDOW_SECONDS
+        self.min_calls = min_calls or settings.LLM_BREAKER_MIN_CALLS
+        self.error_rate = error_rate or settings.LLM_BREAKER_ERROR_RATE
+        self.slow_call_seconds = slow_call_seconds or settings.LLM_BREAKER_SLOW_CALL_SECONDS
+        self.slow_rate = slow_rate or settings.LLM_BREAKER_SLOW_RATE
+        self.cooldown = cooldown or settings.LLM_BREAKER_COOLDOWN_SECONDS
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._probing = False
+        self._calls: deque = deque()  # (finished_at, ok, seconds)
+        self.counters = {"calls": 0, "failures": 0, "slow_calls": 0, "short_circuited": 0, "opened": 0}
+
+    def is_open(self) -> bool:
+        """True while calls would be refused (open and still cooling down)."""
+        return self.state == "open" and time.monotonic() - self._opened_at < self.cooldown
+
+    def before_call(self) -> None:
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.cooldown or self._probing:
+                self.counters["short_circuited"] += 1
+                raise CircuitOpen("Gemini circuit breaker is open")
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                self.counters["short_circuited"] += 1
+                raise CircuitOpen("Gemini circuit breaker is half-open; probe in flight")
+            self._probing = True
+
+    def record(self, ok: bool, seconds: float) -> None:
+        now = time.monotonic()
+        slow = seconds >= self.slow_call_seconds
+        self.counters["calls"] += 1
+        self.counters["failures"] += not ok
+        self.counters["slow_calls"] += slow
+
+        if self.state == "half_open":
+            self._probing = False
+            if ok and not slow:
+                self.state = "closed"
+                self._calls.clear()
+            else:
+                self._open(now)
+            return
+
+        self._calls.append((now, ok, seconds))
+        while self._calls and self._calls[0][0] < now - self.window:
+            self._calls.popleft()
+        if self.state == "closed" and len(self._calls) >= self.min_calls:
+            failures = sum(not c[1] for c in self._calls) / len(self._calls)
+            slow_calls = sum(c[2] >= self.slow_call_seconds for c in self._calls) / len(self._calls)
+            if failures >= self.error_rate or slow_calls >= self.slow_rate:
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = "open"
+        self._opened_at = now
+        self.counters["opened"] += 1
+        print(f"⚠️ Gemini circuit breaker opened for {self.cooldown:.0f}s")
+
+    def cancelled(self) -> None:
+        """A call was cancelled (deadline / disconnect): no outcome, but free the probe."""
+        if self.state == "half_open":
+            self._probing = False
+            self.state = "open"
+
+    def stats(self) -> Dict[str, Any]:
+        recent = list(self._calls)
+        return {
+            **self.counters,
+            "state": "open" if self.is_open() else self.state,
+            "window_calls": len(recent),
+            "window_error_rate": round(sum(not c[1] for c in recent) / len(recent), 3) if recent else None,
+            "window_avg_ms": round(sum(c[2] for c in recent) / len(recent) * 1000, 1) if recent else None,
+        }
+
+
+circuit_breaker = CircuitBreaker()
+
+
+class GuardedGemini(Gemini):
+    """Gemini whose calls go through the process-wide circuit breaker."""
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        circuit_breaker.before_call()
+        started, ok = time.monotonic(), True
+        try:
+            async for response in super().generate_content_async(llm_request, stream):
+                ok = ok and not response.error_code
+                yield response
+        except Exception:
+            circuit_breaker.record(False, time.monotonic() - started)
+            raise
+        except BaseException:
+            circuit_breaker.cancelled()
+            raise
+        circuit_breaker.record(ok, time.monotonic() - started)
@@ -1,43 +1,43 @@
 import os
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.memory import InMemoryMemoryService
 from google.adk.tools import load_memory, preload_memory
-from google.adk.tools import AgentTool
 from agents.tools.account_tools import identify_user
-from agents.db_agent import db_agent
+from agents.db_agent import data_access_instruction, data_access_tools
+from agents.llm import TieredGemini
+from agents.memory_service import BoundedMemoryService
+from agents.session_service import PostgresSessionService
+from models.models import ConversationSessionConcierge, ConversationEventConcierge
 
-from agents.utils import load_instruction, retry_config
+from agents.utils import load_instruction
 
 API_KEY = os.getenv("GOOGLE_API_KEY")
-LLM_MODEL = "gemini-2.5-flash"
 APP_NAME = "Base Agent"
 USER_ID = "guest_user"
 
 
 concierge_agent = LlmAgent(
     name="concierge_assistant",
-    model=Gemini(model=LLM_MODEL, retry_options=retry_config),
+    model=TieredGemini(agent_name="concierge_assistant"),
     description="A helpful healthcare assistant.",
-    instruction=load_instruction(
-        os.path.join(os.path.dirname(__file__), "instructions", "concierge_agent.txt")
+    instruction=data_access_instruction(
+        load_instruction(os.path.join(os.path.dirname(__file__), "instructions", "concierge_agent.txt"))
     ),
     tools=[
         # google_search,
         load_memory,
         preload_memory,
         identify_user,
-        AgentTool(agent=db_agent),
+        *data_access_tools(),
     ],
 )
 
 
 print("✅ Agents created")
 
-session_service = InMemorySessionService()  # Handles conversations
-memory_service = InMemoryMemoryService()
+# Handles conversations; persisted so every worker sees the same sessions
+session_service = PostgresSessionService(ConversationSessionConcierge, ConversationEventConcierge)
+memory_service = BoundedMemoryService()
 
 
 # Create runner with BOTH services
@@ -1,31 +1,58 @@
 import os
+from typing import Callable, List, Optional, Sequence
+
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
+from google.adk.tools import AgentTool
 from google.adk.tools.function_tool import FunctionTool
 
+from agents.llm import TieredGemini
+from agents.tools.encoding import compact_tool
 from agents.tools.patient_tools import handle_patient_action
 from agents.tools.carer_tools import handle_carer_action
 from agents.tools.user_tools import handle_user_action
 from agents.tools.condition_tools import handle_condition_action
 from agents.tools.medication_tools import handle_medication_action
-from agents.utils import load_instruction, retry_config
+from agents.utils import load_instruction
+from config import settings
+
+INSTRUCTIONS_DIR = os.path.join(os.path.dirname(__file__), "instructions")
 
-LLM_MODEL = "gemini-2.5-flash"
+DB_HANDLERS = [
+    handle_patient_action,
+    handle_carer_action,
+    handle_user_action,
+    handle_condition_action,
+    handle_medication_action,
+]
+# Data requirements and allowed operations of the handle_*_action tools
+DB_TOOLS_REFERENCE = load_instruction(os.path.join(INSTRUCTIONS_DIR, "db_tools.txt"))
 
 db_agent = LlmAgent(
     name="db_assistant",
-    model=Gemini(model=LLM_MODEL, retry_options=retry_config),
+    model=TieredGemini(agent_name="db_assistant"),
     description="A helpful DB assistant",
-    instruction=load_instruction(
-        os.path.join(os.path.dirname(__file__), "instructions", "db_agent.txt")
-    ),
-    tools=[
-            handle_patient_action,
-            handle_carer_action,
-            handle_user_action,
-            handle_condition_action,
-            handle_medication_action,
-    ],
+    instruction=load_instruction(os.path.join(INSTRUCTIONS_DIR, "db_agent.txt")) + "\n\n" + DB_TOOLS_REFERENCE,
+    tools=[compact_tool(handler) for handler in DB_HANDLERS],
 )
 
+
+def data_access_tools(handlers: Optional[Sequence[Callable]] = None, mode: Optional[str] = None) -> List:
+    """Database tools of a top-level agent, per AGENT_TOOL_MODE.
+
+    "nested": one AgentTool to db_assistant (a second LLM conversation per data request).
+    "flat": the given handle_*_action handlers themselves (all of them by default).
+    """
+    if (mode or settings.AGENT_TOOL_MODE) == "flat":
+        return [compact_tool(handler) for handler in (handlers or DB_HANDLERS)]
+    return [AgentTool(agent=db_agent)]
+
+
+def data_access_instruction(instruction: str, mode: Optional[str] = None) -> str:
+    """In flat mode, append how to call the tools directly plus their reference."""
+    if (mode or settings.AGENT_TOOL_MODE) == "flat":
+        addendum = load_instruction(os.path.join(INSTRUCTIONS_DIR, "flat_tools.txt"))
+        return "\n\n".join([instruction, addendum, DB_TOOLS_REFERENCE])
+    return instruction
+
+
 print("✅ DB Agents created")
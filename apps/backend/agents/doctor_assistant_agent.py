@@ -1,45 +1,52 @@
 import os
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
 from google.adk.runners import InMemoryRunner
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.memory import InMemoryMemoryService
 from google.adk.tools import load_memory, preload_memory
-from google.adk.tools import google_search, AgentTool, ToolContext
+from google.adk.tools import google_search, ToolContext
 from agents.tools.account_tools import identify_user
-from agents.db_agent import db_agent
-from agents.utils import load_instruction, retry_config
+from agents.db_agent import data_access_instruction, data_access_tools
+from agents.tools.condition_tools import handle_condition_action
+from agents.tools.medication_tools import handle_medication_action
+from agents.tools.patient_tools import handle_patient_action
+from agents.llm import TieredGemini
+from agents.memory_service import BoundedMemoryService
+from agents.session_service import PostgresSessionService
+from models.models import ConversationSessionDoctor, ConversationEventDoctor
+from agents.utils import load_instruction
 
 
 
 API_KEY = os.getenv("GOOGLE_API_KEY")
-LLM_MODEL = "gemini-2.5-flash"
 APP_NAME = "Doctor Assistant Agent"
 
 
 doctor_assistant_agent = LlmAgent(
     name="doctor_assistant",
-    model=Gemini(model=LLM_MODEL, retry_options=retry_config),
+    model=TieredGemini(agent_name="doctor_assistant"),
     description="Assistant for doctors only.",
-    instruction=load_instruction(
-        os.path.join(
-            os.path.dirname(__file__), "instructions", "doctor_assistant_agent.txt"
+    instruction=data_access_instruction(
+        load_instruction(
+            os.path.join(
+                os.path.dirname(__file__), "instructions", "doctor_assistant_agent.txt"
+            )
         )
     ),
     tools=[
         load_memory,
         preload_memory,
         identify_user,
-        AgentTool(agent=db_agent),
+        # flat mode: only the records a doctor works on
+        *data_access_tools([handle_patient_action, handle_condition_action, handle_medication_action]),
     ],
 )
 
 
 print("✅ Doctor Assistant Agents created")
 
-session_service = InMemorySessionService()  # Handles conversations
-memory_service = InMemoryMemoryService()
+# Handles conversations; persisted so every worker sees the same sessions
+session_service = PostgresSessionService(ConversationSessionDoctor, ConversationEventDoctor)
+memory_service = BoundedMemoryService()
 
 
 # Create runner with BOTH services
@@ -0,0 +1,178 @@
+import re
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from agents.tools.account_tools import current_user_context
+from agents.tools.carer_tools import handle_carer_action
+from agents.tools.condition_tools import handle_condition_action
+from agents.tools.medication_tools import handle_medication_action
+from config import settings
+from tracing import traced
+
+EMERGENCY_NOTE = (
+    "If you experience severe chest pain, difficulty breathing, sudden weakness, or severe bleeding, "
+    "please seek emergency care or call your local emergency number (dummy 911)."
+)
+MORE_NOTE = "There are more entries; ask me to show the rest."
+
+# Prompts are matched whole (after normalization), so anything beyond a plain request for
+# the user's own records - a name, a date, a follow-up question - goes to the agent.
+_PREFIX = (
+    r"(?:(?:hi|hello|hey) )?(?:please )?"
+    r"(?:(?:what|which|who) (?:are|is) |(?:can|could) you (?:show|list|tell|give)(?: me)? "
+    r"|(?:show|list|tell|give|get)(?: me)? )?"
+)
+_SUFFIX = r"(?: please)?"
+
+
+def _intent(body: str) -> "re.Pattern[str]":
+    return re.compile(_PREFIX + body + _SUFFIX)
+
+
+INTENTS: List[Tuple[str, "re.Pattern[str]"]] = [
+    (
+        "medications_today",
+        _intent(
+            r"(?:my (?:current |active )?(?:medications?|meds|medicines?|pills|medication schedule)"
+            r"|(?:what|which) (?:medications?|meds|medicines?|pills) (?:do|should) i (?:take|have))"
+            r"(?: (?:for )?today| now)?"
+        ),
+    ),
+    (
+        "conditions",
+        _intent(
+            r"(?:my (?:medical |health )?(?:conditions?|diagnos[ie]s)"
+            r"|(?:what|which) (?:medical |health )?conditions do i have)"
+        ),
+    ),
+    ("carers", _intent(r"(?:my (?:carers?|caregivers?)|who (?:is|are) my (?:carers?|caregivers?))")),
+]
+
+
+def normalize(prompt: str) -> str:
+    text = prompt.lower().replace("’", "'")
+    text = re.sub(r"[^a-z0-9' ]+", " ", text)
+    return " ".join(text.split())
+
+
+def _medications(result: Dict[str, Any]) -> str:
+    if not result["data"]:
+        return "You have no medications scheduled for today."
+    lines = ["Here are your medications for today:"]
+    for m in result["data"]:
+        line = f"- **{m['medication_name']}** {m.get('dosage') or ''}".rstrip()
+        if m.get("frequency"):
+            line += f", {m['frequency']}"
+        if m.get("intake_time"):
+            line += f" at {m['intake_time'][:5]}"
+        if m.get("status"):
+            line += f" ({m['status']})"
+        if m.get("remarks"):
+            line += f" - {m['remarks']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _conditions(result: Dict[str, Any]) -> str:
+    if not result["data"]:
+        return "There are no medical conditions on your record."
+    lines = ["These are the conditions on your record:"]
+    for c in result["data"]:
+        details = [d for d in (c.get("severity_level"), c.get("diagnosed_date") and f"diagnosed {c['diagnosed_date']}") if d]
+        lines.append(f"- **{c['condition_name']}**" + (f" ({', '.join(details)})" if details else ""))
+    return "\n".join(lines)
+
+
+def _carers(result: Dict[str, Any]) -> str:
+    if not result["data"]:
+        return "There is no carer on your record."
+    lines = ["Your carers on record:"]
+    for c in result["data"]:
+        line = f"- **{c['full_name']}**"
+        if c.get("relationship_to_patient"):
+            line += f" ({c['relationship_to_patient']})"
+        if c.get("contact_number"):
+            line += f", contact {c['contact_number']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+Handler = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+# intent -> (tool handler, action, payload builder, template)
+ROUTES: Dict[str, Tuple[Handler, str, Callable[[int], Dict[str, Any]], Callable[[Dict[str, Any]], str]]] = {
+    "medications_today": (
+        handle_medication_action,
+        "list_medications",
+        lambda pid: {"patient_id": pid, "date_from": date.today(), "date_to": date.today()},
+        _medications,
+    ),
+    "conditions": (handle_condition_action, "list_conditions", lambda pid: {"patient_id": pid}, _conditions),
+    "carers": (handle_carer_action, "list_carers", lambda pid: {"patient_id": pid}, _carers),
+}
+
+
+class FastPathRouter:
+    """Answers a few well-defined read requests of an identified patient without the LLM.
+
+    A prompt is routed only when it matches one intent pattern as a whole and the user is a
+    patient linked to a patient record; the tool handler is then called directly and its
+    result rendered with a template. Anything else (including a failed tool call) returns
+    None and the caller runs the agent as usual.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = settings.FAST_PATH_ENABLED if enabled is None else enabled
+        self.counters = {"turns": 0, "hits": 0, "misses": 0, "skipped": 0, "errors": 0}
+        self.by_intent: Dict[str, int] = {name: 0 for name, _ in INTENTS}
+
+    @staticmethod
+    def match(prompt: str) -> Optional[str]:
+        text = normalize(prompt)
+        if not text or len(text) > 80:
+            return None
+        return next((name for name, pattern in INTENTS if pattern.fullmatch(text)), None)
+
+    @traced("fast_path")
+    async def answer(self, prompt: str, first_turn: bool = False) -> Optional[str]:
+        """Rendered answer for the current user, or None to fall through to the agent."""
+        self.counters["turns"] += 1
+        ctx = current_user_context.get()
+        if not self.enabled or ctx.get("role") != "patient" or not ctx.get("patient_id"):
+            self.counters["skipped"] += 1
+            return None
+        intent = self.match(prompt)
+        if intent is None:
+            self.counters["misses"] += 1
+            return None
+
+        handler, action, build_payload, render = ROUTES[intent]
+        try:
+            result = await handler(action, build_payload(ctx["patient_id"]))
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+        if result.get("status") != "success":
+            self.counters["errors"] += 1
+            print(f"⚠️ Fast path {intent} fell back to the agent: {result.get('message')}")
+            return None
+
+        self.counters["hits"] += 1
+        self.by_intent[intent] += 1
+        text = render(result)
+        if result.get("more"):
+            text += f"\n\n{MORE_NOTE}"
+        if first_turn:
+            text += f"\n\n{EMERGENCY_NOTE}"
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        turns = self.counters["turns"]
+        return {
+            **self.counters,
+            "enabled": self.enabled,
+            "by_intent": self.by_intent,
+            "hit_rate": round(self.counters["hits"] / turns, 3) if turns else None,
+        }
+
+
+fast_path = FastPathRouter()
@@ -0,0 +1,116 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Type
+
+from config import settings
+from database import AsyncSessionLocal
+
+
+class HistoryWriter:
+    """Optional write-behind queue for conversation messages.
+
+    Turns are queued in memory (up to `max_queue`; `submit` waits for room beyond that)
+    and flushed in batches: one transaction per service with a multi-row session upsert
+    and a multi-row message INSERT. Services whose transaction committed leave the batch,
+    so a retry only writes what is left. A batch still failing after `max_attempts` is
+    written turn by turn and the turns that still fail are logged and dropped, so one bad
+    row cannot block the queue. `stop()` drains whatever is left.
+
+    Messages get their created_at from the database on insert, as on the direct path, so
+    history pages are ordered by one clock either way.
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_queue: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        self.batch_size = batch_size or settings.HISTORY_WRITE_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.HISTORY_WRITE_FLUSH_SECONDS
+        self.max_attempts = max_attempts or settings.HISTORY_WRITE_MAX_ATTEMPTS
+        self._queue: "asyncio.Queue[tuple]" = asyncio.Queue(maxsize=max_queue or settings.HISTORY_WRITE_MAX_QUEUE)
+        self._inflight: list = []  # batch being flushed; goes first again if interrupted
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        while self._inflight or not self._queue.empty():
+            batch, self._inflight = self._inflight + self._take(self.batch_size), []
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                print(f"⚠️ History write-behind flush failed on shutdown, writing turn by turn: {e}")
+                await self._flush_each(batch)
+
+    async def submit(
+        self, service_cls: Type[Any], session: Dict[str, Any], messages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Queue a turn, waiting while the queue is full. Returns the queued messages,
+        which get their id and created_at once they are flushed."""
+        await self._queue.put((service_cls, session, messages))
+        return messages
+
+    def _take(self, n: int) -> list:
+        batch = []
+        while len(batch) < n and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        attempts = 0
+        while True:
+            if not self._inflight:
+                self._inflight = [await self._queue.get()]
+                await asyncio.sleep(self.flush_interval)  # let a batch build up
+                self._inflight += self._take(self.batch_size - 1)
+                attempts = 0
+            try:
+                await self._flush(self._inflight)
+            except Exception as e:
+                attempts += 1
+                if attempts < self.max_attempts:
+                    print(f"⚠️ History write-behind flush failed ({attempts}/{self.max_attempts}), retrying: {e}")
+                    await asyncio.sleep(self.flush_interval)
+                    continue
+                await self._flush_each(self._inflight)
+
+    async def _flush(self, batch: list) -> None:
+        """Write the batch, one transaction per service; committed turns are removed from it."""
+        for service_cls in dict.fromkeys(t[0] for t in batch):
+            turns = [t for t in batch if t[0] is service_cls]
+            sessions = {session["session_id"]: session for _, session, _ in turns}
+            rows = [m for _, _, messages in turns for m in messages]
+            async with AsyncSessionLocal() as db:
+                stored = await service_cls(db).record(list(sessions.values()), rows)
+            for message, row in zip(rows, stored):  # lets readers of the queued dicts tell they are stored
+                message.update(id=row.id, created_at=row.created_at)
+            batch[:] = [t for t in batch if t[0] is not service_cls]
+
+    async def _flush_each(self, batch: list) -> None:
+        """Last attempt for a failing batch: one turn per transaction, dropping those that fail."""
+        while batch:
+            turn = batch[0]
+            try:
+                await self._flush([turn])
+            except Exception as e:
+                print(f"⚠️ History write-behind dropped a turn of session {turn[1]['session_id']}: {e}")
+            batch.pop(0)
+
+
+history_writer = HistoryWriter()
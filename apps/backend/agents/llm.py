@@ -0,0 +1,247 @@
+import asyncio
+import re
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from opentelemetry import trace
+from pydantic import Field, PrivateAttr
+
+from agents.circuit_breaker import GuardedGemini
+from agents.usage import current_turn_usage
+from agents.utils import retry_config
+from config import settings
+from tracing import tracer
+
+TIERS = ("light", "strong")
+
+# "auto" small talk: a greeting, thanks or question about the assistant, with nothing clinical
+# or about records in it ("hi, I have chest pain" stays on the strong model)
+_SMALL_TALK = re.compile(
+    r"^(?:hi|hello|hey|good (?:morning|afternoon|evening)|thanks?|thank you|cheers|ok(?:ay)?|bye|goodbye"
+    r"|see you|how are you|who are you|what (?:can|do) you (?:do|help))\b"
+)
+_NOT_SMALL_TALK = re.compile(
+    r"\d|\b(?:pain|hurts?|ache|chest|breath\w*|bleed\w*|blood|faint\w*|dizz\w*|fever|sick|ill|emergency|urgent"
+    r"|allerg\w*|dose|doses|overdose|symptoms?|medications?|meds|medicines?|pills|conditions?|diagnos[ie]s"
+    r"|doctor|dr|appointments?|records?|patients?|carers?|schedule)\b"
+)
+
+
+class TierStats:
+    """Latency and token counters of one model tier (per process)."""
+
+    def __init__(self):
+        self.latencies: deque = deque(maxlen=500)  # seconds of successful calls
+        self.counters = {
+            "calls": 0,
+            "errors": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+        }
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None (hedging off or too few samples yet)."""
+        if not settings.LLM_HEDGE_ENABLED or len(self.latencies) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return self.percentile(settings.LLM_HEDGE_PERCENTILE)
+
+    def add_usage(self, response: LlmResponse) -> None:
+        usage = response.usage_metadata
+        if usage and not response.partial:
+            self.counters["prompt_tokens"] += usage.prompt_token_count or 0
+            self.counters["output_tokens"] += usage.candidates_token_count or 0
+
+    def stats(self) -> Dict[str, Any]:
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            **self.counters,
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "avg_ms": ms(sum(self.latencies) / len(self.latencies)) if self.latencies else None,
+        }
+
+
+tier_stats = {tier: TierStats() for tier in TIERS}
+
+
+def tier_model(tier: str) -> str:
+    return settings.LLM_MODEL_LIGHT if tier == "light" else settings.LLM_MODEL_STRONG
+
+
+def choose_tier(agent_name: str, llm_request: LlmRequest) -> str:
+    """Tier for one model call, per LLM_AGENT_TIERS ("light", "strong" or "auto").
+
+    "auto" uses the light model only for small talk: the call answers a short user message
+    directly (not a tool result) that opens with a greeting, thanks or a question about the
+    assistant and names nothing clinical or record-related. Everything else is "strong".
+    """
+    policy = settings.LLM_AGENT_TIERS.get(agent_name, "strong")
+    if policy != "auto":
+        return policy if policy in TIERS else "strong"
+    last = llm_request.contents[-1] if llm_request.contents else None
+    if last is None or last.role != "user" or any(p.function_response for p in last.parts or []):
+        return "strong"
+    text = " ".join("".join(p.text or "" for p in last.parts or []).lower().split())
+    if len(text) > settings.LLM_SMALL_TALK_MAX_CHARS or not _SMALL_TALK.match(text) or _NOT_SMALL_TALK.search(text):
+        return "strong"
+    return "light"
+
+
+async def _replay(responses: List[LlmResponse]) -> AsyncGenerator[LlmResponse, None]:
+    for response in responses:
+        yield response
+
+
+def _end_span(current, responses: List[LlmResponse]) -> None:
+    usage = next((r.usage_metadata for r in reversed(responses) if r.usage_metadata and not r.partial), None)
+    if usage:
+        current.set_attribute("llm.prompt_tokens", usage.prompt_token_count or 0)
+        current.set_attribute("llm.output_tokens", usage.candidates_token_count or 0)
+    current.end()
+
+
+async def _collect(backend: BaseLlm, llm_request: LlmRequest) -> List[LlmResponse]:
+    return [r async for r in backend.generate_content_async(llm_request, stream=False)]
+
+
+def _copy_request(llm_request: LlmRequest) -> LlmRequest:
+    """Copy of the parts Gemini mutates (contents, config), so a hedge does not share them."""
+    return llm_request.model_copy(
+        update={
+            "contents": [c.model_copy(deep=True) for c in llm_request.contents],
+            "config": llm_request.config.model_copy(deep=True) if llm_request.config else None,
+        }
+    )
+
+
+class TieredGemini(BaseLlm):
+    """Gemini with per-agent model tiers and optional hedging of slow calls.
+
+    Each call is routed to the light or strong model (see choose_tier), goes through the
+    circuit breaker (GuardedGemini) and is recorded in tier_stats and the turn's usage. With LLM_HEDGE_ENABLED,
+    a non-streaming call still running after the tier's p95 latency gets a second, identical
+    request; the first successful answer wins and the other is cancelled.
+    """
+
+    model: str = Field(default_factory=lambda: settings.LLM_MODEL_STRONG)
+    agent_name: str
+    _backends: Dict[str, BaseLlm] = PrivateAttr(default_factory=dict)
+
+    def set_backends(self, backends: Dict[str, BaseLlm]) -> Dict[str, BaseLlm]:
+        """Serve the given model names from these backends instead of Gemini (benchmarks,
+        replays). Models not in the mapping get a GuardedGemini again on first use.
+        Returns the previous backends, to hand back here when done."""
+        previous, self._backends = self._backends, dict(backends)
+        return previous
+
+    def _backend(self, model_name: str) -> BaseLlm:
+        if model_name not in self._backends:
+            self._backends[model_name] = GuardedGemini(model=model_name, retry_options=retry_config)
+        return self._backends[model_name]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        tier = choose_tier(self.agent_name, llm_request)
+        llm_request.model = tier_model(tier)
+        backend = self._backend(llm_request.model)
+        stats = tier_stats[tier]
+        stats.counters["calls"] += 1
+        turn_usage = current_turn_usage.get()
+        if turn_usage is not None:
+            turn_usage.add_call(self.agent_name)
+        current = tracer.start_span(
+            f"llm {self.agent_name}",
+            attributes={"app.kind": "llm", "app.agent": self.agent_name, "app.tier": tier, "app.model": llm_request.model},
+        )
+        try:
+            if stream:
+                responses = self._streamed(backend, llm_request, stats, current)
+            else:
+                # collected before yielding, so tool calls run by the caller do not count as model time
+                with trace.use_span(current, end_on_exit=False):
+                    started = time.monotonic()
+                    delay = stats.hedge_delay()
+                    if delay is None:
+                        result = await _collect(backend, llm_request)
+                    else:
+                        result = await self._hedged(backend, llm_request, delay, stats)
+                    stats.latencies.append(time.monotonic() - started)
+                _end_span(current, result)
+                responses = _replay(result)
+            async for response in responses:
+                stats.add_usage(response)
+                if turn_usage is not None:
+                    turn_usage.add_response(self.agent_name, llm_request.model, response)
+                yield response
+        except Exception:
+            stats.counters["errors"] += 1  # recorded on the span by use_span
+            raise
+        finally:
+            if current.is_recording():
+                current.end()
+
+    @staticmethod
+    async def _streamed(
+        backend: BaseLlm, llm_request: LlmRequest, stats: TierStats, current
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """Stream through, timing only the waits on the model (not the caller's work between chunks)."""
+        chunks = backend.generate_content_async(llm_request, stream=True)
+        busy, seen = 0.0, []
+        while True:
+            started = time.monotonic()
+            with trace.use_span(current, end_on_exit=False):
+                try:
+                    response = await chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    busy += time.monotonic() - started
+            seen.append(response)
+            yield response
+        stats.latencies.append(busy)
+        current.set_attribute("app.response_seconds", busy)
+        _end_span(current, seen)
+
+    @staticmethod
+    async def _hedged(backend: BaseLlm, llm_request: LlmRequest, delay: float, stats: TierStats) -> List[LlmResponse]:
+        hedge_request = _copy_request(llm_request)
+        primary = asyncio.create_task(_collect(backend, llm_request))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                stats.counters["hedged"] += 1
+                trace.get_current_span().set_attribute("llm.hedged", True)
+                tasks.add(asyncio.create_task(_collect(backend, hedge_request)))
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            stats.counters["hedge_wins"] += 1
+                        return task.result()
+            raise task.exception()  # every attempt failed
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def llm_stats() -> Dict[str, Any]:
+    return {
+        tier: {"model": tier_model(tier), **tier_stats[tier].stats()} for tier in TIERS
+    }
@@ -0,0 +1,124 @@
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+
+from google.adk.memory import BaseMemoryService
+from google.adk.memory.base_memory_service import SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.sessions import Session
+
+from config import settings
+from tracing import traced
+
+
+def _user_key(app_name: str, user_id: str) -> str:
+    return f"{app_name}/{user_id}"
+
+
+def _words(text: str) -> set:
+    return {w.lower() for w in re.findall(r"[A-Za-z]+", text)}
+
+
+class _UserMemory:
+    """Memory entries of one user plus per-session ingestion watermarks."""
+
+    def __init__(self):
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()  # event_id -> entry, oldest first
+        self.watermarks: Dict[str, float] = {}                   # session_id -> last ingested timestamp
+        self.size_bytes = 0
+
+
+class BoundedMemoryService(BaseMemoryService):
+    """Keyword memory (like InMemoryMemoryService) with delta ingestion and eviction.
+
+    `add_session_to_memory` only indexes events newer than the last ingestion of that
+    session. Each user keeps at most `max_entries_per_user` entries (oldest evicted first),
+    entries expire after `ttl_seconds`, and only the `max_users` most recently used users
+    are kept.
+    """
+
+    def __init__(
+        self,
+        max_entries_per_user: Optional[int] = None,
+        max_users: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+    ):
+        self.max_entries_per_user = max_entries_per_user or settings.MEMORY_MAX_ENTRIES_PER_USER
+        self.max_users = max_users or settings.MEMORY_MAX_USERS
+        self.ttl_seconds = ttl_seconds or settings.MEMORY_TTL_SECONDS
+        self._users: "OrderedDict[str, _UserMemory]" = OrderedDict()  # LRU, least recent first
+
+    def _touch(self, user_key: str) -> _UserMemory:
+        mem = self._users.get(user_key)
+        if mem is None:
+            mem = self._users[user_key] = _UserMemory()
+        self._users.move_to_end(user_key)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        return mem
+
+    def _evict(self, mem: _UserMemory) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        while mem.entries:
+            entry = next(iter(mem.entries.values()))
+            if len(mem.entries) <= self.max_entries_per_user and entry["stored_at"] >= cutoff:
+                break
+            mem.entries.popitem(last=False)
+            mem.size_bytes -= entry["size"]
+
+    @traced("memory.add_session")
+    async def add_session_to_memory(self, session: Session):
+        mem = self._touch(_user_key(session.app_name, session.user_id))
+        watermark = mem.watermarks.get(session.id, 0.0)
+        now = time.time()
+
+        for event in session.events:
+            if event.timestamp <= watermark or not event.content or not event.content.parts:
+                continue
+            text = " ".join(p.text for p in event.content.parts if p.text)
+            if not text:
+                continue
+            size = len(text.encode("utf-8"))
+            mem.entries[event.id] = {
+                "words": _words(text),
+                "memory": MemoryEntry(
+                    content=event.content,
+                    author=event.author,
+                    timestamp=datetime.fromtimestamp(event.timestamp).isoformat(),
+                ),
+                "stored_at": now,
+                "size": size,
+            }
+            mem.size_bytes += size
+
+        if session.events:
+            mem.watermarks[session.id] = max(watermark, session.events[-1].timestamp)
+        self._evict(mem)
+
+    @traced("memory.search")
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        response = SearchMemoryResponse()
+        user_key = _user_key(app_name, user_id)
+        if user_key not in self._users:
+            return response
+
+        mem = self._touch(user_key)
+        self._evict(mem)
+        query_words = _words(query)
+        for entry in mem.entries.values():
+            if query_words & entry["words"]:
+                response.memories.append(entry["memory"])
+        return response
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Entry count, approximate text bytes and tracked sessions per user."""
+        return {
+            user_key: {
+                "entries": len(mem.entries),
+                "bytes": mem.size_bytes,
+                "sessions": len(mem.watermarks),
+            }
+            for user_key, mem in self._users.items()
+        }
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from agents.fast_path import normalize
+from agents.tools.account_tools import current_user_context
+from config import settings
+
+# Tools a turn may call and still be cached: their results are covered by the key
+CACHEABLE_TOOLS = {"identify_user"}
+
+# Prompts that carry personal data are not looked up
+_PERSONAL = re.compile(
+    r"\d|@|\b(?:medications?|meds|medicines?|pills|conditions?|diagnos[ie]s|carers?|caregivers?|"
+    r"appointments?|records?|patients?|symptoms?|doctor|dr|referrals?|schedule|remember|forget)\b"
+)
+
+
+class ResponseCache:
+    """LRU + TTL cache of final concierge answers for generic, self-contained questions.
+
+    Keyed by (agent, normalized prompt, user-context hash), so two users only share an entry
+    when their contexts are identical (e.g. guests). Only the first turn of a session is
+    cached: later answers depend on the conversation so far, which the key does not cover.
+    A turn is stored only if it made no tool calls besides CACHEABLE_TOOLS; personal
+    prompts bypass the cache.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[int] = None):
+        self.enabled = settings.RESPONSE_CACHE_ENABLED
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.RESPONSE_CACHE_TTL_SECONDS
+        self._entries: "OrderedDict[Tuple[str, str, str], tuple]" = OrderedDict()  # -> (expires_at, text)
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "stores": 0,
+            "tool_turns": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    @staticmethod
+    def _context_hash() -> str:
+        ctx = current_user_context.get()
+        return hashlib.sha1(json.dumps(ctx, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+    def key(self, agent_name: str, prompt: str, first_turn: bool) -> Optional[Tuple[str, str, str]]:
+        """Cache key of a turn, or None (counted as bypassed) when the turn must not be cached."""
+        text = normalize(prompt)
+        if (
+            not self.enabled
+            or not first_turn
+            or len(text.split()) < 3
+            or len(text) > 200
+            or _PERSONAL.search(text)
+        ):
+            self.counters["bypassed"] += 1
+            return None
+        return agent_name, text, self._context_hash()
+
+    def get(self, key: Optional[tuple]) -> Optional[str]:
+        if key is None:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return entry[1]
+            del self._entries[key]
+            self.counters["expirations"] += 1
+        self.counters["misses"] += 1
+        return None
+
+    def put(self, key: Optional[tuple], text: str, tools_called: Iterable[str] = ()) -> None:
+        if key is None or not text:
+            return
+        if set(tools_called) - CACHEABLE_TOOLS:
+            self.counters["tool_turns"] += 1
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, text)
+        self._entries.move_to_end(key)
+        self.counters["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        turns = lookups + self.counters["bypassed"]
+        return {
+            **self.counters,
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else None,
+            "turn_hit_rate": round(self.counters["hits"] / turns, 3) if turns else None,
+        }
+
+
+response_cache = ResponseCache()
@@ -1,43 +1,48 @@
 from uuid import uuid4
-from typing import Optional, List, Dict
+from typing import Any, Literal, Optional, List, Dict
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
+from google.adk.events import Event
 from google.genai import types
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from agents.concierge_agent import runner, session_service, memory_service, APP_NAME, USER_ID
+from agents.concierge_agent import concierge_agent, runner, session_service, memory_service, APP_NAME, USER_ID
+from agents.admission import AdmissionRejected, admission, too_busy
+from agents.circuit_breaker import FALLBACK_MESSAGE, CircuitOpen, circuit_breaker
+from agents.fast_path import fast_path
+from agents.response_cache import response_cache
+from agents.tools.account_tools import current_user_context
+from agents.turns import TurnCancelled, run_turn, turn_deadline
+from agents.usage import TurnUsage
 from agents.user_context import update_user_context_from_db
-from database import get_db
-from models.models import ConversationSessionConcierge, ConversationMessageConcierge
-from google.adk.sessions import InMemorySessionService
+from agents.history_writer import history_writer
+from agents.utils import event_to_chunks, streaming_run_config, to_ndjson
+from config import settings
+from database import AsyncSessionLocal, get_db
+from services.conversation_service import ConciergeMessageService, add_queued, message_to_dict, page_to_payload
+from models.models import ConversationSessionConcierge
+from tracing import traced
 
 router = APIRouter()
 
 
 class AskRequest(BaseModel):
+    """One turn. "full" mode answers with the session's latest history page; with
+    HISTORY_WRITE_BEHIND the turn's messages are still queued, so they are appended to
+    the page (without ids until stored) and the cursors only cover stored messages.
+    """
+
     prompt: str
     session_id: Optional[str] = None
     user_name: Optional[str] = None
-
-
-async def _ensure_db_session(db: AsyncSession, session_id: str, user_id: str):
-    session_row = await db.scalar(
-        select(ConversationSessionConcierge).where(ConversationSessionConcierge.session_id == session_id)
-    )
-    if session_row:
-        return session_row
-
-    session_row = ConversationSessionConcierge(
-        session_id=session_id,
-        app_name=APP_NAME,
-        user_id=user_id,
-    )
-    db.add(session_row)
-    await db.commit()
-    await db.refresh(session_row)
-    return session_row
+    # "delta" returns only this turn's messages + cursor instead of a history page
+    response_mode: Literal["full", "delta"] = "full"
+    # client's time budget for the turn; the run is cancelled once it passes
+    deadline_ms: Optional[int] = None
 
 
 async def _get_latest_session_id(db: AsyncSession, user_id: str) -> Optional[str]:
@@ -49,79 +54,275 @@ async def _get_latest_session_id(db: AsyncSession, user_id: str) -> Optional[str
     return row
 
 
-async def _append_message(db: AsyncSession, session_id: str, role: str, content: str):
-    msg = ConversationMessageConcierge(session_id=session_id, role=role, content=content)
-    db.add(msg)
-    await db.commit()
+@traced("history.record")
+async def _record_turn(
+    db: AsyncSession,
+    session_id: str,
+    user_id: str,
+    prompt: str,
+    assistant_text: str,
+    usage: Optional[TurnUsage] = None,
+):
+    """Persist the session row and the turn's messages in one transaction (or queue them).
+
+    The turn's token usage, if the model was called, goes on its last message.
+    """
+    session_row = {"session_id": session_id, "app_name": APP_NAME, "user_id": user_id}
+    messages = [{"session_id": session_id, "user_id": user_id, "role": "user", "content": prompt}]
+    if assistant_text:
+        messages.append({"session_id": session_id, "user_id": user_id, "role": "assistant", "content": assistant_text})
+    if usage is not None and usage.llm_calls:
+        messages[-1].update(usage.columns())
+
+    if history_writer.enabled:
+        return await history_writer.submit(ConciergeMessageService, session_row, messages)
+    return await ConciergeMessageService(db).record([session_row], messages)
+
+
+async def _load_history(
+    db: AsyncSession,
+    session_id: str,
+    limit: Optional[int] = None,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+) -> Dict[str, Any]:
+    """One keyset page of a session's messages (latest page when no cursor is given)."""
+    rows, has_more = await ConciergeMessageService(db).page(
+        session_id=session_id, limit=limit or settings.HISTORY_PAGE_SIZE, before=before, after=after
+    )
+    return page_to_payload(rows, has_more)
+
 
+def _turn_delta(messages: List[Any]) -> Dict[str, Any]:
+    """Only the messages written in this turn, plus the cursor to resume history from.
 
-async def _load_history(db: AsyncSession, session_id: str) -> List[Dict[str, str]]:
-    rows = (
-        await db.scalars(
-            select(ConversationMessageConcierge)
-            .where(ConversationMessageConcierge.session_id == session_id)
-            .order_by(ConversationMessageConcierge.created_at)
-        )
-    ).all()
-    return [{"role": r.role, "content": r.content, "timestamp": r.created_at.isoformat() if r.created_at else None} for r in rows]
+    With HISTORY_WRITE_BEHIND the messages are only queued: they have no id or timestamp
+    yet and the cursor is None, so clients keep resuming from the cursor they had.
+    """
+    delta = [message_to_dict(m) for m in messages]
+    return {"messages": delta, "cursor": delta[-1]["id"]}
 
 
 async def _get_or_create_session(session_id: str, user_id: str):
     """Ensure a session exists in the session service."""
-    try:
-        return await session_service.create_session(
-            app_name=APP_NAME, user_id=user_id, session_id=session_id
-        )
-    except Exception:
-        return await session_service.get_session(
-            app_name=APP_NAME, user_id=user_id, session_id=session_id
-        )
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id=user_id, session_id=session_id
+    )
+    if session:
+        return session
+    return await session_service.create_session(
+        app_name=APP_NAME, user_id=user_id, session_id=session_id
+    )
 
 
-@router.post("/ask")
-async def ask_agent(req: AskRequest, db: AsyncSession = Depends(get_db)):
+async def _remember_turn(user_id: str, session_id: str):
+    """Index the turn's new events into memory; runs after the response is sent."""
+    session = await session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    if session:
+        await memory_service.add_session_to_memory(session)
+
+
+async def _start_turn(db: AsyncSession, req: AskRequest):
+    """Resolve user + session, ready for the run. Returns (user_id, session)."""
     user_id = (req.user_name or "").strip() or USER_ID
     await update_user_context_from_db(db, user_id)
     session_id = req.session_id
     if not session_id:
         session_id = await _get_latest_session_id(db, user_id) or str(uuid4())
+    await db.commit()  # return the connection to the pool; the turn may queue and run for seconds
 
     session = await _get_or_create_session(session_id=session_id, user_id=user_id)
-    await memory_service.add_session_to_memory(session)
+    return user_id, session
 
-    print("✅ Session added to memory!")
 
-    session_id = session.id  # ensure we use runner session id
-    await _ensure_db_session(db, session_id, user_id=user_id)
+async def _shortcut_turn(session, prompt: str):
+    """Answer without the agent when possible: fast path first, then the response cache.
+
+    Returns (text or None, cache key for storing the agent's answer). A shortcut answer is
+    still added to the session as a user + model event pair.
+    """
+    first_turn = not session.events
+    text = await fast_path.answer(prompt, first_turn=first_turn)
+    cache_key = None
+    if text is None:
+        cache_key = response_cache.key(concierge_agent.name, prompt, first_turn)
+        text = response_cache.get(cache_key)
+    if text is None:
+        return None, cache_key
 
-    await _append_message(db, session_id, "user", req.prompt)
+    invocation_id = f"e-{uuid4()}"
+    async with session_service.turn(session.id):
+        for author, role, part_text in (("user", "user", prompt), (concierge_agent.name, "model", text)):
+            content = types.Content(role=role, parts=[types.Part(text=part_text)])
+            event = Event(invocation_id=invocation_id, author=author, content=content)
+            await session_service.append_event(session, event)
+    return text, None
+
+
+@router.post("/ask")
+async def ask_agent(
+    req: AskRequest, request: Request, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)
+):
+    deadline = turn_deadline(req.deadline_ms)
+    user_id, session = await _start_turn(db, req)
+    session_id = session.id  # ensure we use runner session id
 
     query_content = types.Content(role="user", parts=[types.Part(text=req.prompt)])
-    assistant_text = ""
+    assistant_text, cache_key = await _shortcut_turn(session, req.prompt)
 
-    async for event in runner.run_async(
-        user_id=user_id,
-        session_id=session_id,
-        new_message=query_content
-    ):
-        if event.is_final_response() and event.content and event.content.parts:
-            assistant_text = event.content.parts[0].text or ""
+    cancelled = None
+    usage = TurnUsage()
+    if assistant_text is None:
+        assistant_text, tools_called = "", []
+        try:
+            if circuit_breaker.is_open():
+                raise CircuitOpen()
+            async with admission.slot(user_id, current_user_context.get()["role"]), session_service.turn(session_id):
+                async for event in run_turn(
+                    runner,
+                    user_id=user_id,
+                    session_id=session_id,
+                    new_message=query_content,
+                    deadline=deadline,
+                    request=request,
+                    usage=usage,
+                ):
+                    tools_called += [call.name for call in event.get_function_calls()]
+                    if event.is_final_response() and event.content and event.content.parts:
+                        assistant_text = event.content.parts[0].text or ""
+            response_cache.put(cache_key, assistant_text, tools_called)
+        except AdmissionRejected as e:
+            raise too_busy(e)
+        except CircuitOpen:
+            assistant_text = FALLBACK_MESSAGE
+        except TurnCancelled as e:
+            cancelled = e
+    background_tasks.add_task(_remember_turn, user_id, session_id)
 
-    if assistant_text:
-        await _append_message(db, session_id, "assistant", assistant_text)
+    turn_messages = await _record_turn(db, session_id, user_id, req.prompt, assistant_text, usage)
+    if cancelled:
+        raise HTTPException(status_code=504, detail=str(cancelled))
 
-    history = await _load_history(db, session_id)
+    if req.response_mode == "delta":
+        return {"response": assistant_text, "session_id": session_id, **_turn_delta(turn_messages)}
+
+    page = await _load_history(db, session_id)
+    if history_writer.enabled:
+        add_queued(page, turn_messages)
 
     return {
         "response": assistant_text,
         "session_id": session_id,
-        "history": history,
+        **page,
     }
 
 
+@router.post("/ask/stream")
+async def ask_agent_stream(req: AskRequest):
+    """Same turn as /ask, streamed as NDJSON: session, delta, tool_call, tool_result, final.
+
+    Admission happens before the stream starts, so an overloaded worker answers 429.
+    The run is cancelled at the deadline or when the client goes away.
+    """
+    deadline = turn_deadline(req.deadline_ms)
+    async with AsyncSessionLocal() as db:
+        user_id, session = await _start_turn(db, req)
+    session_id = session.id
+    turn = {"user_id": user_id, "session_id": session_id}
+
+    shortcut_text, cache_key = await _shortcut_turn(session, req.prompt)
+    if shortcut_text is None and circuit_breaker.is_open():
+        shortcut_text = FALLBACK_MESSAGE
+    ticket = None
+    if shortcut_text is None:
+        try:
+            ticket = await admission.acquire(user_id, current_user_context.get()["role"])
+        except AdmissionRejected as e:
+            raise too_busy(e)
+
+    async def event_stream():
+        # Own DB session: the response body outlives the request dependency scope
+        async with AsyncSessionLocal() as db:
+            yield to_ndjson({"type": "session", "session_id": session_id})
+
+            query_content = types.Content(role="user", parts=[types.Part(text=req.prompt)])
+            assistant_text = ""
+            usage = TurnUsage()
+            try:
+                if shortcut_text is not None:
+                    assistant_text = shortcut_text
+                    yield to_ndjson({"type": "delta", "text": shortcut_text})
+                else:
+                    tools_called = []
+                    # tool writes are rolled back if the run fails, times out or the client goes away
+                    async with session_service.turn(session_id):
+                        async for event in run_turn(
+                            runner,
+                            user_id=user_id,
+                            session_id=session_id,
+                            new_message=query_content,
+                            deadline=deadline,
+                            run_config=streaming_run_config,
+                            usage=usage,
+                        ):
+                            for chunk in event_to_chunks(event):
+                                yield to_ndjson(chunk)
+                            tools_called += [call.name for call in event.get_function_calls()]
+                            if event.is_final_response() and event.content and event.content.parts:
+                                assistant_text = event.content.parts[0].text or ""
+                    response_cache.put(cache_key, assistant_text, tools_called)
+            except CircuitOpen:
+                assistant_text = FALLBACK_MESSAGE
+                yield to_ndjson({"type": "delta", "text": assistant_text})
+            except Exception as e:
+                yield to_ndjson({"type": "error", "message": str(e)})
+            finally:
+                if ticket:
+                    ticket.release()
+
+            turn_messages = await _record_turn(db, session_id, user_id, req.prompt, assistant_text, usage)
+
+            yield to_ndjson(
+                {"type": "final", "response": assistant_text, "session_id": session_id, **_turn_delta(turn_messages)}
+            )
+
+    async def remember():
+        if ticket:
+            ticket.release()  # no-op unless the stream never ran
+        await _remember_turn(**turn)
+
+    return StreamingResponse(
+        event_stream(), media_type="application/x-ndjson", background=BackgroundTask(remember)
+    )
+
+
+@router.get("/ask/memory")
+async def memory_usage():
+    """Per-user memory size of the concierge agent in this worker."""
+    return {"app_name": APP_NAME, "users": memory_service.stats()}
+
+
+@router.get("/ask/fast_path")
+async def fast_path_stats():
+    """Turns answered without the LLM in this worker, overall and per intent."""
+    return fast_path.stats()
+
+
+@router.get("/ask/response_cache")
+async def response_cache_stats():
+    """Concierge answers served from the response cache in this worker."""
+    return response_cache.stats()
+
+
 @router.get("/ask/history")
-async def get_history(session_id: str, db: AsyncSession = Depends(get_db)):
-    history = await _load_history(db, session_id)
-    if not history:
+async def get_history(
+    session_id: str,
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    page = await _load_history(db, session_id, limit=limit, before=before, after=after)
+    if not page["history"] and before is None and after is None:
         raise HTTPException(status_code=404, detail="No history for session_id")
-    return {"session_id": session_id, "history": history}
+    return {"session_id": session_id, **page}
@@ -1,134 +1,271 @@
 from uuid import uuid4
-from typing import Optional, List, Dict
+from typing import Any, Literal, Optional, List, Dict
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from agents.doctor_assistant_agent import runner as doctor_runner, session_service, memory_service, APP_NAME as DOCTOR_APP
+from agents.admission import AdmissionRejected, admission, too_busy
+from agents.circuit_breaker import FALLBACK_MESSAGE, CircuitOpen, circuit_breaker
+from agents.turns import TurnCancelled, run_turn, turn_deadline
+from agents.usage import TurnUsage
 from agents.user_context import update_user_context_from_db
-from database import get_db
-from models.models import ConversationSessionDoctor, ConversationMessageDoctor
+from agents.history_writer import history_writer
+from agents.utils import event_to_chunks, streaming_run_config, to_ndjson
+from config import settings
+from database import AsyncSessionLocal, get_db
+from services.conversation_service import DoctorMessageService, add_queued, message_to_dict, page_to_payload
+from tracing import traced
 from google.genai import types
 
 router = APIRouter(prefix="/doctor", tags=["doctor_ai"])
 
 
 class DoctorAskRequest(BaseModel):
+    """One turn. "full" mode answers with the session's latest history page; with
+    HISTORY_WRITE_BEHIND the turn's messages are still queued, so they are appended to
+    the page (without ids until stored) and the cursors only cover stored messages.
+    """
+
     prompt: str
     session_id: Optional[str] = None
     user_name: Optional[str] = None
+    # "delta" returns only this turn's messages + cursor instead of a history page
+    response_mode: Literal["full", "delta"] = "full"
+    # client's time budget for the turn; the run is cancelled once it passes
+    deadline_ms: Optional[int] = None
+
+
+@traced("history.record")
+async def _record_turn(
+    db: AsyncSession,
+    session_id: str,
+    user_id: str,
+    prompt: str,
+    assistant_text: str,
+    usage: Optional[TurnUsage] = None,
+):
+    """Persist the session row and the turn's messages in one transaction (or queue them).
+
+    The turn's token usage, if the model was called, goes on its last message.
+    """
+    session_row = {"session_id": session_id, "app_name": DOCTOR_APP, "user_id": user_id}
+    messages = [{"session_id": session_id, "user_id": user_id, "role": "user", "content": prompt}]
+    if assistant_text:
+        messages.append({"session_id": session_id, "user_id": user_id, "role": "assistant", "content": assistant_text})
+    if usage is not None and usage.llm_calls:
+        messages[-1].update(usage.columns())
+
+    if history_writer.enabled:
+        return await history_writer.submit(DoctorMessageService, session_row, messages)
+    return await DoctorMessageService(db).record([session_row], messages)
 
 
-async def _ensure_db_session(db: AsyncSession, session_id: str, user_id: str):
-    row = await db.scalar(
-        select(ConversationSessionDoctor).where(ConversationSessionDoctor.session_id == session_id)
+async def _load_history(
+    db: AsyncSession,
+    session_id: str,
+    limit: Optional[int] = None,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+) -> Dict[str, Any]:
+    """One keyset page of a session's messages (latest page when no cursor is given)."""
+    rows, has_more = await DoctorMessageService(db).page(
+        session_id=session_id, limit=limit or settings.HISTORY_PAGE_SIZE, before=before, after=after
     )
-    if row:
-        return row
-    row = ConversationSessionDoctor(session_id=session_id, app_name=DOCTOR_APP, user_id=user_id)
-    db.add(row)
-    await db.commit()
-    await db.refresh(row)
-    return row
-
-
-async def _append_message(db: AsyncSession, session_id: str, role: str, content: str):
-    msg = ConversationMessageDoctor(session_id=session_id, role=role, content=content)
-    db.add(msg)
-    await db.commit()
-
-
-async def _load_history(db: AsyncSession, session_id: str) -> List[Dict[str, str]]:
-    rows = (
-        await db.scalars(
-            select(ConversationMessageDoctor)
-            .where(ConversationMessageDoctor.session_id == session_id)
-            .order_by(ConversationMessageDoctor.created_at)
-        )
-    ).all()
-    return [
-        {"role": r.role, "content": r.content, "timestamp": r.created_at.isoformat() if r.created_at else None}
-        for r in rows
-    ]
+    return page_to_payload(rows, has_more)
 
 
-@router.post("/ask")
-async def ask_doctor_agent(req: DoctorAskRequest, db: AsyncSession = Depends(get_db)):
+def _turn_delta(messages: List[Any]) -> Dict[str, Any]:
+    """Only the messages written in this turn, plus the cursor to resume history from.
+
+    With HISTORY_WRITE_BEHIND the messages are only queued: they have no id or timestamp
+    yet and the cursor is None, so clients keep resuming from the cursor they had.
+    """
+    delta = [message_to_dict(m) for m in messages]
+    return {"messages": delta, "cursor": delta[-1]["id"]}
+
+
+async def _remember_turn(user_id: str, session_id: str):
+    """Index the turn's new events into memory; runs after the response is sent."""
+    sess = await session_service.get_session(app_name=DOCTOR_APP, user_id=user_id, session_id=session_id)
+    if sess:
+        await memory_service.add_session_to_memory(sess)
+
+
+async def _start_turn(db: AsyncSession, req: DoctorAskRequest):
+    """Resolve doctor + session, ready for the run. Returns (user_id, session_id)."""
     user_id = (req.user_name or "").strip() or "doctor_user"
     session_id = req.session_id or str(uuid4())
 
     # hydrate user context (username/role) for identify_user tool
     await update_user_context_from_db(db, user_id)
+    await db.commit()  # return the connection to the pool; the turn may queue and run for seconds
 
     # ensure session in google adk
-    try:
+    sess = await session_service.get_session(app_name=DOCTOR_APP, user_id=user_id, session_id=session_id)
+    if not sess:
         sess = await session_service.create_session(app_name=DOCTOR_APP, user_id=user_id, session_id=session_id)
-    except Exception:
-        sess = await session_service.get_session(app_name=DOCTOR_APP, user_id=user_id, session_id=session_id)
 
-    await memory_service.add_session_to_memory(sess)
-    await _ensure_db_session(db, session_id, user_id=user_id)
-    await _append_message(db, session_id, "user", req.prompt)
+    return user_id, session_id
+
+
+@router.post("/ask")
+async def ask_doctor_agent(
+    req: DoctorAskRequest, request: Request, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)
+):
+    deadline = turn_deadline(req.deadline_ms)
+    user_id, session_id = await _start_turn(db, req)
 
     query_content = types.Content(role="user", parts=[types.Part(text=req.prompt)])
     assistant_text = ""
 
-    async for event in doctor_runner.run_async(
-        user_id=user_id,
-        session_id=session_id,
-        new_message=query_content
-    ):
-        if event.is_final_response() and event.content and event.content.parts:
-            assistant_text = event.content.parts[0].text or ""
+    cancelled = None
+    usage = TurnUsage()
+    try:
+        if circuit_breaker.is_open():
+            raise CircuitOpen()
+        async with admission.slot(user_id, "doctor"), session_service.turn(session_id):
+            async for event in run_turn(
+                doctor_runner,
+                user_id=user_id,
+                session_id=session_id,
+                new_message=query_content,
+                deadline=deadline,
+                request=request,
+                usage=usage,
+            ):
+                if event.is_final_response() and event.content and event.content.parts:
+                    assistant_text = event.content.parts[0].text or ""
+    except AdmissionRejected as e:
+        raise too_busy(e)
+    except CircuitOpen:
+        assistant_text = FALLBACK_MESSAGE
+    except TurnCancelled as e:
+        cancelled = e
+    background_tasks.add_task(_remember_turn, user_id, session_id)
 
-    if assistant_text:
-        await _append_message(db, session_id, "assistant", assistant_text)
+    turn_messages = await _record_turn(db, session_id, user_id, req.prompt, assistant_text, usage)
+    if cancelled:
+        raise HTTPException(status_code=504, detail=str(cancelled))
+
+    if req.response_mode == "delta":
+        return {"response": assistant_text, "session_id": session_id, **_turn_delta(turn_messages)}
+
+    page = await _load_history(db, session_id)
+    if history_writer.enabled:
+        add_queued(page, turn_messages)
+    return {"response": assistant_text, "session_id": session_id, **page}
+
+
+@router.post("/ask/stream")
+async def ask_doctor_agent_stream(req: DoctorAskRequest):
+    """Same turn as /doctor/ask, streamed as NDJSON: session, delta, tool_call, tool_result, final.
+
+    Admission happens before the stream starts, so an overloaded worker answers 429.
+    The run is cancelled at the deadline or when the client goes away.
+    """
+    deadline = turn_deadline(req.deadline_ms)
+    async with AsyncSessionLocal() as db:
+        user_id, session_id = await _start_turn(db, req)
+    turn = {"user_id": user_id, "session_id": session_id}
+    ticket = None
+    if not circuit_breaker.is_open():
+        try:
+            ticket = await admission.acquire(user_id, "doctor")
+        except AdmissionRejected as e:
+            raise too_busy(e)
+
+    async def event_stream():
+        # Own DB session: the response body outlives the request dependency scope
+        async with AsyncSessionLocal() as db:
+            yield to_ndjson({"type": "session", "session_id": session_id})
 
-    history = await _load_history(db, session_id)
-    return {"response": assistant_text, "session_id": session_id, "history": history}
+            query_content = types.Content(role="user", parts=[types.Part(text=req.prompt)])
+            assistant_text = ""
+            usage = TurnUsage()
+            try:
+                if ticket is None:
+                    raise CircuitOpen()
+                # tool writes are rolled back if the run fails, times out or the client goes away
+                async with session_service.turn(session_id):
+                    async for event in run_turn(
+                        doctor_runner,
+                        user_id=user_id,
+                        session_id=session_id,
+                        new_message=query_content,
+                        deadline=deadline,
+                        run_config=streaming_run_config,
+                        usage=usage,
+                    ):
+                        for chunk in event_to_chunks(event):
+                            yield to_ndjson(chunk)
+                        if event.is_final_response() and event.content and event.content.parts:
+                            assistant_text = event.content.parts[0].text or ""
+            except CircuitOpen:
+                assistant_text = FALLBACK_MESSAGE
+                yield to_ndjson({"type": "delta", "text": assistant_text})
+            except Exception as e:
+                yield to_ndjson({"type": "error", "message": str(e)})
+            finally:
+                if ticket:
+                    ticket.release()
+
+            turn_messages = await _record_turn(db, session_id, user_id, req.prompt, assistant_text, usage)
+
+            yield to_ndjson(
+                {"type": "final", "response": assistant_text, "session_id": session_id, **_turn_delta(turn_messages)}
+            )
+
+    async def remember():
+        if ticket:
+            ticket.release()  # no-op unless the stream never ran
+        await _remember_turn(**turn)
+
+    return StreamingResponse(
+        event_stream(), media_type="application/x-ndjson", background=BackgroundTask(remember)
+    )
+
+
+@router.get("/memory")
+async def doctor_memory_usage():
+    """Per-user memory size of the doctor assistant in this worker."""
+    return {"app_name": DOCTOR_APP, "users": memory_service.stats()}
 
 
 @router.get("/ask/history")
-async def doctor_history(session_id: str, db: AsyncSession = Depends(get_db)):
-    history = await _load_history(db, session_id)
-    if not history:
+async def doctor_history(
+    session_id: str,
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    page = await _load_history(db, session_id, limit=limit, before=before, after=after)
+    if not page["history"] and before is None and after is None:
         raise HTTPException(status_code=404, detail="No history for session_id")
-    return {"session_id": session_id, "history": history}
+    return {"session_id": session_id, **page}
 
 
 @router.get("/history/by_user")
-async def doctor_history_by_user(user_id: str, db: AsyncSession = Depends(get_db)):
-    sessions = (
-        await db.scalars(
-            select(ConversationSessionDoctor.session_id)
-            .where(ConversationSessionDoctor.user_id == user_id)
-            .order_by(ConversationSessionDoctor.created_at.desc())
-        )
-    ).all()
-
-    if not sessions:
+async def doctor_history_by_user(
+    user_id: str,
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """One keyset page of all the user's messages across sessions.
+
+    `sessions` lists the sessions that appear on this page (in page order), not every
+    session of the user; walk the cursors to see the rest.
+    """
+    service = DoctorMessageService(db)
+    if not await service.has_sessions(user_id):
         raise HTTPException(status_code=404, detail="No history for user")
 
-    history = (
-        await db.scalars(
-            select(ConversationMessageDoctor)
-            .where(ConversationMessageDoctor.session_id.in_(sessions))
-            .order_by(ConversationMessageDoctor.created_at)
-        )
-    ).all()
-
-    return {
-        "user_id": user_id,
-        "sessions": sessions,
-        "history": [
-            {
-                "session_id": msg.session_id,
-                "role": msg.role,
-                "content": msg.content,
-                "timestamp": msg.created_at.isoformat() if msg.created_at else None,
-            }
-            for msg in history
-        ],
-    }
+    rows, has_more = await service.page(user_id=user_id, limit=limit, before=before, after=after)
+    sessions = list(dict.fromkeys(row.session_id for row in rows))
+    return {"user_id": user_id, "sessions": sessions, **page_to_payload(rows, has_more)}
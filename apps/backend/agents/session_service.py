@@ -0,0 +1,231 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Type
+from uuid import uuid4
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.sql import func
+
+from config import settings
+from database import AsyncSessionLocal
+from tracing import traced
+
+
+class PostgresSessionService(BaseSessionService):
+    """ADK session service persisted in Postgres through the shared async engine.
+
+    Sessions are rows of the app's `conversation_sessions_*` table (state kept as JSONB);
+    events are serialized into the matching `conversation_events_*` table. Only the most
+    recent `event_window` events are loaded per session, and new events are buffered and
+    written with one multi-row INSERT when the batch fills up or when the `turn()` around
+    an agent run exits, however it exits. Any worker can therefore pick up any session.
+    Inside a turn nothing is written early: if the run fails or is cancelled (its tool
+    writes are rolled back), its events after the user message are dropped, so the next
+    turn does not read about writes that never happened. Turns on one session run one at
+    a time in a worker (a double submit, or /ask and /ask/stream together, waits for the
+    turn in progress), so a failed run only ever drops its own events.
+    """
+
+    def __init__(
+        self,
+        session_model: Type[Any],
+        event_model: Type[Any],
+        event_window: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.session_model = session_model
+        self.event_model = event_model
+        self.event_window = event_window or settings.SESSION_EVENT_WINDOW
+        self.batch_size = batch_size or settings.SESSION_EVENT_BATCH_SIZE
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}   # session_id -> unflushed event rows
+        self._dirty_state: Dict[str, Dict[str, Any]] = {}     # session_id -> state to persist
+        self._turns: Dict[str, List[Any]] = {}                 # session_id -> [turn lock, turns holding/waiting]
+
+    @traced("session.create")
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = (session_id or "").strip() or str(uuid4())
+        state = state or {}
+        async with AsyncSessionLocal() as db:
+            db.add(self.session_model(session_id=session_id, app_name=app_name, user_id=user_id, state=state))
+            await db.commit()  # raises IntegrityError if the session_id is taken
+        return Session(id=session_id, app_name=app_name, user_id=user_id, state=state, last_update_time=time.time())
+
+    @traced("session.get")
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        async with AsyncSessionLocal() as db:
+            row = await db.scalar(
+                select(self.session_model).where(
+                    self.session_model.session_id == session_id,
+                    self.session_model.app_name == app_name,
+                    self.session_model.user_id == user_id,
+                )
+            )
+            if not row:
+                return None
+
+            limit = self.event_window
+            if config and config.num_recent_events:
+                limit = min(limit, config.num_recent_events)
+            query = (
+                select(self.event_model.payload)
+                .where(self.event_model.session_id == session_id)
+                .order_by(self.event_model.id.desc())
+                .limit(limit)
+            )
+            if config and config.after_timestamp:
+                query = query.where(self.event_model.timestamp >= config.after_timestamp)
+            payloads = (await db.scalars(query)).all()
+
+        events = [Event.model_validate(p) for p in reversed(payloads)]
+        events += [Event.model_validate(r["payload"]) for r in self._pending.get(session_id, [])]
+        # A truncated window must not start mid tool-call exchange: begin at a user turn
+        while events and events[0].author != "user":
+            events.pop(0)
+
+        return Session(
+            id=row.session_id,
+            app_name=row.app_name,
+            user_id=row.user_id,
+            state=self._dirty_state.get(session_id, row.state or {}),
+            events=events,
+            last_update_time=row.updated_at.timestamp() if row.updated_at else 0.0,
+        )
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        async with AsyncSessionLocal() as db:
+            rows = (
+                await db.scalars(
+                    select(self.session_model)
+                    .where(self.session_model.app_name == app_name, self.session_model.user_id == user_id)
+                    .order_by(self.session_model.created_at.desc())
+                )
+            ).all()
+        # Events are never loaded for listings
+        return ListSessionsResponse(
+            sessions=[
+                Session(
+                    id=r.session_id,
+                    app_name=r.app_name,
+                    user_id=r.user_id,
+                    last_update_time=r.updated_at.timestamp() if r.updated_at else 0.0,
+                )
+                for r in rows
+            ]
+        )
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self._pending.pop(session_id, None)
+        self._dirty_state.pop(session_id, None)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(self.session_model).where(
+                    self.session_model.session_id == session_id,
+                    self.session_model.app_name == app_name,
+                    self.session_model.user_id == user_id,
+                )
+            )
+            await db.commit()
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = await super().append_event(session, event)
+        session.last_update_time = event.timestamp
+
+        self._pending.setdefault(session.id, []).append(
+            {
+                "session_id": session.id,
+                "event_id": event.id,
+                "invocation_id": event.invocation_id,
+                "author": event.author,
+                "timestamp": event.timestamp,
+                "payload": event.model_dump(mode="json", exclude_none=True),
+            }
+        )
+        if event.actions and event.actions.state_delta:
+            self._dirty_state[session.id] = session.state
+
+        if len(self._pending[session.id]) >= self.batch_size and session.id not in self._turns:
+            await self.flush(session.id)
+        return event
+
+    @asynccontextmanager
+    async def turn(self, session_id: str):
+        """Scope of one agent run: the session's buffered events and state are flushed on
+        exit, also when the run raises, so nothing stays behind in this worker.
+
+        Waits for another turn on the same session to finish first. When the run raises
+        (error, TurnCancelled, client gone) only its user message is kept.
+        """
+        entry = self._turns.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                start = len(self._pending.get(session_id, []))  # events buffered before this run
+                try:
+                    yield
+                except BaseException:
+                    self.discard_pending(session_id, keep_first=start + 1)
+                    raise
+                finally:
+                    await self.flush(session_id)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._turns[session_id]
+
+    def discard_pending(self, session_id: str, keep_first: int = 0) -> None:
+        """Drop a session's unflushed events after the first `keep_first`, and its unsaved state."""
+        rows = self._pending.pop(session_id, [])[:keep_first]
+        if rows:
+            self._pending[session_id] = rows
+        self._dirty_state.pop(session_id, None)
+
+    @traced("session.flush")
+    async def flush(self, session_id: str) -> None:
+        """Write buffered events (one multi-row INSERT) and the latest state for a session.
+
+        If the write fails or is cancelled, the events go back in front of the buffer (and
+        the state stays dirty unless it changed meanwhile) for the next flush, and the error
+        is raised.
+        """
+        rows = self._pending.pop(session_id, [])
+        state = self._dirty_state.pop(session_id, None)
+        if not rows and state is None:
+            return
+
+        values: Dict[str, Any] = {"updated_at": func.now()}
+        if state is not None:
+            values["state"] = state
+        try:
+            async with AsyncSessionLocal() as db:
+                if rows:
+                    await db.execute(insert(self.event_model), rows)
+                await db.execute(
+                    update(self.session_model).where(self.session_model.session_id == session_id).values(**values)
+                )
+                await db.commit()
+        except BaseException as e:
+            self._pending[session_id] = rows + self._pending.get(session_id, [])
+            if state is not None:
+                self._dirty_state.setdefault(session_id, state)
+            print(f"⚠️ Session {session_id}: could not write {len(rows)} events, kept for the next flush: {e!r}")
+            raise
@@ -1,20 +1,36 @@
-current_user_context = {"user_name": "guest_user", "full_name": "Guest", "role": "guest"}
+from contextvars import ContextVar
 
+GUEST_CONTEXT = {"user_name": "guest_user", "full_name": "Guest", "role": "guest"}
 
-def set_current_user(user_name: str | None, full_name: str | None = None, role: str | None = None):
-    current_user_context["user_name"] = user_name or "guest_user"
-    current_user_context["full_name"] = full_name or user_name or "Guest"
-    current_user_context["role"] = role or current_user_context.get("role") or "guest"
+# Request-scoped: each /ask task (and the tool calls it spawns) sees only its own user
+current_user_context: ContextVar[dict] = ContextVar("current_user_context", default=GUEST_CONTEXT)
+
+
+def set_current_user(
+    user_name: str | None,
+    full_name: str | None = None,
+    role: str | None = None,
+    patient_id: int | None = None,
+):
+    current_user_context.set(
+        {
+            "user_name": user_name or "guest_user",
+            "full_name": full_name or user_name or "Guest",
+            "role": role or "guest",
+            "patient_id": patient_id,  # the patient record a patient account belongs to
+        }
+    )
 
 
 def identify_user() -> dict:
-    """Return current user info (username, full name, role) from in-memory context.
+    """Return current user info (username, full name, role) from the request context.
 
     DB refresh is handled upstream (see user_context.py) to avoid async-in-sync issues.
     """
+    ctx = current_user_context.get()
     return {
         "status": "success",
-        "user_name": current_user_context.get("user_name", "guest_user"),
-        "full_name": current_user_context.get("full_name", "Guest"),
-        "role": current_user_context.get("role", "guest"),
+        "user_name": ctx.get("user_name", "guest_user"),
+        "full_name": ctx.get("full_name", "Guest"),
+        "role": ctx.get("role", "guest"),
     }
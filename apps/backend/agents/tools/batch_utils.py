@@ -0,0 +1,26 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+MAX_BATCH_ITEMS = 50
+
+
+def get_items(payload: Dict[str, Any]) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """Return (items, error) for a *_many action whose payload is {"items": [...]}."""
+    items = payload.get("items")
+    if not isinstance(items, list) or not items:
+        return None, {
+            "status": "missing_fields",
+            "missing": ["items"],
+            "message": "items must be a non-empty list of records",
+        }
+    if len(items) > MAX_BATCH_ITEMS:
+        return None, {"status": "error", "message": f"At most {MAX_BATCH_ITEMS} items per call; split the batch."}
+    return [dict(item or {}) for item in items], None
+
+
+def batch_error(errors: List[Tuple[int, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Combine per-item validation results; batches are all-or-nothing."""
+    return {
+        "status": "missing_fields" if any(e.get("status") == "missing_fields" for _, e in errors) else "error",
+        "errors": [{"index": i, **e} for i, e in errors],
+        "message": "No records were written. Fix the listed items and retry the whole batch.",
+    }
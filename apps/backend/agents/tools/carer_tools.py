@@ -1,12 +1,16 @@
 from datetime import date
 import random
 import string
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
-from database import AsyncSessionLocal
+from agents.tools.batch_utils import batch_error, get_items
+from agents.tools.list_utils import bounded_list
+from database import tool_session
 from services.carer_service import CarerService
+from services.profile_cache import profile_cache
 from services.user_service import UserService
 from services.user_patient_access_service import UserPatientAccessService
+from tracing import traced_tool
 
 REQUIRED_FIELDS = [
     "patient_id",
@@ -16,6 +20,12 @@ REQUIRED_FIELDS = [
 ]
 
 
+def _username(item: Dict[str, Any]) -> Optional[str]:
+    """Login of the carer's auto-created user: given, or from the full name (None: carer_<id>)."""
+    base_name = (item.get("full_name") or "").strip().lower().replace(" ", ".")
+    return item.get("username") or base_name or None
+
+
 def _to_dict(c: Any) -> Dict[str, Any]:
     return {
         "id": c.id,
@@ -27,12 +37,13 @@ def _to_dict(c: Any) -> Dict[str, Any]:
     }
 
 
+@traced_tool
 async def handle_carer_action(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     """Async dispatcher for carer CRUD actions (FunctionTool-friendly)."""
     action = (action or "").lower()
     payload = payload or {}
 
-    async with AsyncSessionLocal() as db:
+    async with tool_session() as db:
         svc = CarerService(db)
         user_svc = UserService(db)
         upa_svc = UserPatientAccessService(db)
@@ -45,11 +56,17 @@ async def handle_carer_action(action: str, payload: Dict[str, Any]) -> Dict[str,
                     "missing": missing,
                     "message": "Please ask the user to provide the missing information.",
                 }
-            carer = await svc.create(**payload)
+            username = _username(payload)
+            if username and await user_svc.taken_usernames([username]):
+                return {
+                    "status": "error",
+                    "message": f"Username {username} is already taken; ask the user for another username.",
+                }
+            carer = await svc.create(**{k: v for k, v in payload.items() if k != "username"})
+            await profile_cache.invalidate(carer.patient_id)
 
             # auto-create user for carer and map access
-            base_name = (payload.get("full_name") or "").strip().lower().replace(" ", ".")
-            username = payload.get("username") or (base_name if base_name else f"carer_{carer.id}")
+            username = username or f"carer_{carer.id}"
             password = "".join(random.choices(string.ascii_letters + string.digits, k=8))
             user = await user_svc.create(
                 username=username,
@@ -70,6 +87,64 @@ async def handle_carer_action(action: str, payload: Dict[str, Any]) -> Dict[str,
                 },
             }
 
+        if action == "create_many_carers":
+            items, error = get_items(payload)
+            if error:
+                return error
+            errors = [
+                (i, {"status": "missing_fields", "missing": missing})
+                for i, item in enumerate(items)
+                if (missing := [f for f in REQUIRED_FIELDS if item.get(f) in (None, "", [])])
+            ]
+            if errors:
+                return batch_error(errors)
+
+            # usernames must be unique: check the batch and existing users before writing
+            usernames = [_username(item) for item in items]
+            taken = await user_svc.taken_usernames(usernames)
+            first_index: Dict[str, int] = {}
+            for i, username in enumerate(usernames):
+                if username in taken:
+                    errors.append((i, {"status": "error", "message": f"Username {username} is already taken"}))
+                elif username and username in first_index:
+                    errors.append(
+                        (i, {"status": "error", "message": f"Username {username} is also used by item {first_index[username]}"})
+                    )
+                elif username:
+                    first_index[username] = i
+            if errors:
+                return batch_error(errors)
+
+            for item in items:
+                item.pop("username", None)
+            carers = await svc.bulk_create(items)
+
+            # auto-create users for the carers and map access
+            user_rows = []
+            for carer, username in zip(carers, usernames):
+                user_rows.append({
+                    "username": username or f"carer_{carer.id}",
+                    "password": "".join(random.choices(string.ascii_letters + string.digits, k=8)),
+                    "role": "carer",
+                    "carer_id": carer.id,
+                    "patient_id": None,
+                    "doctor_id": None,
+                })
+            users = await user_svc.bulk_create(user_rows)
+            await upa_svc.bulk_create(
+                [{"user_id": user.id, "patient_id": carer.patient_id} for carer, user in zip(carers, users)]
+            )
+            await profile_cache.invalidate(*{c.patient_id for c in carers})
+
+            return {
+                "status": "success",
+                "action": action,
+                "data": [
+                    {**_to_dict(carer), "user": {"id": user.id, "username": user.username, "role": user.role}}
+                    for carer, user in zip(carers, users)
+                ],
+            }
+
         if action == "read_carer":
             carer_id = payload.get("carer_id")
             if not carer_id:
@@ -84,18 +159,44 @@ async def handle_carer_action(action: str, payload: Dict[str, Any]) -> Dict[str,
             data = {k: v for k, v in payload.items() if k != "carer_id"}
             if not data:
                 return {"status": "missing_fields", "missing": REQUIRED_FIELDS, "message": "Provide fields to update"}
+            # moving the row to another patient changes both profiles
+            moved_from = (await svc.get(carer_id)).patient_id if "patient_id" in data else None
             carer = await svc.update(carer_id, **data)
+            await profile_cache.invalidate(carer.patient_id, moved_from)
             return {"status": "success", "action": action, "data": _to_dict(carer)}
 
+        if action == "update_many_carers":
+            items, error = get_items(payload)
+            if error:
+                return error
+            errors = []
+            for i, item in enumerate(items):
+                if not item.get("carer_id"):
+                    errors.append((i, {"status": "missing_fields", "missing": ["carer_id"]}))
+                elif len(item) == 1:
+                    errors.append((i, {"status": "missing_fields", "missing": REQUIRED_FIELDS, "message": "Provide fields to update"}))
+            if errors:
+                return batch_error(errors)
+            changes = [{"id": item.pop("carer_id"), **item} for item in items]
+            # rows moved to another patient change both profiles
+            moved_from = []
+            if any("patient_id" in c for c in changes):
+                moved_from = [c.patient_id for c in await svc.get_many([c["id"] for c in changes])]
+            rows = await svc.bulk_update(changes)
+            await profile_cache.invalidate(*{c.patient_id for c in rows}, *moved_from)
+            return {"status": "success", "action": action, "data": [_to_dict(c) for c in rows]}
+
         if action == "delete_carer":
             carer_id = payload.get("carer_id")
             if not carer_id:
                 return {"status": "missing_fields", "missing": ["carer_id"], "message": "carer_id is required"}
+            patient_id = (await svc.get(carer_id)).patient_id
             await svc.delete(carer_id)
+            await profile_cache.invalidate(patient_id)
             return {"status": "success", "action": action, "data": {"carer_id": carer_id}}
 
         if action == "list_carers":
-            rows = await svc.list()
-            return {"status": "success", "action": action, "data": [_to_dict(c) for c in rows]}
+            filters = {"patient_id": payload["patient_id"]} if payload.get("patient_id") else {}
+            return await bounded_list(action, svc, payload, _to_dict, **filters)
 
         return {"status": "error", "message": f"Unsupported action: {action}"}
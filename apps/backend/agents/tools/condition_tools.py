@@ -1,8 +1,13 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from datetime import date
 
-from database import AsyncSessionLocal
+from agents.tools.batch_utils import batch_error, get_items
+from agents.tools.list_utils import bounded_list, parse_date
+from database import tool_session
+from models.models import Condition
 from services.condition_service import ConditionService
+from services.profile_cache import profile_cache
+from tracing import traced_tool
 
 REQUIRED_FIELDS = ["patient_id", "condition_name", "severity_level", "diagnosed_date"]
 ALLOWED_SEVERITIES = {"mild", "moderate", "severe"}
@@ -18,17 +23,15 @@ def _to_dict(c: Any) -> Dict[str, Any]:
     }
 
 
-async def handle_condition_action(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-    action = (action or "").lower()
-    payload = payload or {}
-
+def _normalize(payload: Dict[str, Any], default_date: bool = True) -> Optional[Dict[str, Any]]:
+    """Normalize diagnosed_date and severity_level in place; returns an error dict if invalid."""
     # normalize diagnosed_date
     if payload.get("diagnosed_date") and isinstance(payload["diagnosed_date"], str):
         try:
             payload["diagnosed_date"] = date.fromisoformat(payload["diagnosed_date"])
         except ValueError:
             return {"status": "error", "message": "diagnosed_date must be YYYY-MM-DD"}
-    if not payload.get("diagnosed_date"):
+    if default_date and not payload.get("diagnosed_date"):
         payload["diagnosed_date"] = date.today()
 
     # normalize severity_level
@@ -42,8 +45,19 @@ async def handle_condition_action(action: str, payload: Dict[str, Any]) -> Dict[
                 "missing": ["severity_level"],
                 "message": "severity_level must be one of: mild, moderate, severe. Please confirm.",
             }
+    return None
 
-    async with AsyncSessionLocal() as db:
+
+@traced_tool
+async def handle_condition_action(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    action = (action or "").lower()
+    payload = payload or {}
+
+    error = _normalize(payload)
+    if error:
+        return error
+
+    async with tool_session() as db:
         svc = ConditionService(db)
 
         if action == "create_condition":
@@ -51,8 +65,26 @@ async def handle_condition_action(action: str, payload: Dict[str, Any]) -> Dict[
             if missing:
                 return {"status": "missing_fields", "missing": missing, "message": "Please provide missing fields."}
             c = await svc.create(**payload)
+            await profile_cache.invalidate(c.patient_id)
             return {"status": "success", "action": action, "data": _to_dict(c)}
 
+        if action == "create_many_conditions":
+            items, error = get_items(payload)
+            if error:
+                return error
+            errors = []
+            for i, item in enumerate(items):
+                missing = [f for f in REQUIRED_FIELDS if f != "diagnosed_date" and not item.get(f)]
+                if missing:
+                    errors.append((i, {"status": "missing_fields", "missing": missing}))
+                elif err := _normalize(item):
+                    errors.append((i, err))
+            if errors:
+                return batch_error(errors)
+            rows = await svc.bulk_create(items)
+            await profile_cache.invalidate(*{c.patient_id for c in rows})
+            return {"status": "success", "action": action, "data": [_to_dict(c) for c in rows]}
+
         if action == "read_condition":
             cid = payload.get("condition_id")
             if not cid:
@@ -67,18 +99,57 @@ async def handle_condition_action(action: str, payload: Dict[str, Any]) -> Dict[
             data = {k: v for k, v in payload.items() if k != "condition_id"}
             if not data:
                 return {"status": "missing_fields", "missing": REQUIRED_FIELDS, "message": "Provide fields to update"}
+            # moving the row to another patient changes both profiles
+            moved_from = (await svc.get(cid)).patient_id if "patient_id" in data else None
             c = await svc.update(cid, **data)
+            await profile_cache.invalidate(c.patient_id, moved_from)
             return {"status": "success", "action": action, "data": _to_dict(c)}
 
+        if action == "update_many_conditions":
+            items, error = get_items(payload)
+            if error:
+                return error
+            errors = []
+            for i, item in enumerate(items):
+                if not item.get("condition_id"):
+                    errors.append((i, {"status": "missing_fields", "missing": ["condition_id"]}))
+                elif len(item) == 1:
+                    errors.append((i, {"status": "missing_fields", "missing": REQUIRED_FIELDS, "message": "Provide fields to update"}))
+                elif err := _normalize(item, default_date=False):
+                    errors.append((i, err))
+            if errors:
+                return batch_error(errors)
+            changes = [{"id": item.pop("condition_id"), **item} for item in items]
+            # rows moved to another patient change both profiles
+            moved_from = []
+            if any("patient_id" in c for c in changes):
+                moved_from = [c.patient_id for c in await svc.get_many([c["id"] for c in changes])]
+            rows = await svc.bulk_update(changes)
+            await profile_cache.invalidate(*{c.patient_id for c in rows}, *moved_from)
+            return {"status": "success", "action": action, "data": [_to_dict(c) for c in rows]}
+
         if action == "delete_condition":
             cid = payload.get("condition_id")
             if not cid:
                 return {"status": "missing_fields", "missing": ["condition_id"], "message": "condition_id is required"}
+            patient_id = (await svc.get(cid)).patient_id
             await svc.delete(cid)
+            await profile_cache.invalidate(patient_id)
             return {"status": "success", "action": action, "data": {"condition_id": cid}}
 
         if action == "list_conditions":
-            rows = await svc.list()
-            return {"status": "success", "action": action, "data": [_to_dict(c) for c in rows]}
+            if not payload.get("patient_id"):
+                return {"status": "missing_fields", "missing": ["patient_id"], "message": "patient_id is required"}
+            filters = {k: payload[k] for k in ("patient_id", "severity_level") if payload.get(k)}
+            try:
+                diagnosed_from, diagnosed_to = parse_date(payload, "diagnosed_from"), parse_date(payload, "diagnosed_to")
+            except ValueError as e:
+                return {"status": "error", "message": str(e)}
+            where = []
+            if diagnosed_from:
+                where.append(Condition.diagnosed_date >= diagnosed_from)
+            if diagnosed_to:
+                where.append(Condition.diagnosed_date <= diagnosed_to)
+            return await bounded_list(action, svc, payload, _to_dict, where=where, **filters)
 
         return {"status": "error", "message": f"Unsupported action: {action}"}
@@ -0,0 +1,67 @@
+import functools
+import re
+from typing import Any, Callable, Dict, List
+
+from config import settings
+
+_TIME = re.compile(r"^(\d{2}:\d{2}):00$")
+_TIMESTAMP = re.compile(r"^(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2})(?::00(?:\.0+)?)?$")
+
+
+def _empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _short(value: Any) -> Any:
+    """Drop zero seconds from times and timestamps ("2025-01-02 09:30"); other values are kept as is."""
+    if isinstance(value, str):
+        if m := _TIME.match(value):
+            return m.group(1)
+        if m := _TIMESTAMP.match(value):
+            return f"{m.group(1)} {m.group(2)}"
+    return value
+
+
+def compact_rows(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """List of dicts -> {"columns": [...], "rows": [[...], ...]}.
+
+    Columns that are empty in every row are dropped; remaining values are shortened.
+    """
+    columns = [k for k in rows[0] if any(not _empty(r.get(k)) for r in rows)]
+    for r in rows[1:]:
+        columns += [k for k in r if k not in columns and not _empty(r[k])]
+    return {"columns": columns, "rows": [[_short(r.get(k)) for k in columns] for r in rows]}
+
+
+def compact_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        k: compact_record(v) if isinstance(v, dict) else _short(v)
+        for k, v in record.items()
+        if not _empty(v)
+    }
+
+
+def compact_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact a tool result's `data` (row lists become a column header plus tuples)."""
+    data = result.get("data")
+    if isinstance(data, list) and data and all(isinstance(r, dict) for r in data):
+        return {**result, "data": compact_rows(data)}
+    if isinstance(data, dict):
+        return {**result, "data": compact_record(data)}
+    return result
+
+
+def compact_tool(fn: Callable) -> Callable:
+    """Wrap an async tool so its results use the compact encoding when TOOL_RESULT_COMPACT is on.
+
+    The signature and docstring are kept, so ADK builds the same function declaration.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        result = await fn(*args, **kwargs)
+        if settings.TOOL_RESULT_COMPACT and isinstance(result, dict):
+            return compact_result(result)
+        return result
+
+    return wrapper
@@ -0,0 +1,75 @@
+import base64
+import json
+from datetime import date
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from config import settings
+
+
+def approx_tokens(obj: Any) -> int:
+    """Rough token count of an object once serialized for the LLM (~4 chars per token)."""
+    return len(json.dumps(obj, default=str)) // 4 + 1
+
+
+def encode_token(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"after": last_id}).encode()).decode()
+
+
+def decode_token(token: Optional[str]) -> Optional[int]:
+    if not token:
+        return None
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(token.encode()))["after"])
+    except Exception:
+        raise ValueError("continuation_token is invalid; start again without it")
+
+
+def parse_date(payload: Dict[str, Any], key: str) -> Optional[date]:
+    value = payload.get(key)
+    if not value or isinstance(value, date):
+        return value or None
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"{key} must be YYYY-MM-DD")
+
+
+async def bounded_list(
+    action: str,
+    svc: Any,
+    payload: Dict[str, Any],
+    to_dict: Callable[[Any], Dict[str, Any]],
+    where: Sequence[Any] = (),
+    order_by: str = "id",
+    **eq,
+) -> Dict[str, Any]:
+    """One page of a list_* action, bounded by `limit` and by the tool token budget.
+
+    When rows are left over, the result has `"more": true` and a `continuation_token`
+    to pass back for the next page.
+    """
+    try:
+        cursor = decode_token(payload.get("continuation_token"))
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    try:
+        limit = int(payload.get("limit") or settings.TOOL_LIST_DEFAULT_LIMIT)
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "limit must be a number"}
+    limit = max(1, min(limit, settings.TOOL_LIST_MAX_LIMIT))
+
+    rows = await svc.list(limit=limit + 1, cursor=cursor, order_by=order_by, where=where, **eq)
+    data, used = [], 0
+    for row in rows[:limit]:
+        item = to_dict(row)
+        cost = approx_tokens(item)
+        if data and used + cost > settings.TOOL_RESULT_TOKEN_BUDGET:
+            break
+        data.append(item)
+        used += cost
+
+    result = {"status": "success", "action": action, "data": data, "count": len(data), "more": len(rows) > len(data)}
+    if result["more"]:
+        result["continuation_token"] = encode_token(rows[len(data) - 1].id)
+        result["message"] = "More results available: repeat the call with this continuation_token, or narrow the filters."
+    return result
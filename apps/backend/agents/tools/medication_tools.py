@@ -1,8 +1,13 @@
 from datetime import date, time
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
-from database import AsyncSessionLocal
+from agents.tools.batch_utils import batch_error, get_items
+from agents.tools.list_utils import bounded_list, parse_date
+from database import tool_session
+from models.models import MedicationSchedule
 from services.medication_schedule_service import MedicationScheduleService
+from services.profile_cache import profile_cache
+from tracing import traced_tool
 
 ALLOWED_STATUS = {"taken", "pending", "missed"}
 
@@ -94,11 +99,35 @@ def _validate_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
     return None  # no issues
 
 
+def _prepare_update(payload: Dict[str, Any]) -> Tuple[Any, Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Return (medication_id, normalized changes, error) for an update payload."""
+    mid = payload.get("medication_id")
+    if not mid:
+        return None, {}, {"status": "missing_fields", "missing": ["medication_id"], "message": "medication_id is required"}
+    data = {k: v for k, v in payload.items() if k != "medication_id"}
+    if not data:
+        return mid, {}, {"status": "missing_fields", "missing": REQUIRED_FIELDS, "message": "Provide fields to update"}
+    # validate fields if provided
+    if data.get("status") or data.get("medication_name") or data.get("start_date") or data.get("end_date") or data.get("intake_time"):
+        validation = _validate_payload({**payload, **data})
+        if validation:
+            return mid, {}, validation
+        data = {k: v for k, v in payload.items() if k != "medication_id"}
+    try:
+        data = _normalize_dates(data)
+        if "intake_time" in data:
+            data = _normalize_intake_time(data)
+    except ValueError as e:
+        return mid, {}, {"status": "error", "message": str(e)}
+    return mid, data, None
+
+
+@traced_tool
 async def handle_medication_action(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     action = (action or "").lower()
     payload = payload or {}
 
-    async with AsyncSessionLocal() as db:
+    async with tool_session() as db:
         svc = MedicationScheduleService(db)
 
         if action == "create_medication":
@@ -106,6 +135,7 @@ async def handle_medication_action(action: str, payload: Dict[str, Any]) -> Dict
             if validation:
                 return validation
             m = await svc.create(**payload)
+            await profile_cache.invalidate(m.patient_id)
             return {"status": "success", "action": action, "data": _to_dict(m)}
 
         if action == "read_medication":
@@ -115,37 +145,69 @@ async def handle_medication_action(action: str, payload: Dict[str, Any]) -> Dict
             m = await svc.get(mid)
             return {"status": "success", "action": action, "data": _to_dict(m)}
 
+        if action == "create_many_medications":
+            items, error = get_items(payload)
+            if error:
+                return error
+            errors = [(i, v) for i, item in enumerate(items) if (v := _validate_payload(item))]
+            if errors:
+                return batch_error(errors)
+            rows = await svc.bulk_create(items)
+            await profile_cache.invalidate(*{m.patient_id for m in rows})
+            return {"status": "success", "action": action, "data": [_to_dict(m) for m in rows]}
+
         if action == "update_medication":
-            mid = payload.get("medication_id")
-            if not mid:
-                return {"status": "missing_fields", "missing": ["medication_id"], "message": "medication_id is required"}
-            data = {k: v for k, v in payload.items() if k != "medication_id"}
-            if not data:
-                return {"status": "missing_fields", "missing": REQUIRED_FIELDS, "message": "Provide fields to update"}
-            # validate fields if provided
-            if data.get("status") or data.get("medication_name") or data.get("start_date") or data.get("end_date") or data.get("intake_time"):
-                validation = _validate_payload({**payload, **data})
-                if validation:
-                    return validation
-                data = {k: v for k, v in payload.items() if k != "medication_id"}
-            try:
-                data = _normalize_dates(data)
-                if "intake_time" in data:
-                    data = _normalize_intake_time(data)
-            except ValueError as e:
-                return {"status": "error", "message": str(e)}
+            mid, data, error = _prepare_update(payload)
+            if error:
+                return error
+            # moving the row to another patient changes both profiles
+            moved_from = (await svc.get(mid)).patient_id if "patient_id" in data else None
             m = await svc.update(mid, **data)
+            await profile_cache.invalidate(m.patient_id, moved_from)
             return {"status": "success", "action": action, "data": _to_dict(m)}
 
+        if action == "update_many_medications":
+            items, error = get_items(payload)
+            if error:
+                return error
+            prepared = [_prepare_update(item) for item in items]
+            errors = [(i, err) for i, (_, _, err) in enumerate(prepared) if err]
+            if errors:
+                return batch_error(errors)
+            changes = [{"id": mid, **data} for mid, data, _ in prepared]
+            # rows moved to another patient change both profiles
+            moved_from = []
+            if any("patient_id" in c for c in changes):
+                moved_from = [m.patient_id for m in await svc.get_many([c["id"] for c in changes])]
+            rows = await svc.bulk_update(changes)
+            await profile_cache.invalidate(*{m.patient_id for m in rows}, *moved_from)
+            return {"status": "success", "action": action, "data": [_to_dict(m) for m in rows]}
+
         if action == "delete_medication":
             mid = payload.get("medication_id")
             if not mid:
                 return {"status": "missing_fields", "missing": ["medication_id"], "message": "medication_id is required"}
+            patient_id = (await svc.get(mid)).patient_id
             await svc.delete(mid)
+            await profile_cache.invalidate(patient_id)
             return {"status": "success", "action": action, "data": {"medication_id": mid}}
 
         if action == "list_medications":
-            rows = await svc.list()
-            return {"status": "success", "action": action, "data": [_to_dict(m) for m in rows]}
+            if not payload.get("patient_id"):
+                return {"status": "missing_fields", "missing": ["patient_id"], "message": "patient_id is required"}
+            filters = {"patient_id": payload["patient_id"]}
+            if payload.get("status"):
+                filters["status"] = str(payload["status"]).lower()
+            # schedules active at some point in [date_from, date_to]
+            try:
+                date_from, date_to = parse_date(payload, "date_from"), parse_date(payload, "date_to")
+            except ValueError as e:
+                return {"status": "error", "message": str(e)}
+            where = []
+            if date_from:
+                where.append((MedicationSchedule.end_date >= date_from) | MedicationSchedule.end_date.is_(None))
+            if date_to:
+                where.append(MedicationSchedule.start_date <= date_to)
+            return await bounded_list(action, svc, payload, _to_dict, where=where, order_by="intake_time", **filters)
 
         return {"status": "error", "message": f"Unsupported action: {action}"}
@@ -3,10 +3,14 @@ from datetime import date
 import random
 import string
 
-from database import AsyncSessionLocal
+from agents.tools.list_utils import bounded_list
+from database import tool_session
+from models.models import Patient
 from services.patient_service import PatientService
+from services.profile_cache import profile_cache
 from services.user_service import UserService
 from services.user_patient_access_service import UserPatientAccessService
+from tracing import traced_tool
 
 REQUIRED_FIELDS = [
     "full_name",
@@ -30,6 +34,7 @@ def _to_dict(p: Any) -> Dict[str, Any]:
     }
 
 
+@traced_tool
 async def handle_patient_action(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     """Async dispatcher for patient CRUD actions (to be used as an async FunctionTool)."""
     action = (action or "").lower()
@@ -42,7 +47,7 @@ async def handle_patient_action(action: str, payload: Dict[str, Any]) -> Dict[st
         except ValueError:
             return {"status": "error", "message": "birthdate must be YYYY-MM-DD"}
 
-    async with AsyncSessionLocal() as db:
+    async with tool_session() as db:
         patient_svc = PatientService(db)
         user_svc = UserService(db)
         upa_svc = UserPatientAccessService(db)
@@ -85,10 +90,9 @@ async def handle_patient_action(action: str, payload: Dict[str, Any]) -> Dict[st
                 p = await patient_svc.get(patient_id)
                 return {"status": "success", "action": action, "data": _to_dict(p)}
             if full_name and bdate:
-                rows = await patient_svc.list()
-                for p in rows:
-                    if p.full_name == full_name and p.birthdate == bdate:
-                        return {"status": "success", "action": action, "data": _to_dict(p)}
+                p = await patient_svc.first(full_name=full_name, birthdate=bdate)
+                if p:
+                    return {"status": "success", "action": action, "data": _to_dict(p)}
                 return {"status": "error", "message": "Patient not found with provided full_name and birthdate"}
             return {
                 "status": "missing_fields",
@@ -104,6 +108,7 @@ async def handle_patient_action(action: str, payload: Dict[str, Any]) -> Dict[st
             if not data:
                 return {"status": "missing_fields", "missing": REQUIRED_FIELDS, "message": "Provide fields to update"}
             p = await patient_svc.update(patient_id, **data)
+            await profile_cache.invalidate(patient_id)
             return {"status": "success", "action": action, "data": _to_dict(p)}
 
         if action == "delete_patient":
@@ -111,10 +116,13 @@ async def handle_patient_action(action: str, payload: Dict[str, Any]) -> Dict[st
             if not patient_id:
                 return {"status": "missing_fields", "missing": ["patient_id"], "message": "patient_id is required"}
             await patient_svc.delete(patient_id)
+            await profile_cache.invalidate(patient_id)
             return {"status": "success", "action": action, "data": {"patient_id": patient_id}}
 
         if action == "list_patients":
-            rows = await patient_svc.list()
-            return {"status": "success", "action": action, "data": [_to_dict(p) for p in rows]}
+            # optional name search; birthdate narrows to an exact match
+            where = [Patient.full_name.icontains(payload["full_name"], autoescape=True)] if payload.get("full_name") else []
+            filters = {"birthdate": payload["birthdate"]} if payload.get("birthdate") else {}
+            return await bounded_list(action, patient_svc, payload, _to_dict, where=where, order_by="full_name", **filters)
 
         return {"status": "error", "message": f"Unsupported action: {action}"}
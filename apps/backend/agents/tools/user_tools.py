@@ -2,9 +2,11 @@ import random
 import string
 from typing import Any, Dict, List
 
-from database import AsyncSessionLocal
+from agents.tools.list_utils import bounded_list
+from database import tool_session
 from services.user_service import UserService
 from services.user_patient_access_service import UserPatientAccessService
+from tracing import traced_tool
 
 
 def _user_to_dict(u: Any) -> Dict[str, Any]:
@@ -18,10 +20,11 @@ def _user_to_dict(u: Any) -> Dict[str, Any]:
     }
 
 
+@traced_tool
 async def handle_user_action(action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     action = (action or "").lower()
     payload = payload or {}
-    async with AsyncSessionLocal() as db:
+    async with tool_session() as db:
         user_svc = UserService(db)
         upa_svc = UserPatientAccessService(db)
 
@@ -64,8 +67,8 @@ async def handle_user_action(action: str, payload: Dict[str, Any]) -> Dict[str,
             return {"status": "success", "action": action, "data": {"user_id": user_id}}
 
         if action == "list_users":
-            users = await user_svc.list()
-            return {"status": "success", "action": action, "data": [_user_to_dict(u) for u in users]}
+            filters = {k: payload[k] for k in ("role", "patient_id", "doctor_id", "carer_id") if payload.get(k)}
+            return await bounded_list(action, user_svc, payload, _user_to_dict, order_by="username", **filters)
 
         if action == "create_user_patient_access":
             if not (payload.get("user_id") and payload.get("patient_id")):
@@ -81,11 +84,9 @@ async def handle_user_action(action: str, payload: Dict[str, Any]) -> Dict[str,
             return {"status": "success", "action": action, "data": {"id": upa_id}}
 
         if action == "list_user_patient_access":
-            rows = await upa_svc.list()
-            return {
-                "status": "success",
-                "action": action,
-                "data": [{"id": r.id, "user_id": r.user_id, "patient_id": r.patient_id} for r in rows],
-            }
+            filters = {k: payload[k] for k in ("user_id", "patient_id") if payload.get(k)}
+            return await bounded_list(
+                action, upa_svc, payload, lambda r: {"id": r.id, "user_id": r.user_id, "patient_id": r.patient_id}, **filters
+            )
 
         return {"status": "error", "message": f"Unsupported action: {action}"}
@@ -0,0 +1,102 @@
+import asyncio
+from typing import Any, AsyncIterator, Optional
+
+from google.adk.agents.run_config import RunConfig
+from starlette.requests import Request
+
+from agents.usage import TurnUsage, current_turn_usage
+from config import settings
+from database import unit_of_work
+from tracing import span
+
+_DONE = object()
+
+
+class TurnCancelled(Exception):
+    def __init__(self, reason: str):
+        super().__init__(f"Turn cancelled: {reason}")
+        self.reason = reason  # "deadline" | "disconnected"
+
+
+def turn_deadline(deadline_ms: Optional[int]) -> float:
+    """Event-loop time by which the turn must finish: the client's budget, capped by the server's."""
+    budget = settings.AGENT_TURN_TIMEOUT_SECONDS
+    if deadline_ms and deadline_ms > 0:
+        budget = min(budget, deadline_ms / 1000)
+    return asyncio.get_running_loop().time() + budget
+
+
+async def _until_disconnected(request: Request) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(settings.AGENT_DISCONNECT_POLL_SECONDS)
+
+
+def _event_attributes(event: Any) -> dict:
+    return {
+        "author": event.author or "",
+        "partial": bool(event.partial),
+        "final": event.is_final_response(),
+        "function_calls": ",".join(c.name or "" for c in event.get_function_calls()),
+        "function_responses": ",".join(r.name or "" for r in event.get_function_responses()),
+    }
+
+
+async def run_turn(
+    runner: Any,
+    *,
+    user_id: str,
+    session_id: str,
+    new_message: Any,
+    deadline: float,
+    request: Optional[Request] = None,
+    run_config: Optional[RunConfig] = None,
+    usage: Optional[TurnUsage] = None,
+) -> AsyncIterator[Any]:
+    """Yield the events of one agent run, cancelling it at the deadline or on client disconnect.
+
+    The run executes in its own task inside one unit of work, so a cancelled turn rolls back
+    its tool writes and stops calling the model. Raises TurnCancelled in that case; errors of
+    the run are re-raised as is. Model calls of the run (nested agents too) add up in `usage`.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def produce():
+        current_turn_usage.set(usage)  # this task's context only
+        try:
+            with span("agent.run") as current:
+                async with unit_of_work():  # tool calls of the turn share one transaction
+                    async for event in runner.run_async(
+                        user_id=user_id, session_id=session_id, new_message=new_message, run_config=run_config or RunConfig()
+                    ):
+                        current.add_event("adk.event", _event_attributes(event))
+                        queue.put_nowait(event)
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(_DONE)
+
+    loop = asyncio.get_running_loop()
+    producer = asyncio.create_task(produce())
+    watcher = asyncio.create_task(_until_disconnected(request)) if request is not None else None
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TurnCancelled("deadline")
+            getter = asyncio.ensure_future(queue.get())
+            waiting = {getter, watcher} if watcher else {getter}
+            done, _ = await asyncio.wait(waiting, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+                raise TurnCancelled("disconnected" if watcher in done else "deadline")
+            item = getter.result()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        for task in (producer, watcher):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(producer, *([watcher] if watcher else []), return_exceptions=True)
@@ -0,0 +1,97 @@
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from google.adk.models.llm_response import LlmResponse
+
+from config import settings
+
+TOOL_PATH_MAX_CHARS = 255
+
+
+def _tool_name(call: Any) -> str:
+    """handle_patient_action(action="list_patients") -> patient.list_patients; others as is."""
+    name = call.name or "?"
+    action = (call.args or {}).get("action")
+    if name.startswith("handle_") and name.endswith("_action") and action:
+        return f"{name.removeprefix('handle_').removesuffix('_action')}.{action}"
+    return name
+
+
+def llm_cost(model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+    """USD for one model's tokens per LLM_PRICES_PER_MTOK (0 for models without a price)."""
+    price = settings.LLM_PRICES_PER_MTOK.get(model)
+    if not price:
+        return 0.0
+    return (
+        (prompt_tokens - cached_tokens) * price["input"]
+        + cached_tokens * price["cached"]
+        + completion_tokens * price["output"]
+    ) / 1_000_000
+
+
+class TurnUsage:
+    """Tokens, model calls and tool calls of one agent turn, nested agents included.
+
+    TieredGemini adds every call it serves while a TurnUsage is set in `current_turn_usage`
+    (run_turn sets it for the turn's task). Prompt tokens include the cached ones;
+    completion tokens include thinking tokens, which are billed as output.
+    """
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.cost_usd = 0.0
+        self.by_agent: Dict[str, Dict[str, Any]] = {}
+        self.tools: List[str] = []
+
+    def _agent(self, agent_name: str) -> Dict[str, Any]:
+        return self.by_agent.setdefault(
+            agent_name, {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+        )
+
+    def add_call(self, agent_name: str) -> None:
+        self.llm_calls += 1
+        self._agent(agent_name)["llm_calls"] += 1
+
+    def add_response(self, agent_name: str, model: str, response: LlmResponse) -> None:
+        if response.partial:
+            return  # streamed chunks; the final response carries the call's usage and calls
+        if response.content:
+            self.tools += [_tool_name(p.function_call) for p in response.content.parts or [] if p.function_call]
+        usage = response.usage_metadata
+        if usage is None:
+            return
+        prompt = usage.prompt_token_count or 0
+        completion = (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0)
+        cached = usage.cached_content_token_count or 0
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self.cached_tokens += cached
+        self.cost_usd += llm_cost(model, prompt, cached, completion)
+        agent = self._agent(agent_name)
+        agent["prompt_tokens"] += prompt
+        agent["completion_tokens"] += completion
+        agent["cached_tokens"] += cached
+
+    @property
+    def tool_path(self) -> str:
+        """Tools called in order, e.g. "db_assistant>patient.list_patients" ("" without tools)."""
+        path = ">".join(self.tools)
+        return path if len(path) <= TOOL_PATH_MAX_CHARS else path[: TOOL_PATH_MAX_CHARS - 1] + "…"
+
+    def columns(self) -> Dict[str, Any]:
+        """Values of the usage columns of a conversation_messages_* row."""
+        return {
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "tool_path": self.tool_path,
+            "usage_by_agent": self.by_agent,
+        }
+
+
+current_turn_usage: ContextVar[Optional[TurnUsage]] = ContextVar("current_turn_usage", default=None)
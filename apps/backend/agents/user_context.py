@@ -5,11 +5,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.models import UserAccount, Patient, Doctor, Carer
 from agents.tools.account_tools import set_current_user
+from tracing import traced
 
 
+@traced("user_context")
 async def update_user_context_from_db(db: AsyncSession, username: Optional[str]) -> None:
     """
-    Populate the in-memory user context from the database using the username.
+    Populate the request-scoped user context from the database using the username.
 
     Falls back to guest if the user is not found.
     """
@@ -39,4 +41,5 @@ async def update_user_context_from_db(db: AsyncSession, username: Optional[str])
         if carer:
             display_name = carer.full_name
 
-    set_current_user(user.username, full_name=display_name, role=role)
+    patient_id = user.patient_id if role == "patient" else None
+    set_current_user(user.username, full_name=display_name, role=role, patient_id=patient_id)
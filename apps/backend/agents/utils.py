@@ -1,16 +1,24 @@
+import json
 import os
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.runners import Runner
 from google.genai import types
 from google.adk.sessions import InMemorySessionService
 
+from config import settings
+
 retry_config=types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1, # Initial delay before first retry (in seconds)
+    attempts=settings.LLM_RETRY_ATTEMPTS,  # Maximum retry attempts
+    exp_base=settings.LLM_RETRY_EXP_BASE,  # Delay multiplier
+    initial_delay=settings.LLM_RETRY_INITIAL_DELAY, # Initial delay before first retry (in seconds)
+    max_delay=settings.LLM_RETRY_MAX_DELAY, # Cap on a single backoff (in seconds)
     http_status_codes=[429, 500, 503, 504] # Retry on these HTTP errors
 
 )
 
+# Ask Gemini for server-sent partial responses so text can be relayed as it arrives
+streaming_run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+
 def load_instruction(path: str) -> str:
     """Load instruction text from a file path safely."""
     try:
@@ -18,3 +26,26 @@ def load_instruction(path: str) -> str:
             return f.read()
     except Exception:
         return ""
+
+
+def to_ndjson(chunk: dict) -> str:
+    """Serialize one stream chunk as a newline-delimited JSON line."""
+    return json.dumps(chunk, default=str) + "\n"
+
+
+def event_to_chunks(event) -> list:
+    """Translate an ADK runner event into stream chunks for the frontend.
+
+    Partial text becomes `delta` chunks; function calls and responses become
+    `tool_call` / `tool_result` progress chunks. Final text is handled by the caller.
+    """
+    chunks = []
+    if event.partial and event.content and event.content.parts:
+        text = "".join(p.text for p in event.content.parts if p.text)
+        if text:
+            chunks.append({"type": "delta", "text": text})
+    for call in event.get_function_calls():
+        chunks.append({"type": "tool_call", "name": call.name})
+    for resp in event.get_function_responses():
+        chunks.append({"type": "tool_result", "name": resp.name})
+    return chunks
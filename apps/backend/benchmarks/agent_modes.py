@@ -0,0 +1,137 @@
+"""LLM calls, prompt tokens and latency per data turn: nested db_assistant vs flat tools.
+
+Each mode builds the concierge as it is built for AGENT_TOOL_MODE (same instruction, same
+tools) and runs a "list medications" turn against the configured database. By default the
+model is a local stub that follows the tool protocol and sleeps like a remote model
+(--llm-latency-ms per call plus --ms-per-1k-tokens of prompt); --live uses Gemini.
+
+    python -m benchmarks.agent_modes --patient-id 1 --iterations 20
+    python -m benchmarks.agent_modes --patient-id 1 --iterations 5 --live
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from agents import db_agent as db_module
+from agents.db_agent import data_access_instruction, data_access_tools
+from agents.tools.account_tools import identify_user
+from agents.tools.list_utils import approx_tokens
+from agents.utils import load_instruction
+from config import settings
+
+APP_NAME = "agent_modes_bench"
+CONCIERGE_INSTRUCTION = os.path.join(os.path.dirname(db_module.__file__), "instructions", "concierge_agent.txt")
+
+
+class ToolProtocolStubLlm(BaseLlm):
+    """Stub model: delegates to db_assistant if it has it, else calls list_medications, then answers."""
+
+    model: str = "tool-protocol-stub"
+    patient_id: int = 1
+    latency_ms: float = 600.0
+    ms_per_1k_tokens: float = 40.0
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        tokens = approx_tokens(llm_request.config.system_instruction or "") + approx_tokens(
+            [c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents]
+        )
+        delay = self.latency_ms * random.uniform(0.8, 1.2) + self.ms_per_1k_tokens * tokens / 1000
+        await asyncio.sleep(delay / 1000)
+
+        last = llm_request.contents[-1]
+        if any(p.function_response for p in last.parts or []):
+            part = types.Part(text="Here are the medications.")
+        elif "db_assistant" in llm_request.tools_dict:
+            args = {"request": f"list_medications for patient_id {self.patient_id}"}
+            part = types.Part(function_call=types.FunctionCall(name="db_assistant", args=args))
+        else:
+            args = {"action": "list_medications", "payload": {"patient_id": self.patient_id}}
+            part = types.Part(function_call=types.FunctionCall(name="handle_medication_action", args=args))
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+def build_concierge(mode: str, model) -> LlmAgent:
+    return LlmAgent(
+        name="concierge_assistant",
+        model=model,
+        instruction=data_access_instruction(load_instruction(CONCIERGE_INSTRUCTION), mode=mode),
+        tools=[identify_user, *data_access_tools(mode=mode)],
+    )
+
+
+async def run_mode(mode: str, model, patient_id: int, iterations: int) -> dict:
+    calls, prompt_tokens = [], []
+
+    def count(callback_context, llm_request):
+        calls.append(1)
+        if llm_request.config and llm_request.config.system_instruction:
+            prompt_tokens.append(approx_tokens(llm_request.config.system_instruction))
+        prompt_tokens.append(approx_tokens([c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents]))
+        return None
+
+    agent = build_concierge(mode, model)
+    agent.before_model_callback = count
+    db_module.db_agent.model = model
+    db_module.db_agent.before_model_callback = count
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=InMemorySessionService())
+    prompt = types.Content(role="user", parts=[types.Part(text=f"List the medications of patient_id {patient_id}.")])
+
+    latencies, per_turn_calls, per_turn_tokens = [], [], []
+    for _ in range(iterations):
+        session = await runner.session_service.create_session(app_name=APP_NAME, user_id="bench")
+        calls.clear()
+        prompt_tokens.clear()
+        t0 = time.perf_counter()
+        async for _event in runner.run_async(user_id="bench", session_id=session.id, new_message=prompt):
+            pass
+        latencies.append((time.perf_counter() - t0) * 1000)
+        per_turn_calls.append(len(calls))
+        per_turn_tokens.append(sum(prompt_tokens))
+
+    latencies.sort()
+    return {
+        "calls": statistics.mean(per_turn_calls),
+        "tokens": statistics.median(per_turn_tokens),
+        "p50": statistics.median(latencies),
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+async def main_async(args) -> None:
+    if args.live:
+        from google.adk.models.google_llm import Gemini
+        model = Gemini(model=settings.LLM_MODEL_STRONG)
+    else:
+        model = ToolProtocolStubLlm(
+            patient_id=args.patient_id, latency_ms=args.llm_latency_ms, ms_per_1k_tokens=args.ms_per_1k_tokens
+        )
+
+    print(f"list medications of patient {args.patient_id}, {args.iterations} turns per mode ({'Gemini' if args.live else 'stub model'})")
+    print(f"{'mode':<8}{'LLM calls':>11}{'prompt tok':>12}{'p50 ms':>9}{'p95 ms':>9}")
+    for mode in ("nested", "flat"):
+        r = await run_mode(mode, model, args.patient_id, args.iterations)
+        print(f"{mode:<8}{r['calls']:>11.1f}{r['tokens']:>12.0f}{r['p50']:>9.0f}{r['p95']:>9.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patient-id", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=600.0, help="stub: base latency of one model call")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=40.0, help="stub: extra latency per 1k prompt tokens")
+    parser.add_argument("--live", action="store_true", help="use Gemini instead of the stub model")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
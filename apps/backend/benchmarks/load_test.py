@@ -0,0 +1,304 @@
+"""Offline load test: the FastAPI app in-process, with a scripted stub model behind the agents.
+
+Requests go through httpx's ASGI transport straight into `main.app` (lifespan included),
+against the configured database; nothing leaves the machine. The Gemini backends of the
+concierge, doctor and db_assistant models are replaced by a deterministic stub, so model
+tiers, usage accounting, admission control and tracing run as in production. The stub
+calls the given handle_*_action tools in order (through db_assistant in nested mode),
+sleeping --llm-latency-ms (+/- --jitter-ms) per model call, then answers.
+
+Endpoints are drawn from --mix at each --concurrency level; the report has requests per
+second, p50/p95/p99 latency and SQL statements per request, per endpoint. Admission
+limits apply as configured (e.g. LLM_MAX_CONCURRENT_TURNS), so 429s show up as errors.
+
+    python -m benchmarks.load_test --concurrency 1 8 32 --requests 300
+    python -m benchmarks.load_test --mix ask=1 --llm-latency-ms 1500 \\
+        --tool-calls medication.list_medications condition.list_conditions
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+from sqlalchemy import event
+
+import main
+from agents.concierge_agent import concierge_agent
+from agents.db_agent import db_agent
+from agents.doctor_assistant_agent import doctor_assistant_agent
+from agents.tools.list_utils import approx_tokens
+from config import settings
+from database import engine
+
+# (username, password, patient the user asks about); from the dummy data
+CONCIERGE_USERS = [
+    ("john", "john123", 1),
+    ("sarah", "sarah123", 2),
+    ("michael", "michael123", 3),
+    ("aisha", "aisha123", 4),
+    ("lucas", "lucas123", 5),
+    ("grandpa", "grandpa123", 6),
+    ("joy", "joy123", 3),
+    ("farah", "farah123", 4),
+    ("admin", "admin123", 2),
+]
+DOCTOR_USERS = [("dr_alice", "doctor123", 1), ("dr_bernard", "doctor123", 5)]
+PATIENT_IDS = [1, 2, 3, 4, 5, 6]
+DEFAULT_MIX = "ask=4,doctor_ask=2,patient=3,login=1,history=2"
+
+_queries: ContextVar[Optional[List[int]]] = ContextVar("load_test_queries", default=None)
+
+
+class ScriptedStubLlm(BaseLlm):
+    """Stub model: makes the scripted tool calls of a turn one per call, then answers.
+
+    With db_assistant among the tools it delegates to it once; otherwise it calls each
+    (tool, action) of `tool_calls` that the agent has, with the patient named in the
+    turn's prompt. Usage metadata is filled with approximate token counts.
+    """
+
+    model: str = "scripted-stub"
+    tool_calls: List[Tuple[str, str]] = [("medication", "list_medications")]
+    latency_ms: float = 300.0
+    jitter_ms: float = 100.0
+    seed: int = 0
+    _rng: random.Random = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+
+    def _plan(self, llm_request, prompt: str) -> List[types.FunctionCall]:
+        if "db_assistant" in llm_request.tools_dict:
+            return [types.FunctionCall(name="db_assistant", args={"request": prompt})]
+        match = re.search(r"patient (?:id )?(\d+)", prompt)
+        payload = {"patient_id": int(match.group(1)) if match else 1}
+        return [
+            types.FunctionCall(name=f"handle_{tool}_action", args={"action": action, "payload": payload})
+            for tool, action in self.tool_calls
+            if f"handle_{tool}_action" in llm_request.tools_dict
+        ]
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(delay, 0) / 1000)
+
+        contents = llm_request.contents
+        start = max(
+            (i for i, c in enumerate(contents) if c.role == "user" and any(p.text for p in c.parts or [])),
+            default=0,
+        )
+        prompt = "".join(p.text or "" for p in contents[start].parts or []) if contents else ""
+        made = sum(1 for c in contents[start:] for p in c.parts or [] if p.function_call)
+        plan = self._plan(llm_request, prompt)
+        if made < len(plan):
+            part = types.Part(function_call=plan[made])
+        else:
+            part = types.Part(text=f"Here is the summary you asked for ({made} lookups).")
+
+        prompt_tokens = approx_tokens(llm_request.config.system_instruction or "") + approx_tokens(
+            [c.model_dump(mode="json", exclude_none=True) for c in contents]
+        )
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens, candidates_token_count=approx_tokens(part.model_dump(exclude_none=True))
+            ),
+        )
+
+
+@contextmanager
+def stubbed_models(stub: BaseLlm):
+    """Serve both model tiers of every agent from the stub, restoring the real models after."""
+    agents = (concierge_agent, doctor_assistant_agent, db_agent)
+    backends = {settings.LLM_MODEL_STRONG: stub, settings.LLM_MODEL_LIGHT: stub}
+    saved = [agent.model.set_backends(backends) for agent in agents]
+    try:
+        yield stub
+    finally:
+        for agent, backends in zip(agents, saved):
+            agent.model.set_backends(backends)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, int], seed: int):
+        self.client = client
+        self.mix = mix
+        self.rng = random.Random(seed)
+        self.sessions: Dict[str, List[Tuple[str, str]]] = defaultdict(list)  # kind -> [(user, session_id)]
+        self.turn_counter = itertools.count()
+
+    def _ask_body(self, users) -> Dict[str, Any]:
+        user, _, patient_id = self.rng.choice(users)
+        # the patient id (a digit) keeps these prompts out of the response cache; the request
+        # number only makes each prompt distinct in traces and history
+        prompt = f"Summarise the records of patient {patient_id}, please (request {next(self.turn_counter)})."
+        return {"prompt": prompt, "user_name": user, "response_mode": "delta"}
+
+    def request(self, kind: str) -> Tuple[str, str, str, Dict[str, Any]]:
+        """(label, method, path, kwargs) of one request of the given kind."""
+        if kind == "ask":
+            return "POST /ask", "POST", "/ask", {"json": self._ask_body(CONCIERGE_USERS)}
+        if kind == "doctor_ask":
+            return "POST /doctor/ask", "POST", "/doctor/ask", {"json": self._ask_body(DOCTOR_USERS)}
+        if kind == "patient":
+            return "GET /patients/{id}", "GET", f"/patients/{self.rng.choice(PATIENT_IDS)}", {}
+        if kind == "login":
+            user, password, _ = self.rng.choice(CONCIERGE_USERS + DOCTOR_USERS)
+            return "POST /auth/login", "POST", "/auth/login", {"json": {"username": user, "password": password}}
+        if kind == "history":
+            app = self.rng.choice([k for k in ("ask", "doctor_ask") if self.sessions[k]])
+            user, session_id = self.rng.choice(self.sessions[app])
+            if self.rng.random() < 0.5:
+                path = "/ask/history" if app == "ask" else "/doctor/ask/history"
+                params = {"session_id": session_id}
+            else:
+                path = "/ask/history/by_user" if app == "ask" else "/doctor/history/by_user"
+                params = {"user_id": user}
+            return f"GET {path}", "GET", path, {"params": params}
+        raise ValueError(f"unknown request kind {kind}")
+
+    async def send(self, kind: str) -> Tuple[str, Any, float, int]:
+        label, method, path, kwargs = self.request(kind)
+        counter = [0]
+        token = _queries.set(counter)
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+            status = response.status_code
+            if status == 200 and kind in ("ask", "doctor_ask"):
+                self.sessions[kind].append((kwargs["json"]["user_name"], response.json()["session_id"]))
+        except Exception as e:  # e.g. a pool checkout timeout surfacing through the app
+            status = type(e).__name__
+        finally:
+            _queries.reset(token)
+        return label, status, time.perf_counter() - started, counter[0]
+
+    async def warm_up(self) -> None:
+        """One turn per user, so history requests have sessions to read."""
+        for kind, users in (("ask", CONCIERGE_USERS), ("doctor_ask", DOCTOR_USERS)):
+            if self.mix.get(kind) or self.mix.get("history"):
+                for user, _, patient_id in users:
+                    body = {"prompt": f"Summarise the records of patient {patient_id}.", "user_name": user}
+                    response = await self.client.post("/ask" if kind == "ask" else "/doctor/ask", json=body)
+                    if response.status_code == 200:
+                        self.sessions[kind].append((user, response.json()["session_id"]))
+        if self.mix.get("history") and not any(self.sessions.values()):
+            print("warm-up produced no sessions: history requests are skipped")
+            del self.mix["history"]
+
+    async def run(self, concurrency: int, requests: int) -> Tuple[float, List[Tuple[str, Any, float, int]]]:
+        kinds, weights = zip(*self.mix.items())
+        plan = self.rng.choices(kinds, weights=weights, k=requests)
+        queue: asyncio.Queue = asyncio.Queue()
+        for kind in plan:
+            queue.put_nowait(kind)
+        results: List[Tuple[str, Any, float, int]] = []
+
+        async def worker():
+            while not queue.empty():
+                results.append(await self.send(queue.get_nowait()))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - started, results
+
+
+def _ok(status: Any) -> bool:
+    return isinstance(status, int) and 200 <= status < 400
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(concurrency: int, elapsed: float, results: List[Tuple[str, Any, float, int]]) -> None:
+    errors = sum(1 for _, status, _, _ in results if not _ok(status))
+    print(
+        f"\nconcurrency {concurrency}: {len(results)} requests in {elapsed:.1f}s, "
+        f"{len(results) / elapsed:.1f} req/s, {errors} errors"
+    )
+    print(f"{'endpoint':<28}{'n':>6}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}  errors")
+    by_label: Dict[str, list] = defaultdict(list)
+    for row in results:
+        by_label[row[0]].append(row)
+    for label in sorted(by_label):
+        rows = by_label[label]
+        latencies = sorted(r[2] * 1000 for r in rows)
+        queries = sum(r[3] for r in rows) / len(rows)
+        failed = Counter(str(r[1]) for r in rows if not _ok(r[1]))
+        failed_text = ", ".join(f"{status}x{n}" for status, n in sorted(failed.items())) or "-"
+        print(
+            f"{label:<28}{len(rows):>6}{len(rows) / elapsed:>8.1f}{_percentile(latencies, 50):>9.0f}"
+            f"{_percentile(latencies, 95):>9.0f}{_percentile(latencies, 99):>9.0f}{queries:>9.1f}  {failed_text}"
+        )
+
+
+def _parse_mix(text: str) -> Dict[str, int]:
+    mix = {}
+    for item in text.split(","):
+        kind, _, weight = item.partition("=")
+        if kind.strip() not in ("ask", "doctor_ask", "patient", "login", "history"):
+            raise SystemExit(f"unknown request kind in --mix: {kind!r}")
+        mix[kind.strip()] = int(weight or 1)
+    return {k: w for k, w in mix.items() if w > 0}
+
+
+async def main_async(args) -> None:
+    stub = ScriptedStubLlm(
+        tool_calls=[tuple(call.split(".", 1)) for call in args.tool_calls],
+        latency_ms=args.llm_latency_ms,
+        jitter_ms=args.jitter_ms,
+        seed=args.seed,
+    )
+    mix = _parse_mix(args.mix)
+    print(
+        f"mix {mix}, stub model {args.llm_latency_ms:.0f}±{args.jitter_ms:.0f} ms per call, "
+        f"tools {' '.join(args.tool_calls) or '-'} ({settings.AGENT_TOOL_MODE} mode)"
+    )
+    transport = httpx.ASGITransport(app=main.app)
+    with stubbed_models(stub):
+        async with main.app.router.lifespan_context(main.app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=300) as client:
+                test = LoadTest(client, mix, args.seed)
+                await test.warm_up()
+                if not test.mix:
+                    raise SystemExit("nothing left to run")
+                for concurrency in args.concurrency:
+                    elapsed, results = await test.run(concurrency, args.requests)
+                    report(concurrency, elapsed, results)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="in-flight requests, one run each")
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="request kinds and weights (ask, doctor_ask, patient, login, history)")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="stub: latency of one model call")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="stub: uniform +/- jitter per call")
+    parser.add_argument(
+        "--tool-calls", nargs="*", default=["medication.list_medications"], help="stub: tool.action calls per turn, in order"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,318 @@
+"""Record/replay of agent transcripts: LLM calls, tool calls and tokens per scripted scenario.
+
+`record` runs each scenario of replay_scenarios.json through the real agents (Gemini and
+the configured database) and writes a transcript per scenario to --dir: the runner's
+event stream plus, for every agent (nested db_assistant included), each model response
+and each tool result, in order.
+
+`replay` runs the same scenarios offline: model calls and tool calls (except AgentTools,
+whose agent runs and replays its own calls) are answered from the transcript through
+the agents' before_model / before_tool callbacks, so no network and no database are
+needed. The current instructions and tool declarations still build every request, so
+prompt growth from an edited agents/instructions/*.txt shows up in prompt tokens; a run
+that asks for a call the transcript does not have fails as diverged.
+
+Both modes compare each scenario with baseline.json in --dir and exit non-zero when LLM
+calls, tool calls or tokens exceed it (tokens by more than --tolerance), or when the
+scenario has no baseline. Re-recording live after an instruction edit is what catches
+extra round trips the model now makes.
+
+The committed transcripts/ were recorded against the load-test stub model (`record --stub
+--update-baseline`), so `replay` works offline out of the box; they check the tooling and
+prompt growth, not the model's behaviour. Re-record live to baseline real model answers.
+
+    python -m benchmarks.replay_regression record --update-baseline   # live, once
+    python -m benchmarks.replay_regression replay                     # offline, on every change
+    python -m benchmarks.replay_regression record                     # live, after prompt edits
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools import AgentTool
+from google.genai import types
+
+from agents.concierge_agent import concierge_agent
+from agents.db_agent import db_agent
+from agents.doctor_assistant_agent import doctor_assistant_agent
+from agents.memory_service import BoundedMemoryService
+from agents.tools.account_tools import set_current_user
+from agents.tools.list_utils import approx_tokens
+from config import settings
+
+APP_NAME = "replay_regression"
+HERE = os.path.dirname(__file__)
+SCENARIOS = os.path.join(HERE, "replay_scenarios.json")
+AGENTS = {"concierge": concierge_agent, "doctor": doctor_assistant_agent}
+METRICS = ("llm_calls", "tool_calls", "prompt_tokens", "completion_tokens")
+
+
+class TranscriptDiverged(Exception):
+    """The run asked for a model or tool call the transcript does not have."""
+
+
+def _request_tokens(llm_request) -> int:
+    """Approximate prompt size: system instruction, contents and tool declarations."""
+    config = llm_request.config
+    tools = [t.model_dump(mode="json", exclude_none=True) for t in (config.tools or [])] if config else []
+    return (
+        approx_tokens((config.system_instruction if config else None) or "")
+        + approx_tokens([c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents])
+        + (approx_tokens(tools) if tools else 0)
+    )
+
+
+def _response_tokens(response: LlmResponse) -> int:
+    return approx_tokens(response.content.model_dump(mode="json", exclude_none=True)) if response.content else 0
+
+
+class Transcript:
+    """Model and tool calls of one scenario, counted the same way when recording and replaying.
+
+    In replay mode (`recorded` given) the callbacks answer from the recorded calls, per
+    agent and in order, and raise TranscriptDiverged when the run goes off script.
+    """
+
+    def __init__(self, recorded: Optional[Dict[str, Any]] = None):
+        self.replaying = recorded is not None
+        self.model_calls: List[Dict[str, Any]] = []
+        self.tool_calls: List[Dict[str, Any]] = []
+        self._models: Dict[str, List[Dict[str, Any]]] = {}
+        self._tools: Dict[str, List[Dict[str, Any]]] = {}
+        for call in (recorded or {}).get("model_calls", []):
+            self._models.setdefault(call["agent"], []).append(call)
+        for call in (recorded or {}).get("tool_calls", []):
+            self._tools.setdefault(call["agent"], []).append(call)
+
+    def before_model(self, callback_context, llm_request) -> Optional[LlmResponse]:
+        agent = callback_context.agent_name
+        self.model_calls.append({"agent": agent, "prompt_tokens": _request_tokens(llm_request)})
+        if not self.replaying:
+            return None
+        queue = self._models.get(agent)
+        if not queue:
+            raise TranscriptDiverged(f"{agent} made a model call the transcript does not have")
+        recorded = queue.pop(0)
+        response = LlmResponse.model_validate(recorded["response"])
+        self.model_calls[-1].update(response=recorded["response"], completion_tokens=_response_tokens(response))
+        return response
+
+    @staticmethod
+    def _open_call(calls: List[Dict[str, Any]], agent: str, tool: Optional[str] = None) -> Dict[str, Any]:
+        """Latest call of the agent (and tool) without a response yet; nested calls finish first."""
+        return next(
+            c for c in reversed(calls) if c["agent"] == agent and c.get("tool") == tool and "response" not in c
+        )
+
+    def after_model(self, callback_context, llm_response) -> Optional[LlmResponse]:
+        if not self.replaying and not llm_response.partial:
+            self._open_call(self.model_calls, callback_context.agent_name).update(
+                response=llm_response.model_dump(mode="json", exclude_none=True),
+                completion_tokens=_response_tokens(llm_response),
+            )
+        return None
+
+    def before_tool(self, tool, args, tool_context) -> Optional[Dict[str, Any]]:
+        agent = tool_context.agent_name
+        self.tool_calls.append({"agent": agent, "tool": tool.name, "args": json.loads(json.dumps(args, default=str))})
+        if not self.replaying:
+            return None
+        queue = self._tools.get(agent)
+        if not queue:
+            raise TranscriptDiverged(f"{agent} called {tool.name}, which the transcript does not have")
+        recorded = queue.pop(0)
+        if (recorded["tool"], recorded["args"]) != (tool.name, self.tool_calls[-1]["args"]):
+            raise TranscriptDiverged(
+                f"{agent} called {tool.name}({self.tool_calls[-1]['args']}), "
+                f"transcript has {recorded['tool']}({recorded['args']})"
+            )
+        self.tool_calls[-1]["response"] = recorded["response"]
+        return None if isinstance(tool, AgentTool) else recorded["response"]
+
+    def after_tool(self, tool, args, tool_context, tool_response) -> Optional[Dict[str, Any]]:
+        if not self.replaying:
+            call = self._open_call(self.tool_calls, tool_context.agent_name, tool.name)
+            call["response"] = json.loads(json.dumps(tool_response, default=str))
+        return None
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "llm_calls": len(self.model_calls),
+            "tool_calls": len(self.tool_calls),
+            "prompt_tokens": sum(c["prompt_tokens"] for c in self.model_calls),
+            "completion_tokens": sum(c.get("completion_tokens", 0) for c in self.model_calls),
+        }
+
+    def unused(self) -> int:
+        return sum(len(q) for q in self._models.values()) + sum(len(q) for q in self._tools.values())
+
+    @contextmanager
+    def attached(self):
+        """Install the callbacks on every agent (first in line), restoring the old ones after."""
+        agents = (concierge_agent, doctor_assistant_agent, db_agent)
+        saved = [
+            (a.before_model_callback, a.after_model_callback, a.before_tool_callback, a.after_tool_callback)
+            for a in agents
+        ]
+
+        def chain(ours, existing):
+            return [ours, *(existing if isinstance(existing, list) else [existing] if existing else [])]
+
+        for agent, (bm, am, bt, at) in zip(agents, saved):
+            agent.before_model_callback = chain(self.before_model, bm)
+            agent.after_model_callback = chain(self.after_model, am)
+            agent.before_tool_callback = chain(self.before_tool, bt)
+            agent.after_tool_callback = chain(self.after_tool, at)
+        try:
+            yield self
+        finally:
+            for agent, (bm, am, bt, at) in zip(agents, saved):
+                agent.before_model_callback, agent.after_model_callback = bm, am
+                agent.before_tool_callback, agent.after_tool_callback = bt, at
+
+
+async def run_scenario(scenario: Dict[str, Any], recorded: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Run one scenario (recording, or replaying `recorded`); returns its transcript dict."""
+    user = scenario["user"]
+    set_current_user(user["user_name"], full_name=user.get("full_name"), role=user.get("role"), patient_id=user.get("patient_id"))
+    runner = Runner(
+        agent=AGENTS[scenario["agent"]],
+        app_name=APP_NAME,
+        session_service=InMemorySessionService(),
+        memory_service=BoundedMemoryService(),
+    )
+    session = await runner.session_service.create_session(app_name=APP_NAME, user_id=user["user_name"])
+
+    transcript = Transcript(recorded)
+    events, answers, error = [], [], None
+    with transcript.attached():
+        try:
+            for prompt in scenario["turns"]:
+                answer = ""
+                message = types.Content(role="user", parts=[types.Part(text=prompt)])
+                async for event in runner.run_async(user_id=user["user_name"], session_id=session.id, new_message=message):
+                    events.append(event.model_dump(mode="json", exclude_none=True))
+                    if event.is_final_response() and event.content and event.content.parts:
+                        answer = event.content.parts[0].text or ""
+                answers.append(answer)
+        except TranscriptDiverged as e:
+            error = str(e)
+    if recorded is not None and error is None and answers != recorded["answers"]:
+        error = "final answers differ from the transcript"
+
+    return {
+        "scenario": scenario["name"],
+        "model": {"strong": settings.LLM_MODEL_STRONG, "light": settings.LLM_MODEL_LIGHT, "tool_mode": settings.AGENT_TOOL_MODE},
+        "metrics": transcript.metrics(),
+        "answers": answers,
+        "model_calls": transcript.model_calls,
+        "tool_calls": transcript.tool_calls,
+        "events": events,
+        "error": error,
+        "unused_calls": transcript.unused() if recorded is not None else 0,
+    }
+
+
+def compare(metrics: Dict[str, int], baseline: Optional[Dict[str, int]], tolerance: float) -> List[str]:
+    """Metrics that went past the baseline (counts exactly, tokens beyond the tolerance).
+
+    A scenario without a baseline fails: there is nothing to hold it to.
+    """
+    if baseline is None:
+        return ["no baseline; record it with --update-baseline"]
+    failures = []
+    for name in METRICS:
+        limit = baseline.get(name, 0) * (1 + tolerance if name.endswith("_tokens") else 1)
+        if metrics[name] > limit:
+            failures.append(f"{name} {baseline.get(name, 0)} -> {metrics[name]}")
+    return failures
+
+
+def _load(path: str, default: Any) -> Any:
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _dump(path: str, data: Any) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=str)
+        f.write("\n")
+
+
+async def main_async(args) -> int:
+    scenarios = [s for s in _load(SCENARIOS, []) if not args.scenario or s["name"] in args.scenario]
+    os.makedirs(args.dir, exist_ok=True)
+    baseline_path = os.path.join(args.dir, "baseline.json")
+    baseline = _load(baseline_path, {})
+
+    models = nullcontext()
+    if args.mode == "record" and args.stub:
+        from benchmarks.load_test import ScriptedStubLlm, stubbed_models
+
+        models = stubbed_models(ScriptedStubLlm(latency_ms=0, jitter_ms=0))
+
+    failed = 0
+    source = "offline" if args.mode == "replay" else "stub model" if args.stub else "live"
+    print(f"{args.mode} {len(scenarios)} scenarios ({source}; baseline {baseline_path})")
+    if not os.path.exists(baseline_path) and not args.update_baseline:
+        print("no baseline.json yet: every scenario fails until one is recorded with --update-baseline")
+    print(f"{'scenario':<38}{'LLM calls':>10}{'tools':>7}{'prompt tok':>12}{'output tok':>12}  result")
+    with models:
+        for scenario in scenarios:
+            path = os.path.join(args.dir, f"{scenario['name']}.json")
+            recorded = None
+            if args.mode == "replay":
+                recorded = _load(path, None)
+                if recorded is None:
+                    print(f"{scenario['name']:<38}  no transcript; run `record` first")
+                    failed += 1
+                    continue
+            result = await run_scenario(scenario, recorded)
+            if args.mode == "record" and result["error"] is None:
+                _dump(path, result)
+
+            m = result["metrics"]
+            problems = [result["error"]] if result["error"] else []
+            if args.update_baseline and not problems:
+                baseline[scenario["name"]] = m
+            else:
+                problems += compare(m, baseline.get(scenario["name"]), args.tolerance)
+            failed += bool(problems)
+            status = "FAIL: " + "; ".join(problems) if problems else "ok"
+            if not problems and result["unused_calls"]:
+                status += f" ({result['unused_calls']} recorded calls not used)"
+            print(
+                f"{scenario['name']:<38}{m['llm_calls']:>10}{m['tool_calls']:>7}"
+                f"{m['prompt_tokens']:>12}{m['completion_tokens']:>12}  {status}"
+            )
+
+    if args.update_baseline:
+        _dump(baseline_path, baseline)
+        print(f"baseline written to {baseline_path}")
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--scenario", nargs="*", help="only these scenarios (default: all)")
+    parser.add_argument("--dir", default=os.path.join(HERE, "transcripts"), help="transcripts and baseline.json")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed token growth over the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run's metrics as the baseline")
+    parser.add_argument(
+        "--stub", action="store_true", help="record against the load-test stub model (checks the tooling, not the prompts)"
+    )
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
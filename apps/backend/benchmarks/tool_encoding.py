@@ -0,0 +1,164 @@
+"""Token and latency cost of verbose vs compact tool results (TOOL_RESULT_COMPACT).
+
+Part 1 needs nothing: it encodes synthetic but realistic patient, medication and
+condition rows both ways and reports approximate tokens (~4 chars/token) and encode time.
+
+Part 2 (--patient-id) runs list_medications end to end through an ADK Runner against the
+configured database: the model calls the tool, and the size of the next model request
+(what the tool result adds to the context) and the wall time are recorded. The model is a
+local stub unless --live is given, in which case Gemini's reported prompt tokens are used.
+
+    python -m benchmarks.tool_encoding --rows 20 50 100
+    python -m benchmarks.tool_encoding --patient-id 1 --iterations 20 [--live]
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from agents.tools.encoding import compact_result, compact_tool
+from agents.tools.list_utils import approx_tokens
+from agents.tools.medication_tools import handle_medication_action
+from config import settings
+
+APP_NAME = "tool_encoding_bench"
+
+FIRST = ["John", "Maria", "Aisha", "Lucas", "Wei Ling", "Ravi", "Grace", "Ahmad", "Siew Mei", "Daniel"]
+LAST = ["Lim", "Tan", "Rahman", "Wong", "Kumar", "Ng", "Lee", "Ong", "Goh", "Chua"]
+MEDS = [
+    ("amlodipine", "5mg"), ("metformin", "500mg"), ("atorvastatin", "20mg"), ("lisinopril", "10mg"),
+    ("omeprazole", "20mg"), ("levothyroxine", "50mcg"), ("salbutamol inhaler", "2 puffs"), ("aspirin", "100mg"),
+]
+CONDITIONS = ["Hypertension", "Type 2 Diabetes", "Asthma", "Hyperlipidemia", "Hypothyroidism", "GERD", "Eczema"]
+
+
+def synthetic(kind: str, n: int, rng: random.Random) -> list:
+    start = date(2025, 1, 1)
+    rows = []
+    for i in range(1, n + 1):
+        if kind == "patients":
+            rows.append({
+                "id": i,
+                "full_name": f"{rng.choice(FIRST)} {rng.choice(LAST)}",
+                "birthdate": str(date(1940, 1, 1) + timedelta(days=rng.randrange(30000))),
+                "gender": rng.choice(["Male", "Female"]),
+                "contact_number": str(rng.randrange(80000000, 99999999)),
+                "address": f"Blk {rng.randrange(1, 999)} {rng.choice(['Bedok', 'Tampines', 'Yishun', 'Jurong'])}, Singapore",
+                "emergency_contact": f"{rng.choice(FIRST)} {rng.choice(LAST)} - {rng.randrange(80000000, 99999999)}",
+            })
+        elif kind == "medications":
+            name, dose = rng.choice(MEDS)
+            begin = start + timedelta(days=rng.randrange(300))
+            rows.append({
+                "id": i,
+                "patient_id": 1,
+                "medication_name": name,
+                "dosage": dose,
+                "frequency": rng.choice(["once daily", "twice daily", "every 8 hours"]),
+                "intake_time": f"{rng.choice([8, 13, 20, 22]):02d}:00:00",
+                "start_date": str(begin),
+                "end_date": str(begin + timedelta(days=rng.choice([7, 30, 90]))),
+                "status": rng.choice(["pending", "taken", "missed"]),
+                "remarks": rng.choice([None, None, "after food", "before bed"]),
+            })
+        else:
+            rows.append({
+                "id": i,
+                "patient_id": 1,
+                "condition_name": rng.choice(CONDITIONS),
+                "severity_level": rng.choice(["mild", "moderate", "severe"]),
+                "diagnosed_date": str(start - timedelta(days=rng.randrange(3000))),
+            })
+    return rows
+
+
+def encoding_report(sizes: list, repeat: int = 200) -> None:
+    rng = random.Random(7)
+    print(f"{'data':<12}{'rows':>6}{'verbose tok':>13}{'compact tok':>13}{'saved':>8}{'encode µs':>11}")
+    for kind in ("patients", "medications", "conditions"):
+        for n in sizes:
+            result = {"status": "success", "action": f"list_{kind}", "data": synthetic(kind, n, rng), "count": n, "more": False}
+            verbose, compact = approx_tokens(result), approx_tokens(compact_result(result))
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                json.dumps(compact_result(result))
+            encode_us = (time.perf_counter() - t0) / repeat * 1e6
+            print(f"{kind:<12}{n:>6}{verbose:>13}{compact:>13}{1 - compact / verbose:>8.0%}{encode_us:>11.0f}")
+
+
+class ListMedicationsStubLlm(BaseLlm):
+    """Stub model: calls list_medications once, records the size of the follow-up request."""
+
+    model: str = "list-medications-stub"
+    patient_id: int = 1
+    request_tokens: list = []
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        last = llm_request.contents[-1]
+        if any(p.function_response for p in last.parts or []):
+            self.request_tokens.append(approx_tokens([c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents]))
+            part = types.Part(text="done")
+        else:
+            args = {"action": "list_medications", "payload": {"patient_id": self.patient_id, "limit": settings.TOOL_LIST_MAX_LIMIT}}
+            part = types.Part(function_call=types.FunctionCall(name="handle_medication_action", args=args))
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+async def end_to_end(patient_id: int, iterations: int, live: bool) -> None:
+    if live:
+        from google.adk.models.google_llm import Gemini
+        model = Gemini(model=settings.LLM_MODEL_STRONG)
+    else:
+        model = ListMedicationsStubLlm(patient_id=patient_id, request_tokens=[])
+    agent = LlmAgent(
+        name="db_assistant",
+        model=model,
+        instruction="Call handle_medication_action with action list_medications for the given patient, then reply 'done'.",
+        tools=[compact_tool(handle_medication_action)],
+    )
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=InMemorySessionService())
+    prompt = types.Content(role="user", parts=[types.Part(text=f"List medications of patient_id {patient_id} (limit {settings.TOOL_LIST_MAX_LIMIT}).")])
+
+    print(f"\nlist_medications for patient {patient_id}, {iterations} turns per mode ({'Gemini' if live else 'stub model'})")
+    print(f"{'mode':<9}{'p50 ms':>9}{'p95 ms':>9}{'context tok':>13}")
+    for compact in (False, True):
+        settings.TOOL_RESULT_COMPACT = compact
+        latencies, tokens = [], []
+        for _ in range(iterations):
+            session = await runner.session_service.create_session(app_name=APP_NAME, user_id="bench")
+            t0 = time.perf_counter()
+            async for event in runner.run_async(user_id="bench", session_id=session.id, new_message=prompt):
+                if live and event.usage_metadata and event.usage_metadata.prompt_token_count:
+                    last_prompt = event.usage_metadata.prompt_token_count
+            latencies.append((time.perf_counter() - t0) * 1000)
+            tokens.append(last_prompt if live else model.request_tokens[-1])
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{'compact' if compact else 'verbose':<9}{statistics.median(latencies):>9.1f}{p95:>9.1f}{statistics.median(tokens):>13.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[20, 50, 100])
+    parser.add_argument("--patient-id", type=int, help="also run list_medications end to end against the DB")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--live", action="store_true", help="use Gemini instead of the stub model")
+    args = parser.parse_args()
+
+    encoding_report(args.rows)
+    if args.patient_id:
+        asyncio.run(end_to_end(args.patient_id, args.iterations, args.live))
+
+
+if __name__ == "__main__":
+    main()
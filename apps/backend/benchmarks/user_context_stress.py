@@ -0,0 +1,81 @@
+"""Concurrency stress check for the request-scoped user context.
+
+Fires hundreds of interleaved turns (one asyncio task per user, like uvicorn does per
+request) through a real ADK Runner whose model is a local stub that always calls
+`identify_user`. Exits non-zero if any turn sees another user's identity.
+
+    python -m benchmarks.user_context_stress --users 500 --rounds 3
+"""
+import argparse
+import asyncio
+import random
+import sys
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from agents.tools.account_tools import identify_user, set_current_user
+
+APP_NAME = "user_context_stress"
+
+
+class IdentifyUserStubLlm(BaseLlm):
+    """Stub model: calls identify_user, then answers with the user_name it returned."""
+
+    model: str = "identify-user-stub"
+    max_jitter: float = 0.005
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        await asyncio.sleep(random.uniform(0, self.max_jitter))
+        last = llm_request.contents[-1]
+        responses = [p.function_response for p in last.parts or [] if p.function_response]
+        if responses:
+            part = types.Part(text=responses[0].response.get("user_name", ""))
+        else:
+            part = types.Part(function_call=types.FunctionCall(name="identify_user", args={}))
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+async def _turn(runner: Runner, user_name: str) -> tuple:
+    set_current_user(user_name, full_name=user_name.title(), role="patient")
+    await asyncio.sleep(random.uniform(0, 0.005))  # let other requests interleave
+    session = await runner.session_service.create_session(app_name=APP_NAME, user_id=user_name)
+
+    seen = ""
+    async for event in runner.run_async(
+        user_id=user_name,
+        session_id=session.id,
+        new_message=types.Content(role="user", parts=[types.Part(text="Who am I?")]),
+    ):
+        if event.is_final_response() and event.content and event.content.parts:
+            seen = event.content.parts[0].text or ""
+    return user_name, seen
+
+
+async def run(users: int, rounds: int) -> int:
+    agent = LlmAgent(name="identity_probe", model=IdentifyUserStubLlm(), tools=[identify_user])
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=InMemorySessionService())
+
+    leaks = []
+    for r in range(rounds):
+        names = [f"user_{r}_{i}" for i in range(users)]
+        random.shuffle(names)
+        results = await asyncio.gather(*(asyncio.create_task(_turn(runner, n)) for n in names))
+        leaks += [(expected, seen) for expected, seen in results if expected != seen]
+        print(f"round {r + 1}/{rounds}: {users} turns, {len(leaks)} leaks so far")
+
+    for expected, seen in leaks[:10]:
+        print(f"LEAK: turn for {expected!r} identified as {seen!r}")
+    return 1 if leaks else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=300, help="concurrent users per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.users, args.rounds)))
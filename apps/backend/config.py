@@ -1,3 +1,5 @@
+from typing import Dict, Literal
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,6 +9,108 @@ class Settings(BaseSettings):
     DB_PASS: str
     DB_NAME: str
 
+    # Connection pool (per worker process: total connections ~ workers * (size + overflow))
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0       # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800         # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # prepared statements cached per connection (0 = off)
+
+    # ADK sessions persisted in Postgres
+    SESSION_EVENT_WINDOW: int = 200       # most recent events loaded into a session
+    SESSION_EVENT_BATCH_SIZE: int = 20    # buffered events per multi-row INSERT
+
+    # Agent memory bounds (per process)
+    MEMORY_MAX_ENTRIES_PER_USER: int = 500
+    MEMORY_MAX_USERS: int = 1000
+    MEMORY_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # Conversation history pages
+    HISTORY_PAGE_SIZE: int = 50
+    HISTORY_MAX_PAGE_SIZE: int = 200
+
+    # Write-behind persistence of conversation messages (off: one transaction per turn)
+    HISTORY_WRITE_BEHIND: bool = False
+    HISTORY_WRITE_BATCH_SIZE: int = 100
+    HISTORY_WRITE_FLUSH_SECONDS: float = 0.5
+    HISTORY_WRITE_MAX_QUEUE: int = 10000     # queued turns; submitting waits when full
+    HISTORY_WRITE_MAX_ATTEMPTS: int = 5      # flushes of a batch before its failing turns are dropped
+
+    # Patient profile cache (per process; optional shared Redis tier, needs `redis`)
+    PROFILE_CACHE_MAX_ENTRIES: int = 1000
+    PROFILE_CACHE_TTL_SECONDS: int = 60
+    PROFILE_CACHE_REDIS_URL: str | None = None
+
+    # list_* tool actions: page size and approximate token budget of one tool result
+    TOOL_LIST_DEFAULT_LIMIT: int = 20
+    TOOL_LIST_MAX_LIMIT: int = 100
+    TOOL_RESULT_TOKEN_BUDGET: int = 1500
+    # Opt-in: list results as a column header + row tuples, empty fields dropped, times shortened
+    TOOL_RESULT_COMPACT: bool = False
+
+    # Gemini models. Tier per agent: "light", "strong" or "auto" (opt-in: light for greetings and
+    # other small talk without clinical or record terms)
+    LLM_MODEL_STRONG: str = "gemini-2.5-flash"
+    LLM_MODEL_LIGHT: str = "gemini-2.5-flash-lite"
+    LLM_AGENT_TIERS: Dict[str, str] = {
+        "db_assistant": "light",          # tool dispatch
+        "concierge_assistant": "strong",  # patients ask clinical questions in few words
+        "doctor_assistant": "strong",     # clinical synthesis
+    }
+    LLM_SMALL_TALK_MAX_CHARS: int = 80
+    # Hedging: re-send a non-streaming call still running after the tier's p95 latency
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_PERCENTILE: float = 95.0
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+
+    # USD per 1M tokens, for the per-turn cost in conversation_messages_* (unlisted models cost 0)
+    LLM_PRICES_PER_MTOK: Dict[str, Dict[str, float]] = {
+        "gemini-2.5-flash": {"input": 0.30, "cached": 0.03, "output": 2.50},
+        "gemini-2.5-flash-lite": {"input": 0.10, "cached": 0.01, "output": 0.40},
+    }
+
+    # LLM admission control (per process): concurrent agent runs, per-user cap, bounded wait queue
+    LLM_MAX_CONCURRENT_TURNS: int = 8
+    LLM_MAX_TURNS_PER_USER: int = 2
+    LLM_ADMISSION_QUEUE_SIZE: int = 32
+    LLM_ADMISSION_MAX_WAIT_SECONDS: float = 20.0
+    # Gemini retries on 429/5xx; keep the worst case short so workers are not tied up
+    LLM_RETRY_ATTEMPTS: int = 3
+    LLM_RETRY_INITIAL_DELAY: float = 1.0
+    LLM_RETRY_EXP_BASE: float = 2.0
+    LLM_RETRY_MAX_DELAY: float = 8.0
+
+    # Turn deadline (server cap; clients may ask for less) and client-disconnect polling
+    AGENT_TURN_TIMEOUT_SECONDS: float = 120.0
+    AGENT_DISCONNECT_POLL_SECONDS: float = 0.5
+    # Gemini circuit breaker: opens on a high failure or slow-call rate over the window
+    LLM_BREAKER_WINDOW_SECONDS: float = 60.0
+    LLM_BREAKER_MIN_CALLS: int = 10
+    LLM_BREAKER_ERROR_RATE: float = 0.5
+    LLM_BREAKER_SLOW_CALL_SECONDS: float = 30.0
+    LLM_BREAKER_SLOW_RATE: float = 0.5
+    LLM_BREAKER_COOLDOWN_SECONDS: float = 30.0
+
+    # How the top-level agents reach the database: "nested" (through the db_assistant agent)
+    # or "flat" (handle_*_action tools attached directly, one LLM conversation per turn)
+    AGENT_TOOL_MODE: Literal["nested", "flat"] = "nested"
+
+    # Answer simple read requests of identified patients ("my medications today") without the LLM
+    FAST_PATH_ENABLED: bool = True
+
+    # Cache of concierge answers to generic questions (per process; turns without data tools only)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000
+    RESPONSE_CACHE_TTL_SECONDS: int = 600
+
+    # Tracing: spans feed the /metrics histograms; optional export as JSON lines ("-" = stdout)
+    # and/or to an OTLP/HTTP collector (e.g. http://localhost:4318/v1/traces)
+    TRACING_ENABLED: bool = True
+    TRACING_SERVICE_NAME: str = "healthline-backend"
+    TRACING_JSON_LOG: str | None = None
+    TRACING_OTLP_ENDPOINT: str | None = None
+
     class Config:
         extra = "allow"          # allow docker-compose env vars
 
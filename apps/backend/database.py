@@ -1,16 +1,94 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config import settings
+from tracing import instrument_engine
 
 DATABASE_URL = (
     f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASS}"
     f"@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
 )
 
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait and how many time out.
+
+    Only checkouts that reach the pool are timed: a connection already held by a
+    session is not checked out again.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=1000)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.recent_waits.append(waited)
+
+    def metrics(self) -> Dict[str, Any]:
+        waits = sorted(self.recent_waits)
+
+        def pct(q: float) -> Optional[float]:
+            return round(waits[min(len(waits) - 1, int(len(waits) * q))] * 1000, 2) if waits else None
+
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": self.overflow(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms": {
+                "avg": round(self.total_wait / self.checkouts * 1000, 2) if self.checkouts else None,
+                "p50": pct(0.5),
+                "p95": pct(0.95),
+                "max": round(self.max_wait * 1000, 2),
+            },
+        }
+
+
 engine = create_async_engine(
     DATABASE_URL,
     echo=False,               # set True for debugging queries
+    poolclass=InstrumentedPool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={
+        # asyncpg's server-side prepared statements and SQLAlchemy's cache of them;
+        # set DB_STATEMENT_CACHE_SIZE=0 behind pgbouncer in transaction mode
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    },
 )
 
+instrument_engine(engine.sync_engine)
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     autoflush=False,
@@ -23,3 +101,77 @@ async def get_db():
     """FastAPI dependency: yields an async session."""
     async with AsyncSessionLocal() as session:
         yield session
+
+
+# Turn-scoped unit of work: every tool call of an agent turn shares one session
+current_unit_of_work: ContextVar[Optional["UnitOfWork"]] = ContextVar("current_unit_of_work", default=None)
+
+
+class UnitOfWork:
+    """One AsyncSession shared by all tool calls of a turn, committed once at the end.
+
+    CRUDService only flushes on a unit-of-work session (see `session.info`). The lock
+    serializes parallel tool calls, since an AsyncSession must not be used concurrently.
+    Hooks registered with `after_commit` run once the transaction is committed.
+    """
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self._session: Optional[AsyncSession] = None
+        self._after_commit: List[Callable[[], Awaitable[Any]]] = []
+
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = AsyncSessionLocal(info={"unit_of_work": True})
+        return self._session
+
+    def after_commit(self, hook: Callable[[], Awaitable[Any]]) -> None:
+        self._after_commit.append(hook)
+
+    async def commit(self) -> None:
+        if self._session is not None:
+            await self._session.commit()
+        hooks, self._after_commit = self._after_commit, []
+        for hook in hooks:
+            try:
+                await hook()
+            except Exception as e:
+                print(f"⚠️ after-commit hook failed: {e}")
+
+    async def rollback(self) -> None:
+        self._after_commit = []
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+@asynccontextmanager
+async def unit_of_work():
+    """Run a block (an agent turn) in one transaction: commit on success, roll back on error."""
+    uow = UnitOfWork()
+    token = current_unit_of_work.set(uow)
+    try:
+        yield uow
+        await uow.commit()
+    except BaseException:
+        await uow.rollback()
+        raise
+    finally:
+        current_unit_of_work.reset(token)
+        await uow.close()
+
+
+@asynccontextmanager
+async def tool_session():
+    """Session for one tool call: the turn's unit of work, or a unit of work of its own."""
+    uow = current_unit_of_work.get()
+    if uow is None:
+        async with unit_of_work() as uow:
+            yield uow.session()
+        return
+    async with uow.lock:
+        yield uow.session()
@@ -1,15 +1,38 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
+from agents.admission import admission
+from agents.circuit_breaker import circuit_breaker
+from agents.llm import llm_stats
+from agents.history_writer import history_writer
 from agents.routes import router as agent_router
 from agents.routes_doctor import router as doctor_agent_router
 from routes.ai_history import router as ai_history_router
 from routes.patients import router as patient_router
 from routes.auth import router as auth_router
 from routes.users import router as user_router
+from routes.usage import router as usage_router
 from config import settings
-from database import DATABASE_URL
+from database import DATABASE_URL, engine
+from tracing import TracingMiddleware, render_metrics, setup_tracing, shutdown_tracing
+
+setup_tracing()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.HISTORY_WRITE_BEHIND:
+        history_writer.start()
+    yield
+    await history_writer.stop()  # flush queued messages before exit
+    shutdown_tracing()  # export buffered spans
 
-app = FastAPI(title="My AI Health Line Backend")
+
+app = FastAPI(title="My AI Health Line Backend", lifespan=lifespan)
+app.add_middleware(TracingMiddleware)
 
 
 @app.get("/")
@@ -29,6 +52,46 @@ def debug_env():
         "url": DATABASE_URL
     }
 
+@app.get("/health/pool")
+def pool_health():
+    """Connection pool usage of this worker: checked-out connections, overflow, waits, timeouts."""
+    return {
+        "pid": os.getpid(),
+        **engine.pool.metrics(),
+        "pool_timeout_s": settings.DB_POOL_TIMEOUT,
+        "pool_recycle_s": settings.DB_POOL_RECYCLE,
+        "pre_ping": settings.DB_POOL_PRE_PING,
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+
+
+@app.get("/health/admission")
+def admission_health():
+    """LLM admission control of this worker: running turns, queue depth by class, waits, rejections."""
+    return {"pid": os.getpid(), **admission.stats()}
+
+
+@app.get("/health/llm")
+def llm_health():
+    """Gemini in this worker: circuit breaker state, and latency / tokens per model tier."""
+    return {"pid": os.getpid(), **circuit_breaker.stats(), "tiers": llm_stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics of this worker: latency histograms per route, stage, tool action,
+    model call and SQL statement, plus pool / admission / circuit breaker gauges and counters."""
+    pool = engine.pool.metrics()
+    admitted = admission.stats()
+    gauges = {
+        "db_pool_checked_out": ("Connections checked out", pool["checked_out"]),
+        "db_pool_overflow": ("Overflow connections in use", max(pool["overflow"], 0)),
+        "llm_admission_active": ("Agent turns running", admitted["active"]),
+        "llm_admission_queue_depth": ("Agent turns waiting for a slot", admitted["queue_depth"]),
+        "llm_circuit_open": ("1 while the Gemini circuit breaker is open", int(circuit_breaker.is_open())),
+    }
+    counters = {"db_pool_checkout_timeouts_total": ("Checkouts that timed out", pool["timeouts"])}
+    return PlainTextResponse(render_metrics(gauges, counters), media_type="text/plain; version=0.0.4")
+
 # 👉 Register routes
 app.include_router(agent_router)          # /ask
 app.include_router(doctor_agent_router)   # /doctor/ask
@@ -36,3 +99,4 @@ app.include_router(ai_history_router)     # /ask/history/*
 app.include_router(patient_router)        # /patients/*
 app.include_router(auth_router)           # /auth/*
 app.include_router(user_router)           # /users/*
+app.include_router(usage_router)          # /usage/*
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Text, TIMESTAMP, Time
+from sqlalchemy import Column, Integer, BigInteger, String, Date, Float, ForeignKey, Index, Numeric, Text, TIMESTAMP, Time, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -17,6 +18,7 @@ class UserAccount(Base):
 
 class Patient(Base):
     __tablename__ = "patients"
+    __table_args__ = (Index("ix_patients_full_name_birthdate", "full_name", "birthdate"),)
 
     id = Column(Integer, primary_key=True, index=True)
     full_name = Column(String)
@@ -30,7 +32,7 @@ class Carer(Base):
     __tablename__ = "carers"
 
     id = Column(Integer, primary_key=True)
-    patient_id = Column(Integer, ForeignKey("patients.id"))
+    patient_id = Column(Integer, ForeignKey("patients.id"), index=True)
     full_name = Column(String)
     relationship_to_patient = Column(String)
     contact_number = Column(String)
@@ -40,14 +42,14 @@ class UserPatientAccess(Base):
     __tablename__ = "user_patient_access"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    patient_id = Column(Integer, ForeignKey("patients.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    patient_id = Column(Integer, ForeignKey("patients.id"), index=True)
 
 class MedicationSchedule(Base):
     __tablename__ = "medication_schedules"
 
     id = Column(Integer, primary_key=True)
-    patient_id = Column(Integer, ForeignKey("patients.id"))
+    patient_id = Column(Integer, ForeignKey("patients.id"), index=True)
     medication_name = Column(String)
     dosage = Column(String)
     frequency = Column(String)
@@ -59,39 +61,99 @@ class MedicationSchedule(Base):
 
 class ConversationSessionConcierge(Base):
     __tablename__ = "conversation_sessions_concierge"
+    __table_args__ = (Index("ix_conversation_sessions_concierge_user", "user_id", "created_at"),)
 
     id = Column(Integer, primary_key=True)
     session_id = Column(String, unique=True, index=True)
     app_name = Column(String)
     user_id = Column(String)
     created_at = Column(TIMESTAMP, server_default=func.now())
+    state = Column(JSONB, server_default=text("'{}'::jsonb"))   # ADK session state
+    updated_at = Column(TIMESTAMP, server_default=func.now())
 
 class ConversationMessageConcierge(Base):
     __tablename__ = "conversation_messages_concierge"
+    __table_args__ = (
+        Index("ix_conversation_messages_concierge_keyset", "session_id", "created_at", "id"),
+        Index("ix_conversation_messages_concierge_user_keyset", "user_id", "created_at", "id"),
+        Index("ix_conversation_messages_concierge_usage", "created_at", postgresql_where=text("prompt_tokens IS NOT NULL")),
+    )
+    __mapper_args__ = {"eager_defaults": True}   # INSERT ... RETURNING created_at
 
     id = Column(Integer, primary_key=True)
     session_id = Column(String, ForeignKey("conversation_sessions_concierge.session_id", ondelete="CASCADE"))
+    user_id = Column(String)   # the session's user, copied so per-user pages use their own index
     role = Column(String)   # user | assistant
     content = Column(Text)
     created_at = Column(TIMESTAMP, server_default=func.now())
+    # token accounting of the turn, on its last message (None when no model was called)
+    llm_calls = Column(Integer)
+    prompt_tokens = Column(Integer)       # includes cached_tokens
+    completion_tokens = Column(Integer)   # includes thinking tokens
+    cached_tokens = Column(Integer)
+    cost_usd = Column(Numeric(12, 6))
+    tool_path = Column(String)            # e.g. db_assistant>patient.list_patients
+    usage_by_agent = Column(JSONB)        # {agent: {llm_calls, prompt_tokens, ...}}
+
+class ConversationEventConcierge(Base):
+    __tablename__ = "conversation_events_concierge"
+    __table_args__ = (Index("ix_conversation_events_concierge_session_id", "session_id", "id"),)
+
+    id = Column(BigInteger, primary_key=True)
+    session_id = Column(String, ForeignKey("conversation_sessions_concierge.session_id", ondelete="CASCADE"))
+    event_id = Column(String)
+    invocation_id = Column(String)
+    author = Column(String)
+    timestamp = Column(Float)
+    payload = Column(JSONB)   # serialized google.adk Event
 
 class ConversationSessionDoctor(Base):
     __tablename__ = "conversation_sessions_doctor"
+    __table_args__ = (Index("ix_conversation_sessions_doctor_user", "user_id", "created_at"),)
 
     id = Column(Integer, primary_key=True)
     session_id = Column(String, unique=True, index=True)
     app_name = Column(String)
     user_id = Column(String)
     created_at = Column(TIMESTAMP, server_default=func.now())
+    state = Column(JSONB, server_default=text("'{}'::jsonb"))   # ADK session state
+    updated_at = Column(TIMESTAMP, server_default=func.now())
 
 class ConversationMessageDoctor(Base):
     __tablename__ = "conversation_messages_doctor"
+    __table_args__ = (
+        Index("ix_conversation_messages_doctor_keyset", "session_id", "created_at", "id"),
+        Index("ix_conversation_messages_doctor_user_keyset", "user_id", "created_at", "id"),
+        Index("ix_conversation_messages_doctor_usage", "created_at", postgresql_where=text("prompt_tokens IS NOT NULL")),
+    )
+    __mapper_args__ = {"eager_defaults": True}   # INSERT ... RETURNING created_at
 
     id = Column(Integer, primary_key=True)
     session_id = Column(String, ForeignKey("conversation_sessions_doctor.session_id", ondelete="CASCADE"))
+    user_id = Column(String)   # the session's user, copied so per-user pages use their own index
     role = Column(String)   # user | assistant
     content = Column(Text)
     created_at = Column(TIMESTAMP, server_default=func.now())
+    # token accounting of the turn, on its last message (None when no model was called)
+    llm_calls = Column(Integer)
+    prompt_tokens = Column(Integer)       # includes cached_tokens
+    completion_tokens = Column(Integer)   # includes thinking tokens
+    cached_tokens = Column(Integer)
+    cost_usd = Column(Numeric(12, 6))
+    tool_path = Column(String)            # e.g. db_assistant>patient.list_patients
+    usage_by_agent = Column(JSONB)        # {agent: {llm_calls, prompt_tokens, ...}}
+
+class ConversationEventDoctor(Base):
+    __tablename__ = "conversation_events_doctor"
+    __table_args__ = (Index("ix_conversation_events_doctor_session_id", "session_id", "id"),)
+
+    id = Column(BigInteger, primary_key=True)
+    session_id = Column(String, ForeignKey("conversation_sessions_doctor.session_id", ondelete="CASCADE"))
+    event_id = Column(String)
+    invocation_id = Column(String)
+    author = Column(String)
+    timestamp = Column(Float)
+    payload = Column(JSONB)   # serialized google.adk Event
 
 class LoginSession(Base):
     __tablename__ = "login_sessions"
@@ -108,7 +170,7 @@ class Condition(Base):
     __tablename__ = "conditions"
 
     id = Column(Integer, primary_key=True)
-    patient_id = Column(Integer, ForeignKey("patients.id"))
+    patient_id = Column(Integer, ForeignKey("patients.id"), index=True)
     condition_name = Column(String)
     severity_level = Column(String)
     diagnosed_date = Column(Date)
@@ -124,7 +186,7 @@ class Appointment(Base):
     __tablename__ = "appointments"
 
     id = Column(Integer, primary_key=True)
-    patient_id = Column(Integer, ForeignKey("patients.id"))
+    patient_id = Column(Integer, ForeignKey("patients.id"), index=True)
     doctor_id = Column(Integer, ForeignKey("doctors.id"))
     appointment_date = Column(TIMESTAMP)
     status = Column(String)
@@ -133,7 +195,7 @@ class Referral(Base):
     __tablename__ = "referrals"
 
     id = Column(Integer, primary_key=True)
-    appointment_id = Column(Integer, ForeignKey("appointments.id"))
+    appointment_id = Column(Integer, ForeignKey("appointments.id"), index=True)
     referred_to_specialization = Column(String)
     reason = Column(Text)
     status = Column(String)
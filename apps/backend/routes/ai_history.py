@@ -1,44 +1,32 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy import select
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from config import settings
 from database import get_db
-from models.models import ConversationSessionConcierge, ConversationMessageConcierge
+from services.conversation_service import ConciergeMessageService, page_to_payload
 
 router = APIRouter(prefix="/ask", tags=["ask"])
 
 
 @router.get("/history/by_user")
-async def get_history_by_user(user_id: str, db: AsyncSession = Depends(get_db)):
-    sessions = (
-        await db.scalars(
-            select(ConversationSessionConcierge.session_id)
-            .where(ConversationSessionConcierge.user_id == user_id)
-            .order_by(ConversationSessionConcierge.created_at.desc())
-        )
-    ).all()
+async def get_history_by_user(
+    user_id: str,
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """One keyset page of all the user's messages across sessions.
 
-    if not sessions:
+    `sessions` lists the sessions that appear on this page (in page order), not every
+    session of the user; walk the cursors to see the rest.
+    """
+    service = ConciergeMessageService(db)
+    if not await service.has_sessions(user_id):
         raise HTTPException(status_code=404, detail="No history for user")
 
-    history = (
-        await db.scalars(
-            select(ConversationMessageConcierge)
-            .where(ConversationMessageConcierge.session_id.in_(sessions))
-            .order_by(ConversationMessageConcierge.created_at)
-        )
-    ).all()
-
-    return {
-        "user_id": user_id,
-        "sessions": sessions,
-        "history": [
-            {
-                "session_id": msg.session_id,
-                "role": msg.role,
-                "content": msg.content,
-                "timestamp": msg.created_at.isoformat() if msg.created_at else None,
-            }
-            for msg in history
-        ],
-    }
+    rows, has_more = await service.page(user_id=user_id, limit=limit, before=before, after=after)
+    sessions = list(dict.fromkeys(row.session_id for row in rows))
+    return {"user_id": user_id, "sessions": sessions, **page_to_payload(rows, has_more)}
@@ -1,13 +1,23 @@
+import hashlib
+import json
 from datetime import date
+from itertools import chain
+from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy import select
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import JSON, func, literal, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from database import get_db
+from services.profile_cache import profile_cache
 from models.models import Patient, Condition, Appointment, Referral, Doctor, Carer, MedicationSchedule
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/patients", tags=["patients"])
 
+PROFILE_SECTIONS = ("conditions", "appointments", "referrals", "carers", "medications")
+
 
 def _calculate_age_group(birthdate: date | None):
     """Return (age, group) where group can be minor/elderly/adult/None."""
@@ -27,18 +37,124 @@ def _calculate_age_group(birthdate: date | None):
     return age, "adult"
 
 
-@router.get("/{patient_id}")
-async def get_patient_profile(
-    patient_id: int,
-    db: AsyncSession = Depends(get_db)
-):
+def _json_rows(fields: dict, order_by, *where, join=None):
+    """Scalar subquery: matching rows as a JSON array of objects (`[]` when there are none)."""
+    row = func.json_build_object(*chain.from_iterable((literal(k), v) for k, v in fields.items()))
+    query = select(func.coalesce(func.json_agg(aggregate_order_by(row, order_by)), text("'[]'::json"), type_=JSON))
+    if join is not None:
+        query = query.select_from(join)
+    return query.where(*where).scalar_subquery()
 
-    # Patient
-    patient = await db.scalar(
-        select(Patient).where(Patient.id == patient_id)
-    )
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found")
+
+def _profile_sections(patient_id: int) -> dict:
+    """One JSON-array subquery per profile section, keyed by section name."""
+    return {
+        "conditions": _json_rows(
+            {
+                "id": Condition.id,
+                "patient_id": Condition.patient_id,
+                "condition_name": Condition.condition_name,
+                "severity_level": Condition.severity_level,
+                "diagnosed_date": Condition.diagnosed_date,
+            },
+            Condition.id,
+            Condition.patient_id == patient_id,
+        ),
+        "appointments": _json_rows(
+            {
+                "appointment_id": Appointment.id,
+                "doctor": Doctor.full_name,
+                "specialization": Doctor.specialization,
+                "date": Appointment.appointment_date,
+                "status": Appointment.status,
+            },
+            Appointment.id,
+            Appointment.patient_id == patient_id,
+            join=Appointment.__table__.outerjoin(Doctor.__table__, Appointment.doctor_id == Doctor.id),
+        ),
+        "referrals": _json_rows(
+            {
+                "id": Referral.id,
+                "appointment_id": Referral.appointment_id,
+                "referred_to_specialization": Referral.referred_to_specialization,
+                "reason": Referral.reason,
+                "status": Referral.status,
+            },
+            Referral.id,
+            Appointment.patient_id == patient_id,
+            join=Referral.__table__.join(Appointment.__table__, Referral.appointment_id == Appointment.id),
+        ),
+        "carers": _json_rows(
+            {
+                "id": Carer.id,
+                "full_name": Carer.full_name,
+                "relationship_to_patient": Carer.relationship_to_patient,
+                "contact_number": Carer.contact_number,
+                "notes": Carer.notes,
+            },
+            Carer.id,
+            Carer.patient_id == patient_id,
+        ),
+        "medications": _json_rows(
+            {
+                "id": MedicationSchedule.id,
+                "medication_name": MedicationSchedule.medication_name,
+                "dosage": MedicationSchedule.dosage,
+                "frequency": MedicationSchedule.frequency,
+                "start_date": MedicationSchedule.start_date,
+                "end_date": MedicationSchedule.end_date,
+                "intake_time": MedicationSchedule.intake_time,
+                "status": MedicationSchedule.status,
+                "remarks": MedicationSchedule.remarks,
+            },
+            MedicationSchedule.id,
+            MedicationSchedule.patient_id == patient_id,
+        ),
+    }
+
+
+def _parse_include(include: Optional[str]) -> list:
+    if not include:
+        return list(PROFILE_SECTIONS)
+    sections = [s.strip() for s in include.split(",") if s.strip()]
+    unknown = sorted(set(sections) - set(PROFILE_SECTIONS))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include section(s): {', '.join(unknown)}. Choose from {', '.join(PROFILE_SECTIONS)}",
+        )
+    return [s for s in PROFILE_SECTIONS if s in sections]
+
+
+def _etag(payload: dict) -> str:
+    digest = hashlib.sha1(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    """Weak comparison of an If-None-Match header (comma-separated tags or `*`) with our ETag."""
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in (t.removeprefix("W/") for t in tags)
+
+
+@router.get("/cache/stats")
+async def profile_cache_stats():
+    """Hit/miss/eviction counters of the patient profile cache in this worker."""
+    return profile_cache.stats()
+
+
+async def _load_profile(db: AsyncSession, patient_id: int, sections: list) -> Optional[dict]:
+    """Patient profile built in a single query (one JSON-aggregate subquery per section)."""
+    subqueries = _profile_sections(patient_id)
+    row = (
+        await db.execute(
+            select(Patient, *(subqueries[s].label(s) for s in sections)).where(Patient.id == patient_id)
+        )
+    ).first()
+    if not row:
+        return None
+
+    patient = row.Patient
     age, age_group = _calculate_age_group(patient.birthdate)
     patient_payload = {
         "id": patient.id,
@@ -53,85 +169,30 @@ async def get_patient_profile(
         "requires_carer": age_group in {"minor", "elderly"},
     }
 
-    # Conditions
-    conditions = (
-        await db.scalars(
-            select(Condition).where(Condition.patient_id == patient_id)
-        )
-    ).all()
+    payload = jsonable_encoder({"patient": patient_payload, **{s: row._mapping[s] for s in sections}})
+    return {"payload": payload, "etag": _etag(payload)}
 
-    # Carers / guardians
-    carers = (
-        await db.scalars(
-            select(Carer).where(Carer.patient_id == patient_id)
-        )
-    ).all()
-    carers_payload = [
-        {
-            "id": c.id,
-            "full_name": c.full_name,
-            "relationship_to_patient": c.relationship_to_patient,
-            "contact_number": c.contact_number,
-            "notes": c.notes,
-        }
-        for c in carers
-    ]
-
-    # Medication schedules
-    meds = (
-        await db.scalars(
-            select(MedicationSchedule).where(MedicationSchedule.patient_id == patient_id)
-        )
-    ).all()
-    meds_payload = [
-        {
-            "id": m.id,
-            "medication_name": m.medication_name,
-            "dosage": m.dosage,
-            "frequency": m.frequency,
-            "start_date": m.start_date,
-            "end_date": m.end_date,
-            "intake_time": m.intake_time.isoformat() if m.intake_time else None,
-            "status": m.status,
-            "remarks": m.remarks,
-        }
-        for m in meds
-    ]
-
-    # Appointments (with doctor join)
-    appts_raw = (
-        await db.execute(
-            select(Appointment, Doctor)
-            .join(Doctor, Appointment.doctor_id == Doctor.id, isouter=True)
-            .where(Appointment.patient_id == patient_id)
-        )
-    ).all()
-
-    appointments = [
-        {
-            "appointment_id": a.Appointment.id,
-            "doctor": a.Doctor.full_name if a.Doctor else None,
-            "specialization": a.Doctor.specialization if a.Doctor else None,
-            "date": a.Appointment.appointment_date,
-            "status": a.Appointment.status,
-        }
-        for a in appts_raw
-    ]
-
-    # Referrals
-    referrals = (
-        await db.scalars(
-            select(Referral)
-            .join(Appointment, Referral.appointment_id == Appointment.id)
-            .where(Appointment.patient_id == patient_id)
-        )
-    ).all()
 
-    return {
-        "patient": patient_payload,
-        "conditions": conditions,
-        "appointments": appointments,
-        "referrals": referrals,
-        "carers": carers_payload,
-        "medications": meds_payload,
-    }
+@router.get("/{patient_id}")
+async def get_patient_profile(
+    patient_id: int,
+    request: Request,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Patient profile, served from the profile cache when possible.
+
+    `include` is a comma-separated subset of the sections (default: all). The response
+    carries an ETag; a matching If-None-Match is answered with 304.
+    """
+    sections = _parse_include(include)
+    profile = await profile_cache.get_or_load(
+        patient_id, ",".join(sections), lambda: _load_profile(db, patient_id, sections)
+    )
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+
+    etag = profile["etag"]
+    if _etag_matches(etag, request.headers.get("if-none-match", "")):
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(profile["payload"], headers={"ETag": etag})
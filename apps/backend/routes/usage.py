@@ -0,0 +1,60 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_db
+from services.usage_service import USAGE_SERVICES
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+Assistant = Literal["concierge", "doctor"]
+OrderBy = Literal["total_tokens", "prompt_tokens", "completion_tokens", "cost_usd", "turns"]
+
+
+@router.get("/top_users")
+async def top_users(
+    assistant: Assistant = "concierge",
+    days: int = Query(7, ge=1, le=365),
+    limit: int = Query(10, ge=1, le=100),
+    order_by: OrderBy = "total_tokens",
+    db: AsyncSession = Depends(get_db),
+):
+    """Users with the highest token usage (or cost) over the last `days` days."""
+    users = await USAGE_SERVICES[assistant](db).top_users(days=days, limit=limit, order_by=order_by)
+    return {"assistant": assistant, "days": days, "users": users}
+
+
+@router.get("/top_sessions")
+async def top_sessions(
+    assistant: Assistant = "concierge",
+    days: int = Query(7, ge=1, le=365),
+    limit: int = Query(10, ge=1, le=100),
+    order_by: OrderBy = "total_tokens",
+    db: AsyncSession = Depends(get_db),
+):
+    """Sessions with the highest token usage (or cost) over the last `days` days."""
+    sessions = await USAGE_SERVICES[assistant](db).top_sessions(days=days, limit=limit, order_by=order_by)
+    return {"assistant": assistant, "days": days, "sessions": sessions}
+
+
+@router.get("/tool_paths")
+async def tool_paths(
+    assistant: Assistant = "concierge",
+    days: int = Query(7, ge=1, le=365),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    """Average tokens per turn by the sequence of tools the turn called (nested agents included)."""
+    paths = await USAGE_SERVICES[assistant](db).tool_paths(days=days, limit=limit)
+    return {"assistant": assistant, "days": days, "tool_paths": paths}
+
+
+@router.get("/agents")
+async def agents(
+    assistant: Assistant = "concierge",
+    days: int = Query(7, ge=1, le=365),
+    db: AsyncSession = Depends(get_db),
+):
+    """Token totals per agent, e.g. concierge_assistant vs the nested db_assistant."""
+    return {"assistant": assistant, "days": days, "agents": await USAGE_SERVICES[assistant](db).by_agent(days=days)}
@@ -1,19 +1,92 @@
-from typing import Any, Dict, Type
+from typing import Any, Dict, List, Optional, Sequence, Type
 
-from sqlalchemy import select
+from sqlalchemy import func, insert, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
 class CRUDService:
-    """Base CRUD helper; subclasses must set `model`."""
+    """Base CRUD helper; subclasses must set `model`.
+
+    Read helpers take equality filters as keyword arguments (`patient_id=3`), which are
+    pushed down to SQL. Writes commit immediately, except on a unit-of-work session
+    (database.unit_of_work), where they are only flushed and the turn commits once.
+    """
 
     model: Type[Any]
 
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def list(self):
-        return (await self.db.scalars(select(self.model))).all()
+    async def _commit(self) -> None:
+        if self.db.info.get("unit_of_work"):
+            await self.db.flush()
+        else:
+            await self.db.commit()
+
+    def _column(self, name: str):
+        column = self.model.__table__.columns.get(name)
+        if column is None:
+            raise ValueError(f"{self.model.__name__} has no column {name}")
+        return getattr(self.model, column.key)
+
+    def _where(self, query, eq: Dict[str, Any]):
+        for name, value in eq.items():
+            query = query.where(self._column(name) == value)
+        return query
+
+    async def list(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[int] = None,
+        order_by: str = "id",
+        columns: Optional[Sequence[str]] = None,
+        where: Sequence[Any] = (),
+        **eq,
+    ):
+        """Rows matching `eq`, ordered by `order_by` ("-name" for descending) then id.
+
+        `cursor` is the id of the last row of the previous page (keyset pagination).
+        With `columns`, only those columns are selected and rows come back as
+        tuples with attribute access instead of model instances. `where` takes extra
+        SQLAlchemy criteria (ranges, ILIKE, ...).
+        """
+        descending = order_by.startswith("-")
+        order_col = self._column(order_by.lstrip("-"))
+        query = select(*(self._column(c) for c in columns)) if columns else select(self.model)
+        query = self._where(query, eq).where(*where)
+
+        if cursor is not None:
+            if order_col is self.model.id:
+                key, after = self.model.id, cursor
+            else:
+                key = tuple_(order_col, self.model.id)
+                after = tuple_(select(order_col).where(self.model.id == cursor).scalar_subquery(), cursor)
+            query = query.where(key < after if descending else key > after)
+
+        if descending:
+            query = query.order_by(order_col.desc(), self.model.id.desc())
+        else:
+            query = query.order_by(order_col, self.model.id)
+        if limit is not None:
+            query = query.limit(limit)
+
+        if columns:
+            return (await self.db.execute(query)).all()
+        return (await self.db.scalars(query)).all()
+
+    async def filter(self, **eq):
+        """All rows whose columns equal the given values."""
+        return await self.list(**eq)
+
+    async def first(self, **eq):
+        """The first matching row (lowest id) or None."""
+        return await self.db.scalar(self._where(select(self.model), eq).order_by(self.model.id).limit(1))
+
+    async def exists(self, **eq) -> bool:
+        return bool(await self.db.scalar(select(self._where(select(self.model.id), eq).exists())))
+
+    async def count(self, **eq) -> int:
+        return await self.db.scalar(self._where(select(func.count()).select_from(self.model), eq))
 
     async def get(self, obj_id: int):
         obj = await self.db.scalar(select(self.model).where(self.model.id == obj_id))
@@ -21,23 +94,55 @@ class CRUDService:
             raise ValueError(f"{self.model.__name__} not found")
         return obj
 
+    async def get_many(self, obj_ids: Sequence[int]) -> List[Any]:
+        """Rows with the given ids, in the order given; raises if any id does not exist."""
+        rows = {o.id: o for o in (await self.db.scalars(select(self.model).where(self.model.id.in_(obj_ids)))).all()}
+        missing = [i for i in obj_ids if i not in rows]
+        if missing:
+            raise ValueError(f"{self.model.__name__} not found: {', '.join(map(str, missing))}")
+        return [rows[i] for i in obj_ids]
+
     async def create(self, **data):
         obj = self.model(**data)
         self.db.add(obj)
-        await self.db.commit()
+        await self._commit()
         await self.db.refresh(obj)
         return obj
 
+    async def bulk_create(self, rows: Sequence[Dict[str, Any]]) -> List[Any]:
+        """Insert all rows with one multi-row INSERT ... RETURNING and a single commit."""
+        if not rows:
+            return []
+        objs = (
+            await self.db.scalars(insert(self.model).returning(self.model, sort_by_parameter_order=True), list(rows))
+        ).all()
+        await self._commit()
+        return objs
+
     async def update(self, obj_id: int, **data):
         obj = await self.get(obj_id)
         for k, v in data.items():
             setattr(obj, k, v)
-        await self.db.commit()
+        await self._commit()
         await self.db.refresh(obj)
         return obj
 
+    async def bulk_update(self, rows: Sequence[Dict[str, Any]]) -> List[Any]:
+        """Apply `{"id": ..., **fields}` changes in one transaction.
+
+        One SELECT loads every row; the flush batches the UPDATEs (executemany per
+        column set). Nothing is written if any id does not exist.
+        """
+        objs = await self.get_many([r["id"] for r in rows])
+        for obj, row in zip(objs, rows):
+            for k, v in row.items():
+                if k != "id":
+                    setattr(obj, k, v)
+        await self._commit()
+        return objs
+
     async def delete(self, obj_id: int):
         obj = await self.get(obj_id)
         await self.db.delete(obj)
-        await self.db.commit()
+        await self._commit()
         return {"status": "deleted", "id": obj_id}
@@ -0,0 +1,138 @@
+from typing import Any, Dict, List, Optional, Type
+
+from sqlalchemy import exists, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from services.base import CRUDService
+from models.models import (
+    ConversationMessageConcierge,
+    ConversationMessageDoctor,
+    ConversationSessionConcierge,
+    ConversationSessionDoctor,
+)
+
+
+class ConversationMessageService(CRUDService):
+    """Keyset-paginated reads of a conversation_messages_* table.
+
+    Pages are ordered by (created_at, id), matching the (session_id, created_at, id) and
+    (user_id, created_at, id) indexes, so fetching a page costs the same however long
+    the history is. Subclasses set `model` and `session_model`.
+    """
+
+    session_model: Type[Any]
+
+    def _cursor(self, msg_id: int):
+        return select(self.model.created_at).where(self.model.id == msg_id).scalar_subquery()
+
+    async def page(
+        self,
+        session_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        limit: int = 50,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+    ):
+        """Return (messages oldest-first, has_more).
+
+        Without a cursor the latest page is returned; `before` walks back to older
+        messages and `after` forward to newer ones. `has_more` says whether another
+        page exists in that direction.
+        """
+        key = tuple_(self.model.created_at, self.model.id)
+        query = select(self.model)
+        if session_id is not None:
+            query = query.where(self.model.session_id == session_id)
+        if user_id is not None:
+            query = query.where(self.model.user_id == user_id)
+
+        newest_first = after is None
+        if before is not None:
+            query = query.where(key < tuple_(self._cursor(before), before))
+        if after is not None:
+            query = query.where(key > tuple_(self._cursor(after), after))
+        if newest_first:
+            query = query.order_by(self.model.created_at.desc(), self.model.id.desc())
+        else:
+            query = query.order_by(self.model.created_at, self.model.id)
+
+        rows = list((await self.db.scalars(query.limit(limit + 1))).all())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if newest_first:
+            rows.reverse()
+        return rows, has_more
+
+    async def has_sessions(self, user_id: str) -> bool:
+        """Whether the user has any session (EXISTS, stops at the first row)."""
+        return bool(await self.db.scalar(select(exists().where(self.session_model.user_id == user_id))))
+
+    async def record(self, sessions: List[Dict[str, Any]], messages: List[Dict[str, Any]]):
+        """Upsert session rows and insert messages (multi-row INSERT) in one transaction.
+
+        Messages carry their session's `user_id`. Returns the inserted messages in the
+        order given.
+        """
+        if sessions:
+            await self.db.execute(
+                pg_insert(self.session_model).values(sessions).on_conflict_do_nothing(index_elements=["session_id"])
+            )
+        rows = []
+        if messages:
+            rows = (
+                await self.db.scalars(insert(self.model).returning(self.model, sort_by_parameter_order=True), messages)
+            ).all()
+        await self._commit()
+        return rows
+
+
+class ConciergeMessageService(ConversationMessageService):
+    model = ConversationMessageConcierge
+    session_model = ConversationSessionConcierge
+
+
+class DoctorMessageService(ConversationMessageService):
+    model = ConversationMessageDoctor
+    session_model = ConversationSessionDoctor
+
+
+def message_to_dict(msg: Any) -> dict:
+    if isinstance(msg, dict):  # queued by the write-behind writer, maybe not stored yet
+        created_at = msg.get("created_at")
+        return {
+            "id": msg.get("id"),
+            "session_id": msg["session_id"],
+            "role": msg["role"],
+            "content": msg["content"],
+            "timestamp": created_at.isoformat() if created_at else None,
+        }
+    return {
+        "id": msg.id,
+        "session_id": msg.session_id,
+        "role": msg.role,
+        "content": msg.content,
+        "timestamp": msg.created_at.isoformat() if msg.created_at else None,
+    }
+
+
+def add_queued(payload: dict, messages: List[Any]) -> dict:
+    """Append a turn's messages still queued by the write-behind writer to a history page.
+
+    The page is read from committed rows only; messages already stored (they have an id)
+    are added only if the page missed them.
+    """
+    ids = {m["id"] for m in payload["history"]}
+    payload["history"] += [m for m in map(message_to_dict, messages) if m["id"] not in ids]
+    return payload
+
+
+def page_to_payload(rows, has_more: bool) -> dict:
+    """History page plus the cursors for the previous (`before`) and next (`after`) page."""
+    return {
+        "history": [message_to_dict(m) for m in rows],
+        "has_more": has_more,
+        "cursor": {
+            "before": rows[0].id if rows else None,
+            "after": rows[-1].id if rows else None,
+        },
+    }
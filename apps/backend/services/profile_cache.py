@@ -0,0 +1,148 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import settings
+from database import current_unit_of_work
+
+
+class ProfileCache:
+    """Read-through cache for aggregated patient profiles (GET /patients/{id}).
+
+    Local tier: per-process LRU with a TTL. Optional shared tier: Redis, enabled by
+    PROFILE_CACHE_REDIS_URL (needs the `redis` package). Shared keys embed a per-patient
+    version that `invalidate()` bumps, so other workers stop serving the old entry too.
+    Entries are keyed by (patient_id, variant), the variant being the requested sections.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        redis_url: Optional[str] = None,
+    ):
+        self.max_entries = max_entries or settings.PROFILE_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.PROFILE_CACHE_TTL_SECONDS
+        self._entries: "OrderedDict[Tuple[int, str], tuple]" = OrderedDict()  # -> (expires_at, version, value)
+        self._generation: Dict[int, int] = {}  # bumped on invalidate; guards in-flight loads
+        self._redis = self._connect(redis_url or settings.PROFILE_CACHE_REDIS_URL)
+        self.counters = {
+            "hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "shared_errors": 0,
+        }
+
+    @staticmethod
+    def _connect(url: Optional[str]):
+        if not url:
+            return None
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            print("⚠️ PROFILE_CACHE_REDIS_URL is set but the redis package is not installed; using local cache only")
+            return None
+        return redis.from_url(url, decode_responses=True)
+
+    async def _shared_version(self, patient_id: int) -> int:
+        if self._redis is None:
+            return 0
+        try:
+            return int(await self._redis.get(f"profile:{patient_id}:version") or 0)
+        except Exception as e:
+            self.counters["shared_errors"] += 1
+            print(f"⚠️ Profile cache shared tier unavailable: {e}")
+            return -1  # unknown version: bypass every tier for this read
+
+    async def get_or_load(self, patient_id: int, variant: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value, or call `loader()` and cache its result (unless None)."""
+        key = (patient_id, variant)
+        version = await self._shared_version(patient_id)
+        entry = self._entries.get(key)
+        if entry is not None and version >= 0:
+            expires_at, entry_version, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.counters["expirations"] += 1
+            elif entry_version == version:
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return value
+
+        if self._redis is not None and version >= 0:
+            try:
+                raw = await self._redis.get(f"profile:{patient_id}:v{version}:{variant}")
+            except Exception:
+                self.counters["shared_errors"] += 1
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self._store(key, version, value)
+                self.counters["shared_hits"] += 1
+                return value
+
+        self.counters["misses"] += 1
+        generation = self._generation.get(patient_id, 0)
+        value = await loader()
+        if value is None or version < 0 or self._generation.get(patient_id, 0) != generation:
+            return value  # not found, shared tier down, or invalidated while loading
+
+        self._store(key, version, value)
+        if self._redis is not None:
+            try:
+                await self._redis.set(
+                    f"profile:{patient_id}:v{version}:{variant}", json.dumps(value), ex=self.ttl_seconds
+                )
+            except Exception:
+                self.counters["shared_errors"] += 1
+        return value
+
+    def _store(self, key: Tuple[int, str], version: int, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    async def invalidate(self, *patient_ids: Optional[int]) -> None:
+        """Drop every cached variant of the given patients (None ids are ignored).
+
+        Inside a unit of work this happens after the commit, so a concurrent read cannot
+        cache the pre-commit rows again.
+        """
+        uow = current_unit_of_work.get()
+        if uow is not None:
+            uow.after_commit(lambda: self._invalidate(patient_ids))
+            return
+        await self._invalidate(patient_ids)
+
+    async def _invalidate(self, patient_ids) -> None:
+        for patient_id in {int(p) for p in patient_ids if p}:
+            self._generation[patient_id] = self._generation.get(patient_id, 0) + 1
+            for key in [k for k in self._entries if k[0] == patient_id]:
+                del self._entries[key]
+            self.counters["invalidations"] += 1
+            if self._redis is not None:
+                try:
+                    await self._redis.incr(f"profile:{patient_id}:version")
+                except Exception as e:
+                    self.counters["shared_errors"] += 1
+                    print(f"⚠️ Could not invalidate shared profile cache for patient {patient_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["shared_hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "shared_tier": self._redis is not None,
+            "hit_rate": round((lookups - self.counters["misses"]) / lookups, 3) if lookups else None,
+        }
+
+
+profile_cache = ProfileCache()
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Type
+
+from sqlalchemy import Integer, desc, func, select, true
+
+from services.base import CRUDService
+from models.models import (
+    ConversationMessageConcierge,
+    ConversationMessageDoctor,
+    ConversationSessionConcierge,
+    ConversationSessionDoctor,
+)
+
+class TokenUsageService(CRUDService):
+    """Aggregates of the per-turn token columns of a conversation_messages_* table.
+
+    Only rows carrying a turn's usage (prompt_tokens set) are read, through the partial
+    ix_conversation_messages_*_usage index on created_at. Subclasses set `model` and
+    `session_model`.
+    """
+
+    session_model: Type[Any]
+
+    def _totals(self):
+        m = self.model
+        prompt = func.coalesce(func.sum(m.prompt_tokens), 0)
+        completion = func.coalesce(func.sum(m.completion_tokens), 0)
+        return [
+            func.count().label("turns"),
+            func.coalesce(func.sum(m.llm_calls), 0).label("llm_calls"),
+            prompt.label("prompt_tokens"),
+            completion.label("completion_tokens"),
+            func.coalesce(func.sum(m.cached_tokens), 0).label("cached_tokens"),
+            (prompt + completion).label("total_tokens"),
+            func.coalesce(func.sum(m.cost_usd), 0).label("cost_usd"),
+        ]
+
+    def _since(self, query, days: int):
+        return query.where(
+            self.model.prompt_tokens.is_not(None),
+            self.model.created_at >= datetime.now() - timedelta(days=days),
+        )
+
+    @staticmethod
+    def _rows(result) -> List[Dict[str, Any]]:
+        rows = []
+        for row in result.mappings():
+            row = dict(row)
+            row["cost_usd"] = float(row["cost_usd"])
+            rows.append(row)
+        return rows
+
+    async def top_users(self, days: int = 7, limit: int = 10, order_by: str = "total_tokens"):
+        user_id = self.session_model.user_id
+        query = (
+            select(user_id.label("user_id"), func.count(func.distinct(self.model.session_id)).label("sessions"), *self._totals())
+            .join(self.session_model, self.session_model.session_id == self.model.session_id)
+            .group_by(user_id)
+        )
+        query = self._since(query, days).order_by(desc(order_by)).limit(limit)
+        return self._rows(await self.db.execute(query))
+
+    async def top_sessions(self, days: int = 7, limit: int = 10, order_by: str = "total_tokens"):
+        query = (
+            select(
+                self.model.session_id,
+                func.min(self.session_model.user_id).label("user_id"),
+                func.max(self.model.created_at).label("last_turn_at"),
+                *self._totals(),
+            )
+            .join(self.session_model, self.session_model.session_id == self.model.session_id)
+            .group_by(self.model.session_id)
+        )
+        query = self._since(query, days).order_by(desc(order_by)).limit(limit)
+        rows = self._rows(await self.db.execute(query))
+        for row in rows:
+            row["last_turn_at"] = row["last_turn_at"].isoformat() if row["last_turn_at"] else None
+        return rows
+
+    async def tool_paths(self, days: int = 7, limit: int = 20):
+        """Average tokens per turn for each sequence of tool calls, most expensive first."""
+        m = self.model
+        avg_total = func.avg(m.prompt_tokens + m.completion_tokens)
+        query = (
+            select(
+                func.coalesce(func.nullif(m.tool_path, ""), "(no tools)").label("tool_path"),
+                func.count().label("turns"),
+                func.round(func.avg(m.llm_calls), 2).label("avg_llm_calls"),
+                func.round(func.avg(m.prompt_tokens)).label("avg_prompt_tokens"),
+                func.round(func.avg(m.completion_tokens)).label("avg_completion_tokens"),
+                func.round(avg_total).label("avg_total_tokens"),
+                func.coalesce(func.sum(m.cost_usd), 0).label("cost_usd"),
+            )
+            .group_by(m.tool_path)
+        )
+        query = self._since(query, days).order_by(avg_total.desc()).limit(limit)
+        rows = self._rows(await self.db.execute(query))
+        for row in rows:
+            for key in ("avg_llm_calls", "avg_prompt_tokens", "avg_completion_tokens", "avg_total_tokens"):
+                row[key] = float(row[key]) if row[key] is not None else None
+        return rows
+
+    async def by_agent(self, days: int = 7):
+        """Totals per agent, nested agents (db_assistant) included, from usage_by_agent."""
+        agents = func.jsonb_each(self.model.usage_by_agent).table_valued("key", "value").render_derived("agents")
+
+        def total(field: str):
+            return func.coalesce(func.sum(agents.c.value.op("->>")(field).cast(Integer)), 0).label(field)
+
+        query = (
+            select(
+                agents.c.key.label("agent"),
+                total("llm_calls"),
+                total("prompt_tokens"),
+                total("completion_tokens"),
+                total("cached_tokens"),
+            )
+            .select_from(self.model)
+            .join(agents, true())
+            .group_by(agents.c.key)
+        )
+        query = self._since(query, days).order_by(agents.c.key)
+        return [dict(row) for row in (await self.db.execute(query)).mappings()]
+
+
+class ConciergeUsageService(TokenUsageService):
+    model = ConversationMessageConcierge
+    session_model = ConversationSessionConcierge
+
+
+class DoctorUsageService(TokenUsageService):
+    model = ConversationMessageDoctor
+    session_model = ConversationSessionDoctor
+
+
+USAGE_SERVICES: Dict[str, Type[TokenUsageService]] = {
+    "concierge": ConciergeUsageService,
+    "doctor": DoctorUsageService,
+}
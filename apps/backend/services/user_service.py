@@ -1,6 +1,16 @@
+from typing import Iterable, Set
+
 from services.base import CRUDService
 from models.models import UserAccount
 
 
 class UserService(CRUDService):
     model = UserAccount
+
+    async def taken_usernames(self, usernames: Iterable[str]) -> Set[str]:
+        """Those of the given usernames that already belong to a user."""
+        names = [u for u in usernames if u]
+        if not names:
+            return set()
+        rows = await self.list(columns=["username"], where=[UserAccount.username.in_(names)])
+        return {r.username for r in rows}
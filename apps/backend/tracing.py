@@ -0,0 +1,273 @@
+import functools
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.trace import StatusCode
+from sqlalchemy import event
+
+from config import settings
+
+tracer = trace.get_tracer("healthline")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Prometheus-style latency histogram with a fixed label set (thread-safe)."""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str], buckets: Sequence[float] = BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for key, values in sorted(series.items()):
+            base = ",".join(f'{label}="{_escape(v)}"' for label, v in zip(self.labels, key))
+            sep = "," if base else ""
+            for bound, count in zip(self.buckets, values):
+                yield f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {count}'
+            yield f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {values[-1]}'
+            yield f"{self.name}_sum{{{base}}} {values[-2]:.6f}"
+            yield f"{self.name}_count{{{base}}} {values[-1]}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+# span kind (app.kind attribute) -> histogram; labels come from app.<label> attributes
+HISTOGRAMS = {
+    "http": Histogram("http_request_duration_seconds", "Time to respond, per route", ("method", "route", "status")),
+    "stage": Histogram("stage_duration_seconds", "Time per request stage", ("stage", "status")),
+    "tool": Histogram("tool_action_duration_seconds", "Time per tool action", ("tool", "action", "status")),
+    "llm": Histogram("llm_call_duration_seconds", "Time per model call", ("agent", "tier", "model", "status")),
+    "db": Histogram("db_statement_duration_seconds", "Time per SQL statement", ("operation", "status")),
+}
+
+
+class MetricsSpanProcessor(SpanProcessor):
+    """Feeds finished app spans into HISTOGRAMS (independent of any exporter)."""
+
+    def on_end(self, span: ReadableSpan) -> None:
+        attrs = span.attributes or {}
+        histogram = HISTOGRAMS.get(attrs.get("app.kind"))
+        if histogram is None or span.end_time is None:
+            return
+        seconds = attrs.get("app.response_seconds") or (span.end_time - span.start_time) / 1e9
+        labels = {label: attrs.get(f"app.{label}", "") for label in histogram.labels}
+        if "status" in histogram.labels and not labels["status"]:
+            labels["status"] = "error" if span.status.status_code == StatusCode.ERROR else "ok"
+        histogram.observe(seconds, **labels)
+
+
+class JsonLogExporter(SpanExporter):
+    """One JSON object per finished span, appended to a file ("-" for stdout)."""
+
+    def __init__(self, path: str, max_attribute_chars: int = 500):
+        self._out = sys.stdout if path == "-" else open(path, "a", encoding="utf-8", buffering=1)
+        self._max = max_attribute_chars
+        self._lock = threading.Lock()
+
+    def _attr(self, value: Any) -> Any:
+        if isinstance(value, str) and len(value) > self._max:
+            return value[: self._max] + "…"
+        return value if isinstance(value, (str, int, float, bool)) else str(value)[: self._max]
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = []
+        for s in spans:
+            lines.append(json.dumps({
+                "trace_id": f"{s.context.trace_id:032x}",
+                "span_id": f"{s.context.span_id:016x}",
+                "parent_id": f"{s.parent.span_id:016x}" if s.parent else None,
+                "name": s.name,
+                "start": s.start_time / 1e9,
+                "duration_ms": round((s.end_time - s.start_time) / 1e6, 3),
+                "status": s.status.status_code.name,
+                "attributes": {k: self._attr(v) for k, v in (s.attributes or {}).items()},
+                "events": [
+                    {"name": e.name, "offset_ms": round((e.timestamp - s.start_time) / 1e6, 3),
+                     **{k: self._attr(v) for k, v in (e.attributes or {}).items()}}
+                    for e in s.events
+                ],
+            }))
+        with self._lock:
+            self._out.write("\n".join(lines) + "\n")
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        if self._out is not sys.stdout:
+            self._out.close()
+
+
+_provider: Optional[TracerProvider] = None
+
+
+def setup_tracing() -> None:
+    """Install the tracer provider (once): metrics always, exporters per TRACING_* settings.
+
+    ADK's own spans (invocation, agent_run, call_llm, execute_tool) join the same traces.
+    """
+    global _provider
+    if _provider is not None or not settings.TRACING_ENABLED:
+        return
+    _provider = TracerProvider(resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}))
+    _provider.add_span_processor(MetricsSpanProcessor())
+    if settings.TRACING_JSON_LOG:
+        _provider.add_span_processor(BatchSpanProcessor(JsonLogExporter(settings.TRACING_JSON_LOG)))
+    if settings.TRACING_OTLP_ENDPOINT:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            print("⚠️ TRACING_OTLP_ENDPOINT is set but the OTLP exporter is not installed; skipping it")
+        else:
+            _provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)))
+    trace.set_tracer_provider(_provider)
+
+
+def shutdown_tracing() -> None:
+    if _provider is not None:
+        _provider.shutdown()
+
+
+@contextmanager
+def span(name: str, kind: str = "stage", **labels: Any):
+    """Current span for a block; `kind` picks the histogram, labels become app.<label> attributes."""
+    if kind == "stage":
+        labels.setdefault("stage", name)
+    attributes = {"app.kind": kind, **{f"app.{k}": v for k, v in labels.items() if v is not None}}
+    with tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def traced(stage: str):
+    """Decorator: run an async function inside a stage span."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(stage):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def traced_tool(fn):
+    """Decorator for handle_*_action tools: one span per call, labelled with the action and
+    the result status. The signature is kept, so ADK builds the same function declaration."""
+    tool = fn.__name__.removeprefix("handle_").removesuffix("_action")
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        action = kwargs.get("action", args[0] if args else None)
+        with span(f"tool {tool}.{action}", kind="tool", tool=tool, action=action) as current:
+            result = await fn(*args, **kwargs)
+            if isinstance(result, dict):
+                current.set_attribute("app.status", str(result.get("status")))
+            return result
+
+    return wrapper
+
+
+def instrument_engine(sync_engine) -> None:
+    """One db span per SQL statement, child of whatever span issued it."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+        current = tracer.start_span(
+            f"db {operation}",
+            attributes={"app.kind": "db", "app.operation": operation, "db.statement": statement[:1000]},
+        )
+        conn.info.setdefault("trace_spans", []).append(current)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            spans.pop().end()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if spans:
+            current = spans.pop()
+            current.record_exception(exception_context.original_exception)
+            current.set_status(StatusCode.ERROR)
+            current.end()
+
+
+class TracingMiddleware:
+    """ASGI middleware: one http span per request, named after the matched route template.
+
+    The histogram records the time until the last body chunk is sent; background tasks
+    that run afterwards stay inside the span but do not count as response latency.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"]
+        started = time.monotonic()
+        with span(f"HTTP {method}", kind="http", method=method) as current:
+            state = {"status": 500}
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    state["status"] = message["status"]
+                elif message["type"] == "http.response.body" and not message.get("more_body"):
+                    current.set_attribute("app.response_seconds", time.monotonic() - started)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                current.update_name(f"HTTP {method} {route}")
+                current.set_attribute("app.route", route)
+                current.set_attribute("app.status", str(state["status"]))
+
+
+def render_metrics(
+    gauges: Dict[str, Tuple[str, float]], counters: Optional[Dict[str, Tuple[str, float]]] = None
+) -> str:
+    """Prometheus text exposition of the histograms plus the given {name: (help, value)}
+    gauges and counters."""
+    lines = []
+    for histogram in HISTOGRAMS.values():
+        lines.extend(histogram.render())
+    for kind, metrics in (("gauge", gauges), ("counter", counters or {})):
+        for name, (help_text, value) in metrics.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
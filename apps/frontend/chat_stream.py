@@ -0,0 +1,70 @@
+import json
+
+import requests
+import streamlit as st
+
+
+def stream_assistant_reply(url, payload, timeout=60):
+    """POST a prompt to a streaming ask endpoint and render the NDJSON reply live.
+
+    Must be called inside an assistant chat container. Returns the final chunk
+    (`response`, `session_id`, ...) so the page can update its state.
+    """
+    status = st.empty()
+    body = st.empty()
+    status.markdown("⏳ *Thinking...*")
+
+    text = ""
+    final = {}
+    # Let the backend stop the run once we would give up waiting anyway
+    payload = {"deadline_ms": int(timeout * 1000), **payload}
+    with requests.post(url, json=payload, stream=True, timeout=timeout) as resp:
+        if resp.status_code == 429:
+            status.empty()
+            wait = resp.headers.get("Retry-After", "a few")
+            raise RuntimeError(f"The assistant is busy right now; please try again in {wait} seconds.")
+        resp.raise_for_status()
+        for line in resp.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            chunk = json.loads(line)
+            kind = chunk.get("type")
+            if kind == "delta":
+                text += chunk.get("text", "")
+                status.empty()
+                body.markdown(text)
+            elif kind == "tool_call":
+                status.caption(f"🔧 Working on it ({chunk.get('name')})...")
+            elif kind == "tool_result":
+                status.empty()
+            elif kind == "session":
+                final["session_id"] = chunk.get("session_id")
+            elif kind == "error":
+                st.error(chunk.get("message", "Assistant failed"))
+            elif kind == "final":
+                final.update(chunk)
+
+    status.empty()
+    # The final chunk carries the authoritative text (deltas may be missing or intermediate)
+    response_text = final.get("response") or text
+    body.markdown(response_text)
+    final["response"] = response_text
+    return final
+
+
+def merge_turn(messages, final):
+    """Merge a turn's persisted messages (the `messages` delta) into the local transcript.
+
+    Optimistic entries added before the reply (marked `pending`) are replaced by the
+    server copies; messages already present (same id) are not duplicated.
+    """
+    delta = final.get("messages")
+    if not delta:
+        # No server copies: keep the optimistic prompt and append the reply text
+        merged = [{k: v for k, v in m.items() if k != "pending"} for m in messages]
+        return merged + [{"role": "assistant", "content": final.get("response", "")}]
+
+    merged = [m for m in messages if not m.get("pending")]
+    known = {m.get("id") for m in merged if m.get("id") is not None}
+    merged += [m for m in delta if m.get("id") is None or m.get("id") not in known]
+    return merged
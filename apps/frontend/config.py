@@ -9,8 +9,10 @@ BACKEND_BASE_URL = os.getenv("BACKEND_BASE_URL", f"http://{BACKEND_HOST}:{BACKEN
 PATIENTS_API = f"{BACKEND_BASE_URL}/patients"
 AUTH_LOGIN_API = f"{BACKEND_BASE_URL}/auth/login"
 ASK_API = f"{BACKEND_BASE_URL}/ask"
+ASK_STREAM_API = f"{BACKEND_BASE_URL}/ask/stream"
 ASK_HISTORY_API = f"{BACKEND_BASE_URL}/ask/history"
 ASK_HISTORY_BY_USER_API = f"{BACKEND_BASE_URL}/ask/history/by_user"
 DOCTOR_ASK_API = f"{BACKEND_BASE_URL}/doctor/ask"
+DOCTOR_ASK_STREAM_API = f"{BACKEND_BASE_URL}/doctor/ask/stream"
 DOCTOR_HISTORY_API = f"{BACKEND_BASE_URL}/doctor/ask/history"
 DOCTOR_HISTORY_BY_USER_API = f"{BACKEND_BASE_URL}/doctor/history/by_user"
@@ -1,10 +1,9 @@
 import streamlit as st
 import requests
-import time
-import json
 
-from config import ASK_API, ASK_HISTORY_BY_USER_API
+from config import ASK_STREAM_API, ASK_HISTORY_BY_USER_API
 from auth_utils import hydrate_auth_from_params
+from chat_stream import merge_turn, stream_assistant_reply
 
 # Restore auth
 hydrate_auth_from_params()
@@ -18,6 +17,7 @@ if auth:
 # When user changes, reset local cache (history reloads by user)
 if st.session_state.get("last_user") != current_user:
     st.session_state.messages = []
+    st.session_state.history_loaded = False
     st.session_state.last_user = current_user
 
 st.title("Concierge AI Assistant")
@@ -25,15 +25,6 @@ if not auth:
     st.info("You are chatting as a guest. Please login from the Login page for a personalized experience, but you can continue chatting.")
 
 
-def type_writer(text, container, speed=0.02):
-    """Simple typewriter effect for assistant responses."""
-    typed = ""
-    for char in text:
-        typed += char
-        container.markdown(typed)
-        time.sleep(speed)
-
-
 # Initialize chat history
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -54,8 +45,10 @@ def load_history():
         pass
 
 
-# Load history for current user
-load_history()
+# Load history once per user; later turns are merged in from each reply's delta
+if not st.session_state.get("history_loaded"):
+    load_history()
+    st.session_state.history_loaded = True
 
 # Render existing history
 for message in st.session_state.messages:
@@ -65,49 +58,22 @@ for message in st.session_state.messages:
 
 if prompt := st.chat_input("Chat with the Concierge AI Assistant..."):
     # Show user message
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    st.session_state.messages.append({"role": "user", "content": prompt, "pending": True})
     with st.chat_message("user"):
         st.markdown(prompt)
 
     try:
         with st.chat_message("assistant"):
-            animated_placeholder = st.empty()
-            for i in range(6):
-                dots = "." * ((i % 3) + 1)
-                animated_placeholder.markdown(f"⏳ *Thinking{dots}*")
-                time.sleep(0.3)
-
-            user_name = current_user
-
-            response = requests.post(
-                ASK_API,
-                json={
+            data = stream_assistant_reply(
+                ASK_STREAM_API,
+                {
                     "prompt": prompt,
-                    "user_name": user_name,
+                    "user_name": current_user,
                 },
                 timeout=60,  # increased to allow slower backend responses
             )
-            data = response.json()
-
-            raw_response = data.get("response", "")
-            if isinstance(raw_response, list):
-                response_text = (
-                    raw_response[0]
-                    .get("content", {})
-                    .get("parts", [{}])[0]
-                    .get("text", "")
-                )
-            else:
-                response_text = raw_response or ""
-
-            animated_placeholder.empty()
-            type_writer(response_text, animated_placeholder)
-
-        backend_history = data.get("history")
-        if backend_history:
-            st.session_state.messages = backend_history
-        else:
-            st.session_state.messages.append({"role": "assistant", "content": response_text})
+
+        st.session_state.messages = merge_turn(st.session_state.messages, data)
 
     except requests.exceptions.Timeout:
         st.error("Request timed out. Please try again.")
@@ -1,8 +1,8 @@
 import streamlit as st
 import requests
-import time
-from config import DOCTOR_ASK_API, DOCTOR_HISTORY_API, DOCTOR_HISTORY_BY_USER_API
+from config import DOCTOR_ASK_STREAM_API, DOCTOR_HISTORY_API, DOCTOR_HISTORY_BY_USER_API
 from auth_utils import hydrate_auth_from_params
+from chat_stream import merge_turn, stream_assistant_reply
 
 # Restore auth
 hydrate_auth_from_params()
@@ -45,66 +45,40 @@ def load_history():
             if resp.status_code == 200:
                 data = resp.json()
                 st.session_state.doctor_ai_messages = data.get("history", [])
-                sessions = data.get("sessions") or []
-                if sessions:
-                    st.session_state.doctor_ai_session_id = sessions[0]
+                history = data.get("history") or []
+                if history:  # continue the session of the latest message
+                    st.session_state.doctor_ai_session_id = history[-1]["session_id"]
         except Exception:
             pass
 
 
-load_history()
-
-def type_writer(text: str, container, speed: float = 0.02):
-    typed = ""
-    for ch in text:
-        typed += ch
-        container.markdown(typed)
-        time.sleep(speed)
+# Load history once; later turns are merged in from each reply's delta
+if not st.session_state.get("doctor_ai_history_loaded"):
+    load_history()
+    st.session_state.doctor_ai_history_loaded = True
 
 for msg in st.session_state.doctor_ai_messages:
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
 
 if prompt := st.chat_input("Ask the Doctor AI..."):
-    st.session_state.doctor_ai_messages.append({"role": "user", "content": prompt})
+    st.session_state.doctor_ai_messages.append({"role": "user", "content": prompt, "pending": True})
     with st.chat_message("user"):
         st.markdown(prompt)
 
     try:
         with st.chat_message("assistant"):
-            animated_placeholder = st.empty()
-            for i in range(6):
-                dots = "." * ((i % 3) + 1)
-                animated_placeholder.markdown(f"⏳ *Thinking{dots}*")
-                time.sleep(0.3)
-
-            resp = requests.post(
-                DOCTOR_ASK_API,
-                json={
+            data = stream_assistant_reply(
+                DOCTOR_ASK_STREAM_API,
+                {
                     "prompt": prompt,
                     "user_name": auth["user"]["username"] if auth else None,
                     "session_id": st.session_state.doctor_ai_session_id,
                 },
                 timeout=30,
             )
-            data = resp.json()
-            st.session_state.doctor_ai_session_id = data.get("session_id", st.session_state.doctor_ai_session_id)
-            raw = data.get("response", "")
-            if isinstance(raw, list):
-                text = raw[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-            else:
-                text = raw or ""
-
-            animated_placeholder.empty()
-
-            backend_history = data.get("history")
-            if backend_history:
-                st.session_state.doctor_ai_messages = backend_history
-                st.rerun()
-            else:
-                if not st.session_state.doctor_ai_messages or st.session_state.doctor_ai_messages[-1]["content"] != text:
-                    st.session_state.doctor_ai_messages.append({"role": "assistant", "content": text})
-                type_writer(text, animated_placeholder, speed=0.02)
+        st.session_state.doctor_ai_session_id = data.get("session_id", st.session_state.doctor_ai_session_id)
+        st.session_state.doctor_ai_messages = merge_turn(st.session_state.doctor_ai_messages, data)
     except requests.exceptions.Timeout:
         st.error("Request timed out. Please try again.")
     except Exception as e:
@@ -24,11 +24,19 @@ patient_id = patient_map[patient_label]
 if st.button("Retrieve"):
     with st.spinner("Fetching patient data..."):
         try:
-            response = requests.get(f"{PATIENTS_API}/{patient_id}", timeout=5)
-            if response.status_code != 200:
+            # Revalidate with the cached ETag; a 304 means the profile is unchanged
+            cache = st.session_state.setdefault("patient_profile_cache", {})
+            cached = cache.get(patient_id)
+            headers = {"If-None-Match": cached["etag"]} if cached else {}
+            response = requests.get(f"{PATIENTS_API}/{patient_id}", headers=headers, timeout=5)
+            if response.status_code not in (200, 304):
                 st.error(response.json().get("detail", "Error fetching patient"))
             else:
-                data = response.json()
+                if response.status_code == 304:
+                    data = cached["data"]
+                else:
+                    data = response.json()
+                    cache[patient_id] = {"etag": response.headers.get("ETag"), "data": data}
 
                 patient = data["patient"]
                 conditions = data["conditions"]
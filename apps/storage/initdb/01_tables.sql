@@ -84,39 +84,108 @@ CREATE TABLE medication_schedules (
     remarks TEXT
 );
 
+-- Lookups by patient (tool handlers, profile aggregation) and by name + birthdate
+CREATE INDEX ix_patients_full_name_birthdate ON patients (full_name, birthdate);
+CREATE INDEX ix_carers_patient_id ON carers (patient_id);
+CREATE INDEX ix_conditions_patient_id ON conditions (patient_id);
+CREATE INDEX ix_appointments_patient_id ON appointments (patient_id);
+CREATE INDEX ix_referrals_appointment_id ON referrals (appointment_id);
+CREATE INDEX ix_user_patient_access_user_id ON user_patient_access (user_id);
+CREATE INDEX ix_user_patient_access_patient_id ON user_patient_access (patient_id);
+CREATE INDEX ix_notifications_patient_id ON notifications (patient_id);
+CREATE INDEX ix_medication_schedules_patient_id ON medication_schedules (patient_id);
+
 -- Conversation sessions and messages for AI assistant
 CREATE TABLE conversation_sessions_concierge (
     id SERIAL PRIMARY KEY,
     session_id VARCHAR(100) UNIQUE NOT NULL,
     app_name VARCHAR(100),
     user_id VARCHAR(100),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    state JSONB DEFAULT '{}'::jsonb,           -- ADK session state
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE TABLE conversation_messages_concierge (
     id SERIAL PRIMARY KEY,
     session_id VARCHAR(100) REFERENCES conversation_sessions_concierge(session_id) ON DELETE CASCADE,
+    user_id VARCHAR(100),             -- the session's user, copied for per-user history pages
     role VARCHAR(20) NOT NULL,        -- user | assistant
     content TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- token accounting of the turn, on its last message (NULL when no model was called)
+    llm_calls INTEGER,
+    prompt_tokens INTEGER,                  -- includes cached_tokens
+    completion_tokens INTEGER,              -- includes thinking tokens
+    cached_tokens INTEGER,
+    cost_usd NUMERIC(12, 6),
+    tool_path VARCHAR(255),                 -- e.g. db_assistant>patient.list_patients
+    usage_by_agent JSONB                    -- {agent: {llm_calls, prompt_tokens, ...}}
 );
 
+-- Raw ADK events backing the Postgres session service
+CREATE TABLE conversation_events_concierge (
+    id BIGSERIAL PRIMARY KEY,
+    session_id VARCHAR(100) REFERENCES conversation_sessions_concierge(session_id) ON DELETE CASCADE,
+    event_id VARCHAR(100),
+    invocation_id VARCHAR(100),
+    author VARCHAR(100),
+    timestamp DOUBLE PRECISION,
+    payload JSONB NOT NULL
+);
+CREATE INDEX ix_conversation_events_concierge_session_id ON conversation_events_concierge (session_id, id);
+
+-- Keyset pagination of history: pages cost the same however long the history is
+CREATE INDEX ix_conversation_messages_concierge_keyset ON conversation_messages_concierge (session_id, created_at, id);
+CREATE INDEX ix_conversation_messages_concierge_user_keyset ON conversation_messages_concierge (user_id, created_at, id);
+CREATE INDEX ix_conversation_messages_concierge_usage ON conversation_messages_concierge (created_at) WHERE prompt_tokens IS NOT NULL;
+CREATE INDEX ix_conversation_sessions_concierge_user ON conversation_sessions_concierge (user_id, created_at);
+
 CREATE TABLE conversation_sessions_doctor (
     id SERIAL PRIMARY KEY,
     session_id VARCHAR(100) UNIQUE NOT NULL,
     app_name VARCHAR(100),
     user_id VARCHAR(100),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    state JSONB DEFAULT '{}'::jsonb,           -- ADK session state
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE TABLE conversation_messages_doctor (
     id SERIAL PRIMARY KEY,
     session_id VARCHAR(100) REFERENCES conversation_sessions_doctor(session_id) ON DELETE CASCADE,
+    user_id VARCHAR(100),             -- the session's user, copied for per-user history pages
     role VARCHAR(20) NOT NULL,        -- user | assistant
     content TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- token accounting of the turn, on its last message (NULL when no model was called)
+    llm_calls INTEGER,
+    prompt_tokens INTEGER,                  -- includes cached_tokens
+    completion_tokens INTEGER,              -- includes thinking tokens
+    cached_tokens INTEGER,
+    cost_usd NUMERIC(12, 6),
+    tool_path VARCHAR(255),                 -- e.g. db_assistant>patient.list_patients
+    usage_by_agent JSONB                    -- {agent: {llm_calls, prompt_tokens, ...}}
 );
 
+-- Raw ADK events backing the Postgres session service
+CREATE TABLE conversation_events_doctor (
+    id BIGSERIAL PRIMARY KEY,
+    session_id VARCHAR(100) REFERENCES conversation_sessions_doctor(session_id) ON DELETE CASCADE,
+    event_id VARCHAR(100),
+    invocation_id VARCHAR(100),
+    author VARCHAR(100),
+    timestamp DOUBLE PRECISION,
+    payload JSONB NOT NULL
+);
+CREATE INDEX ix_conversation_events_doctor_session_id ON conversation_events_doctor (session_id, id);
+
+-- Keyset pagination of history: pages cost the same however long the history is
+CREATE INDEX ix_conversation_messages_doctor_keyset ON conversation_messages_doctor (session_id, created_at, id);
+CREATE INDEX ix_conversation_messages_doctor_user_keyset ON conversation_messages_doctor (user_id, created_at, id);
+CREATE INDEX ix_conversation_messages_doctor_usage ON conversation_messages_doctor (created_at) WHERE prompt_tokens IS NOT NULL;
+CREATE INDEX ix_conversation_sessions_doctor_user ON conversation_sessions_doctor (user_id, created_at);
+
 CREATE TABLE login_sessions (
     id SERIAL PRIMARY KEY,
     session_token VARCHAR(150) UNIQUE NOT NULL,